@@ -2,6 +2,7 @@
 AI 辅助功能 API 路由
 提供 AI 生成代码等辅助功能
 """
+import json
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional
@@ -350,7 +351,6 @@ response, answer, reply, content, message, text, output, result, lastResponse, d
         result_text = result_text.strip()
 
         # 解析 JSON
-        import json
         try:
             result = json.loads(result_text)
         except json.JSONDecodeError as e:
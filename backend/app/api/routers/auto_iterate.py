@@ -1,6 +1,5 @@
 from datetime import datetime
 import threading
-import os
 import time
 import asyncio
 from typing import Optional, Dict, Any, List, Set, Union
@@ -51,11 +50,7 @@ async def start_auto_iterate(
     """
     
     # 查找文件路径
-    file_path = None
-    for f in os.listdir(storage.DATA_DIR):
-        if f.startswith(file_id):
-            file_path = os.path.join(storage.DATA_DIR, f)
-            break
+    file_path = storage.get_file_path(file_id)
             
     if not file_path:
         raise HTTPException(status_code=404, detail="File not found")
@@ -325,38 +320,27 @@ async def start_auto_iterate(
                             status["message"] = f"第 {round_num}/{max_rounds} 轮: {failure_reason}"
                             
                             # 保存失败的迭代记录（包含备注说明）
-                            project = storage.get_project(project_id)
-                            if project:
-                                # 确保 iterations 列表存在
-                                if "iterations" not in project:
-                                    project["iterations"] = []
-                                
-                                # 回填上一个迭代记录的 accuracy_after
-                                if len(project["iterations"]) > 0:
-                                    last_iteration = project["iterations"][-1]
-                                    if last_iteration.get("accuracy_after") is None:
-                                        last_iteration["accuracy_after"] = accuracy
-                                        logger.info(f"[AutoIterate {project_id}] Backfilled accuracy_after={accuracy:.2%} to previous iteration")
-                                
-                                # 构建备注内容：未应用提示词及原因
-                                not_applied_note = f"未应用提示词, 原因: {failure_reason}"
-                                
-                                project["iterations"].append({
+                            # 仅追加一条迭代记录并回填上一轮 accuracy_after，不再重写项目的全部迭代记录
+                            # 构建备注内容：未应用提示词及原因
+                            not_applied_note = f"未应用提示词, 原因: {failure_reason}"
+                            # 不更新 current_prompt，保持原提示词
+                            storage.append_project_iteration(
+                                project_id,
+                                {
                                     "previous_prompt": current_prompt,
                                     "optimized_prompt": new_prompt,
                                     "task_id": task_id,
                                     "accuracy_before": accuracy,
                                     "accuracy_after": None,
-                                    "version": len(project["iterations"]) + 1,
                                     "created_at": datetime.now().isoformat(),
                                     "is_failed": True,
                                     "failure_reason": failure_reason,
                                     "not_applied": True,
                                     "note": not_applied_note,
                                     "strategy": ", ".join([s.get("name") for s in applied_strategies if s.get("success")])
-                                })
-                                # 不更新 current_prompt，保持原提示词
-                                storage.update_project(project_id, project)
+                                },
+                                backfill_accuracy=accuracy
+                            )
                             
                             storage.save_auto_iterate_status(project_id, status)
                             # 继续下一轮迭代
@@ -364,31 +348,20 @@ async def start_auto_iterate(
                         
                         logger.info(f"[AutoIterate {project_id}] Prompt optimized successfully, strategies: {[s.get('name') for s in applied_strategies if s.get('success')]}")
                         
-                        # 保存迭代记录
-                        project = storage.get_project(project_id)
-                        if project:
-                            # 确保 iterations 列表存在
-                            if "iterations" not in project:
-                                project["iterations"] = []
-                            
-                            # 回填上一个迭代记录的 accuracy_after
-                            if len(project["iterations"]) > 0:
-                                last_iteration = project["iterations"][-1]
-                                if last_iteration.get("accuracy_after") is None:
-                                    last_iteration["accuracy_after"] = accuracy
-                                    logger.info(f"[AutoIterate {project_id}] Backfilled accuracy_after={accuracy:.2%} to previous iteration")
-                            
-                            project["iterations"].append({
+                        # 保存迭代记录：追加一条并同步 current_prompt，同时回填上一轮 accuracy_after
+                        storage.append_project_iteration(
+                            project_id,
+                            {
                                 "previous_prompt": current_prompt,
                                 "optimized_prompt": new_prompt,
                                 "task_id": task_id,
                                 "accuracy_before": accuracy,
                                 "accuracy_after": None,
-                                "version": len(project["iterations"]) + 1,
                                 "created_at": datetime.now().isoformat()
-                            })
-                            project["current_prompt"] = new_prompt
-                            storage.update_project(project_id, project)
+                            },
+                            current_prompt=new_prompt,
+                            backfill_accuracy=accuracy
+                        )
                         
                         # 重要：更新 prompt 用于下一轮
                         current_prompt = new_prompt
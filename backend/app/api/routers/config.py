@@ -1,5 +1,9 @@
+import json
+import os
 from fastapi import APIRouter, Form
 from typing import Dict, Any, Optional
+import requests
+from starlette.concurrency import run_in_threadpool
 from app.db import storage
 from app.core.llm_factory import LLMFactory
 from loguru import logger
@@ -41,8 +45,6 @@ async def save_config(
     :param temperature: 温度参数
     :return: 操作状态
     """
-    from starlette.concurrency import run_in_threadpool
-
     logger.info(f"保存全局配置: model={model_name}, protocol={protocol}, url={base_url}")
     await run_in_threadpool(storage.save_model_config, {
         "base_url": base_url,
@@ -89,10 +91,6 @@ async def test_config(
     logger.info(f"测试连接: URL={base_url} | 模式={validation_mode} | 协议={protocol}")
 
     try:
-        import requests
-        import json
-        import os
-
         # 打印当前代理设置，帮助排查网络问题
         logger.info(f"当前 HTTP_PROXY: {os.environ.get('HTTP_PROXY')}")
         logger.info(f"当前 HTTPS_PROXY: {os.environ.get('HTTPS_PROXY')}")
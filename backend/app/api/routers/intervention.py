@@ -7,16 +7,36 @@ from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
 import io
+from operator import methodcaller
 import pandas as pd
 from pydantic import BaseModel
 from loguru import logger
+from starlette.concurrency import run_in_threadpool
 from app.services import intervention_service
 from app.models import IntentIntervention
 from app.engine.helpers.verifier import Verifier
+from app.core import background_loop
 from app.db import storage
 
+try:
+    import pyarrow  # noqa: F401
+    # pyarrow 多线程解析 CSV，大文件比默认 C 引擎快数倍
+    _CSV_READ_KWARGS: Dict[str, Any] = {"engine": "pyarrow"}
+except ImportError:
+    _CSV_READ_KWARGS = {}
+
+try:
+    import python_calamine  # noqa: F401
+    # calamine (Rust) 解析 Excel 远快于 openpyxl
+    _EXCEL_READ_KWARGS: Dict[str, Any] = {"engine": "calamine"}
+except ImportError:
+    _EXCEL_READ_KWARGS = {}
+
 router = APIRouter()
 
+# 批量转换 ORM 对象为字典（map 在 C 层循环）
+_to_dict = methodcaller("to_dict")
+
 class InterventionUpsertRequest(BaseModel):
     """意图干预更新请求模型"""
     id: Optional[int] = None
@@ -52,9 +72,11 @@ async def list_interventions(
     # logger.info(f"Fetching interventions for project: {project_id}, page: {page}")
     try:
         # 使用分页获取
-        result = intervention_service.get_interventions_paginated(project_id, page, page_size, search, filter_type, file_id)
+        result = await run_in_threadpool(
+            intervention_service.get_interventions_paginated, project_id, page, page_size, search, filter_type, file_id
+        )
         # Convert items to dict
-        result["items"] = [r.to_dict() for r in result["items"]]
+        result["items"] = list(map(_to_dict, result["items"]))
         return result
     except Exception as e:
         logger.error(f"Error fetching interventions for project {project_id}: {e}")
@@ -76,7 +98,7 @@ async def get_intervention_count_endpoint(
     :return: 包含 count 字段的字典
     """
     try:
-        count: int = intervention_service.get_intervention_count(project_id, file_id)
+        count: int = await run_in_threadpool(intervention_service.get_intervention_count, project_id, file_id)
         return {"count": count}
     except Exception as e:
         logger.error(f"Error getting intervention count for project {project_id}: {e}")
@@ -94,7 +116,7 @@ async def get_intervention_targets(project_id: str, file_id: Optional[str] = Non
     :return: 唯一的 target 值列表
     """
     try:
-        interventions = intervention_service.get_interventions_by_project(project_id, file_id=file_id)
+        interventions = await run_in_threadpool(intervention_service.get_interventions_by_project, project_id, file_id)
         # 提取唯一的 target 值，过滤空值
         targets: set = set()
         for item in interventions:
@@ -117,7 +139,8 @@ async def upsert_intervention(project_id: str, request: InterventionUpsertReques
         raise HTTPException(status_code=400, detail="Query is required")
     
     try:
-        result: Optional[IntentIntervention] = intervention_service.upsert_intervention(
+        result: Optional[IntentIntervention] = await run_in_threadpool(
+            intervention_service.upsert_intervention,
             project_id=project_id,
             query=request.query,
             reason=request.reason,
@@ -142,7 +165,7 @@ async def delete_intervention(project_id: str, query: str) -> Dict[str, str]:
     """
     logger.info(f"Deleting intervention for project {project_id}, query: {query[:20]}...")
     try:
-        success: bool = intervention_service.delete_intervention(project_id, query)
+        success: bool = await run_in_threadpool(intervention_service.delete_intervention, project_id, query)
         if not success:
             logger.warning(f"Delete failed: Intervention not found for query {query[:20]}...")
             raise HTTPException(status_code=404, detail="Intervention not found")
@@ -163,7 +186,7 @@ async def reset_intervention(project_id: str, request: InterventionResetRequest)
     """
     logger.info(f"Resetting intervention for project {project_id}, query: {request.query[:20]}...")
     try:
-        success = intervention_service.reset_intervention(project_id, request.query)
+        success = await run_in_threadpool(intervention_service.reset_intervention, project_id, request.query)
         if not success:
              raise HTTPException(status_code=404, detail="Intervention not found")
         return {"message": "Reset successfully"}
@@ -221,7 +244,7 @@ async def expand_query(project_id: str, request: QueryExpandRequest) -> Dict[str
     logger.info(f"[举一反三] 项目 {project_id}, 原始 Query: {request.query[:30]}...")
 
     # 1. 获取项目配置
-    project = storage.get_project(project_id)
+    project = await run_in_threadpool(storage.get_project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
 
@@ -265,8 +288,8 @@ async def import_expanded_queries(project_id: str, request: QueryExpandImportReq
     if not request.queries:
         raise HTTPException(status_code=400, detail="导入列表不能为空")
 
-    try:
-        imported_count = 0
+    def _import_queries() -> int:
+        imported = 0
         for q in request.queries:
             if q.strip():
                 result = intervention_service.upsert_intervention(
@@ -277,7 +300,11 @@ async def import_expanded_queries(project_id: str, request: QueryExpandImportReq
                     file_id=request.file_id
                 )
                 if result:
-                    imported_count += 1
+                    imported += 1
+        return imported
+
+    try:
+        imported_count = await run_in_threadpool(_import_queries)
 
         logger.success(f"[举一反三导入] 成功导入 {imported_count} 条")
 
@@ -299,7 +326,7 @@ async def test_intervention(project_id: str, request: InterventionTestRequest) -
     logger.info(f"Testing intervention for project {project_id}, query: {request.query[:20]}...")
     
     # 1. 获取项目配置
-    project = storage.get_project(project_id)
+    project = await run_in_threadpool(storage.get_project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
         
@@ -317,7 +344,9 @@ async def test_intervention(project_id: str, request: InterventionTestRequest) -
     try:
         # 使用 Verifier 执行单条验证
         # index 设为 -1 表示这是测试请求
-        result = Verifier.verify_single(
+        # 同步调用模型接口，放到线程池执行，避免阻塞事件循环
+        result = await run_in_threadpool(
+            Verifier.verify_single,
             index=-1,
             query=request.query,
             target=request.target,
@@ -333,38 +362,61 @@ async def test_intervention(project_id: str, request: InterventionTestRequest) -
         raise HTTPException(status_code=500, detail=f"Test failed: {str(e)}")
 
 
+def _read_import_header(file_path: str) -> List[str]:
+    """
+    只读取导入文件的表头（不解析数据行），用于在完整解析前校验列名
+
+    :param file_path: CSV / Excel 文件路径
+    :return: 列名列表
+    """
+    if file_path.endswith(".csv"):
+        return pd.read_csv(file_path, nrows=0).columns.tolist()
+    return pd.read_excel(file_path, nrows=0, **_EXCEL_READ_KWARGS).columns.tolist()
+
+
+def _read_import_columns(file_path: str, columns: List[str]) -> pd.DataFrame:
+    """
+    读取导入文件中指定的列（列名需已通过 _read_import_header 校验存在）
+
+    :param file_path: CSV / Excel 文件路径
+    :param columns: 需要的列名
+    :return: 仅包含所需列的 DataFrame
+    """
+    if file_path.endswith(".csv"):
+        return pd.read_csv(file_path, usecols=columns, **_CSV_READ_KWARGS)
+    return pd.read_excel(file_path, usecols=columns, **_EXCEL_READ_KWARGS)
+
+
 @router.post("/projects/{project_id}/interventions/import")
 async def import_interventions(project_id: str, request: InterventionImportRequest) -> Dict[str, Any]:
     """
     从文件导入干预数据
     """
-    from app.db import storage
-    import os
-    import pandas as pd
-    
     logger.info(f"Importing interventions for project {project_id} from file {request.file_id}")
     
     # 查找文件路径
-    file_path = None
-    for f in os.listdir(storage.DATA_DIR):
-        if f.startswith(request.file_id):
-            file_path = os.path.join(storage.DATA_DIR, f)
-            break
+    file_path = await run_in_threadpool(storage.get_file_path, request.file_id)
             
     if not file_path:
         raise HTTPException(status_code=404, detail="File not found")
         
     try:
-        if file_path.endswith(".csv"):
-            df = pd.read_csv(file_path)
-        else:
-            df = pd.read_excel(file_path)
-            
-        if request.reason_col and request.reason_col not in df.columns:
+        # 文件解析与批量写库都是阻塞操作：解析放到独立的解析线程池，写库放到通用线程池
+        # 先只读表头校验列名，列名错误时无需解析整个文件即可返回
+        header = set(await background_loop.run_in_parse_pool(_read_import_header, file_path))
+        missing = [c for c in (request.query_col, request.target_col) if c not in header]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Columns not found in file: {', '.join(missing)}")
+        if request.reason_col and request.reason_col not in header:
              logger.warning(f"Reason column '{request.reason_col}' not found in file, ignoring reason import.")
              request.reason_col = None
 
-        imported_count = intervention_service.import_dataset_to_interventions(
+        # 只解析导入用到的列
+        columns = list(dict.fromkeys(c for c in (request.query_col, request.target_col, request.reason_col) if c))
+        df = await background_loop.run_in_parse_pool(_read_import_columns, file_path, columns)
+
+        imported_count = await run_in_threadpool(
+            intervention_service.import_dataset_to_interventions,
             project_id=project_id,
             df=df,
             query_col=request.query_col,
@@ -389,15 +441,39 @@ async def batch_delete_interventions(project_id: str, request: List[str]) -> Dic
     """
     logger.info(f"Batch deleting {len(request)} interventions for project {project_id}")
     try:
-        deleted_count = 0
-        for query in request:
-            if intervention_service.delete_intervention(project_id, query):
-                deleted_count += 1
+        deleted_count = await run_in_threadpool(intervention_service.delete_interventions, project_id, request)
         return {"message": "Batch delete successful", "deleted_count": deleted_count}
     except Exception as e:
         logger.error(f"Error batch deleting interventions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _build_interventions_excel(project_id: str, file_id: Optional[str]) -> io.BytesIO:
+    """
+    将项目下的意图干预数据生成 Excel 文件
+
+    :param project_id: 项目 ID
+    :param file_id: 可选，文件版本 ID
+    :return: 已定位到开头的 Excel 字节流
+    """
+    interventions = intervention_service.get_interventions_by_project(project_id, file_id=file_id)
+    if not interventions:
+         # Return empty df
+         df = pd.DataFrame(columns=["query", "target", "reason"])
+    else:
+         df = pd.DataFrame(list(map(_to_dict, interventions)))
+         
+    cols_to_export = ["query", "target", "reason"]
+    existing_cols = [c for c in cols_to_export if c in df.columns]
+    export_df = df[existing_cols] if not df.empty else df
+    
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        export_df.to_excel(writer, index=False, sheet_name='Interventions')
+    
+    output.seek(0)
+    return output
+
+
 @router.get("/projects/{project_id}/interventions/export")
 async def export_interventions_endpoint(project_id: str, file_id: str = None) -> Any:
     """
@@ -409,22 +485,8 @@ async def export_interventions_endpoint(project_id: str, file_id: str = None) ->
     """
     logger.info(f"Exporting interventions for project {project_id}, file_id={file_id}")
     try:
-        interventions = intervention_service.get_interventions_by_project(project_id, file_id=file_id)
-        if not interventions:
-             # Return empty df
-             df = pd.DataFrame(columns=["query", "target", "reason"])
-        else:
-             df = pd.DataFrame([r.to_dict() for r in interventions])
-             
-        cols_to_export = ["query", "target", "reason"]
-        existing_cols = [c for c in cols_to_export if c in df.columns]
-        export_df = df[existing_cols] if not df.empty else df
-        
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            export_df.to_excel(writer, index=False, sheet_name='Interventions')
-        
-        output.seek(0)
+        # 查询与 Excel 生成均为阻塞操作，放到线程池执行
+        output = await run_in_threadpool(_build_interventions_excel, project_id, file_id)
         
         # 生成带有版本信息的文件名
         filename_suffix = f"_{file_id}" if file_id else ""
@@ -446,7 +508,7 @@ async def clear_interventions_endpoint(project_id: str, file_id: Optional[str] =
     """
     logger.info(f"Clearing all interventions for project {project_id}, file_id={file_id}")
     try:
-        deleted_count = intervention_service.clear_interventions(project_id, file_id)
+        deleted_count = await run_in_threadpool(intervention_service.clear_interventions, project_id, file_id)
         return {"message": "Clear successful", "deleted_count": deleted_count}
     except Exception as e:
         logger.error(f"Error clearing interventions: {e}")
@@ -8,12 +8,16 @@ from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional, List
 from pydantic import BaseModel
 from loguru import logger
+from starlette.concurrency import run_in_threadpool
 import json
 import io
 import pandas as pd
 
 from app.services import multi_round_intervention_service as service
+from app.core import serialization
 from app.db import storage
+from app.engine.helpers.verifier import Verifier
+from app.engine.helpers.history_formatter import HistoryFormatter
 
 router = APIRouter()
 
@@ -229,22 +233,14 @@ async def sync_from_data_file(
     return result
 
 
-@router.get("/projects/{project_id}/multi-round-interventions/export")
-async def export_interventions(
-    project_id: str,
-    file_id: Optional[str] = None
-) -> StreamingResponse:
+def _build_export_excel(project_id: str, file_id: Optional[str]) -> Optional[io.BytesIO]:
     """
-    导出多轮干预数据为 Excel
-
-    格式：每行一条数据，列包含各轮次的 target、query_rewrite、reason
+    查询多轮干预数据并生成 Excel（内存中，不落盘）
 
     :param project_id: 项目 ID
     :param file_id: 文件版本 ID
-    :return: Excel 文件流
+    :return: 已定位到开头的 Excel 字节流，没有数据时返回 None
     """
-    logger.info(f"导出多轮干预数据: project={project_id}")
-
     # 获取所有数据
     result = service.get_interventions_paginated(
         project_id=project_id,
@@ -255,7 +251,7 @@ async def export_interventions(
     items = result.get("items", [])
 
     if not items:
-        raise HTTPException(status_code=404, detail="没有可导出的数据")
+        return None
 
     # 确定最大轮数
     max_rounds = 0
@@ -287,6 +283,29 @@ async def export_interventions(
     with pd.ExcelWriter(output, engine="openpyxl") as writer:
         df.to_excel(writer, index=False, sheet_name="多轮干预数据")
     output.seek(0)
+    return output
+
+
+@router.get("/projects/{project_id}/multi-round-interventions/export")
+async def export_interventions(
+    project_id: str,
+    file_id: Optional[str] = None
+) -> StreamingResponse:
+    """
+    导出多轮干预数据为 Excel
+
+    格式：每行一条数据，列包含各轮次的 target、query_rewrite、reason
+
+    :param project_id: 项目 ID
+    :param file_id: 文件版本 ID
+    :return: Excel 文件流
+    """
+    logger.info(f"导出多轮干预数据: project={project_id}")
+
+    # 查询与 Excel 序列化均为阻塞操作，放到线程池执行，避免导出期间阻塞事件循环
+    output = await run_in_threadpool(_build_export_excel, project_id, file_id)
+    if output is None:
+        raise HTTPException(status_code=404, detail="没有可导出的数据")
 
     return StreamingResponse(
         output,
@@ -322,9 +341,6 @@ async def test_single_intervention(
     :param request: 测试请求（包含各轮次数据和提取配置）
     :return: 各轮次验证结果
     """
-    from app.engine.helpers.verifier import Verifier
-    from app.engine.helpers.history_formatter import HistoryFormatter
-
     logger.info(f"测试单条多轮干预: project={project_id}, intervention_id={intervention_id}")
 
     # 获取干预记录
@@ -373,15 +389,17 @@ async def test_single_intervention(
     if not intent_extract_field or not response_extract_field:
         latest_task = storage.get_latest_task_by_project(project_id)
         if latest_task and latest_task.get("extra_config"):
-            import json
+            raw_extra_config = latest_task["extra_config"]
             try:
-                extra_config = json.loads(latest_task["extra_config"]) if isinstance(latest_task["extra_config"], str) else latest_task["extra_config"]
+                extra_config = serialization.loads(raw_extra_config) if isinstance(raw_extra_config, str) else raw_extra_config
+            except serialization.JSONDecodeError as e:
+                logger.warning(f"解析最近任务配置失败: {e}")
+                extra_config = None
+            if isinstance(extra_config, dict):
                 if not intent_extract_field:
                     intent_extract_field = extra_config.get("intent_extract_field", "")
                 if not response_extract_field:
                     response_extract_field = extra_config.get("response_extract_field", "")
-            except:
-                pass
 
     # 转换 rounds_data
     rounds_data = {k: v.model_dump() for k, v in request.rounds_data.items()}
@@ -9,6 +9,7 @@ import time
 import asyncio
 import uuid
 import json
+import re
 from datetime import datetime
 from sqlmodel import select, desc
 from app.core.llm_factory import LLMFactory
@@ -64,7 +65,7 @@ async def test_prompt_output(request: TestPromptRequest) -> Dict[str, Any]:
     # 生成请求 ID
     request_id: str = str(uuid.uuid4())
     
-    start_time = time.time()
+    start_time = time.perf_counter()
     try:
         if validation_mode == "interface":
             # 接口模式：调用 Verifier._call_interface
@@ -87,7 +88,9 @@ async def test_prompt_output(request: TestPromptRequest) -> Dict[str, Any]:
             model_name = model_config.get("model_name", "gpt-3.5-turbo")
             
             # 将 request_id 注入到配置中，以便 _call_llm_raw 使用
-            config_with_request_id = {**model_config, "_request_id": request_id}
+            # 浅拷贝后原地写入：原始 model_config 还需写入历史记录，不能被污染
+            config_with_request_id = model_config.copy()
+            config_with_request_id["_request_id"] = request_id
             
             history_count: int = len(history_messages) if history_messages else 0
             logger.info(f"Playground Test - Model: {model_name}, Prompt Len: {len(prompt)}, Query Len: {len(query)}, History Count: {history_count}, RequestId: {request_id}")
@@ -103,7 +106,7 @@ async def test_prompt_output(request: TestPromptRequest) -> Dict[str, Any]:
                 history_messages
             )
         
-        end_time = time.time()
+        end_time = time.perf_counter()
         latency_ms = (end_time - start_time) * 1000
         
         
@@ -139,9 +142,7 @@ async def test_prompt_output(request: TestPromptRequest) -> Dict[str, Any]:
         }
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        logger.error(f"Playground Test Failed: {str(e)}")
+        logger.exception(f"Playground Test Failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"调用失败: {str(e)}")
 
 
@@ -293,6 +294,31 @@ async def toggle_favorite(history_id: int) -> Dict[str, Any]:
             "is_favorite": record.is_favorite
         }
 
+
+# 构造极其严格的格式化提示词，防止模型"回答"而非"格式化"
+_FIX_JSON_SYSTEM_PROMPT: str = (
+    "# 任务：JSON 格式转换器（严禁修改内容）\n\n"
+    "你的唯一任务是将用户提供的文本原封不动地包装成 JSON 数组格式。\n\n"
+    "## 绝对禁止\n"
+    "- 禁止修改、改写、翻译、补充、回应用户的任何文字内容\n"
+    "- 禁止添加问候语、回复语或任何模型生成的内容\n"
+    "- 禁止输出任何 Markdown 代码块标记（如 ```json）\n\n"
+    "## 必须遵守\n"
+    "- 将原始文本内容逐字放入 'content' 字段\n"
+    "- 每条消息默认 role 为 'user'，除非原文明确标注了角色\n"
+    "- 只输出一个纯净的 JSON 数组字符串\n\n"
+    "## 示例\n"
+    "输入: 你好啊\n"
+    "输出: [{\"role\": \"user\", \"content\": \"你好啊\"}]\n\n"
+    "输入: 用户：查余额\\n助手：您的余额是100元\n"
+    '输出: [{"role": "user", "content": "查余额"}, {"role": "assistant", "content": "您的余额是100元"}]'
+)
+
+
+# 匹配模型输出首尾可能存在的 markdown 代码块标记（首尾标记均可缺省）
+_MD_FENCE_RE: re.Pattern = re.compile(r"^(?:```(?:json)?)?\s*(.*?)\s*(?:```)?$", re.DOTALL)
+
+
 class FixJsonRequest(BaseModel):
     text: str
     llm_config: Optional[Dict[str, Any]] = None
@@ -306,29 +332,10 @@ async def fix_json(request: FixJsonRequest):
         return {"fixed_text": ""}
 
     try:
-        # 构造极其严格的格式化提示词，防止模型"回答"而非"格式化"
-        system_instruction = (
-            "# 任务：JSON 格式转换器（严禁修改内容）\n\n"
-            "你的唯一任务是将用户提供的文本原封不动地包装成 JSON 数组格式。\n\n"
-            "## 绝对禁止\n"
-            "- 禁止修改、改写、翻译、补充、回应用户的任何文字内容\n"
-            "- 禁止添加问候语、回复语或任何模型生成的内容\n"
-            "- 禁止输出任何 Markdown 代码块标记（如 ```json）\n\n"
-            "## 必须遵守\n"
-            "- 将原始文本内容逐字放入 'content' 字段\n"
-            "- 每条消息默认 role 为 'user'，除非原文明确标注了角色\n"
-            "- 只输出一个纯净的 JSON 数组字符串\n\n"
-            "## 示例\n"
-            "输入: 你好啊\n"
-            "输出: [{\"role\": \"user\", \"content\": \"你好啊\"}]\n\n"
-            "输入: 用户：查余额\\n助手：您的余额是100元\n"
-            '输出: [{"role": "user", "content": "查余额"}, {"role": "assistant", "content": "您的余额是100元"}]'
-        )
-
         llm = LLMFactory.create_raw_async_client(request.llm_config)
         
         # 策略调整：将 System Prompt 并入 User Prompt，以防止某些模型忽略 System Role
-        final_user_content = f"{system_instruction}\n\n## 待处理文本\n{request.text}"
+        final_user_content = f"{_FIX_JSON_SYSTEM_PROMPT}\n\n## 待处理文本\n{request.text}"
         
         messages = [
             {"role": "user", "content": final_user_content}
@@ -349,14 +356,10 @@ async def fix_json(request: FixJsonRequest):
         content = content.strip()
         
         # 清理可能存在的 markdown 标记
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-             content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
+        m = _MD_FENCE_RE.match(content)
+        content = m.group(1) if m else content
             
-        return {"fixed_text": content.strip()}
+        return {"fixed_text": content}
         
     except Exception as e:
         logger.error(f"Fix JSON failed: {e}")
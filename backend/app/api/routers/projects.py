@@ -1,16 +1,37 @@
-from fastapi import APIRouter, Form, HTTPException, BackgroundTasks, Request
-from typing import Optional, List, Dict, Any
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse, Response
+from typing import Optional, List, Dict, Any, Coroutine
 from datetime import datetime
+import asyncio
+import hmac
+import os
+from app.core import background_loop, serialization
 from app.db import storage
-from app.services.task_service import TaskManager
+from app.services.task_service import TaskManager, OptimizeInputs
 from app.services.optimizer_service import optimize_prompt, generate_optimize_context, multi_strategy_optimize
-from pydantic import BaseModel
+from app.services.optimization_status_service import optimization_status
+from app.services import optimization_cache_service
+from pydantic import BaseModel, ConfigDict, ValidationError
 from loguru import logger
 from starlette.concurrency import run_in_threadpool
 
+# 不设置 default_response_class：FastAPI >= 0.130 对声明了返回类型的接口
+# 直接由 Pydantic (Rust) 序列化为 JSON 字节，跳过 jsonable_encoder + json.dumps；
+# 自定义响应类（如 ORJSONResponse）反而会退回到慢路径
 router = APIRouter(prefix="/projects", tags=["projects"])
 tm = TaskManager()
 
+# 删除项目确认密码：导入时读取一次，避免每次请求都重新解析 .env 文件
+# (.env 由 main.py 在导入路由模块之前加载)
+PROJECT_DELETE_PASSWORD: Optional[str] = os.getenv("PROJECT_DELETE_PASSWORD")
+# 预先编码，请求路径上只需编码提交的密码
+_PROJECT_DELETE_PASSWORD_BYTES: bytes = (PROJECT_DELETE_PASSWORD or "").encode("utf-8")
+
+# 全服务同时运行的优化任务上限，超出的任务在后台事件循环中排队
+MAX_CONCURRENT_OPTIMIZATIONS: int = int(os.getenv("MAX_CONCURRENT_OPTIMIZATIONS", "4"))
+_optimize_slots = asyncio.Semaphore(MAX_CONCURRENT_OPTIMIZATIONS)
+
 
 @router.get("")
 async def list_projects() -> List[Dict[str, Any]]:
@@ -18,7 +39,7 @@ async def list_projects() -> List[Dict[str, Any]]:
     获取项目列表
     :return: 项目列表
     """
-    projects = storage.get_projects()
+    projects = await run_in_threadpool(storage.get_projects)
     logger.debug(f"Fetched {len(projects)} projects")
     return projects
 
@@ -52,24 +73,18 @@ async def delete_project(project_id: str, password: str = Form(...)) -> Dict[str
     :param password: 删除确认密码
     :return: 操作结果
     """
-    import os
-    from dotenv import load_dotenv
-    
     logger.warning(f"Attempting to delete project: {project_id}")
 
-    # 重新加载环境变量以确保获取最新值
-    load_dotenv(override=True)
-    expected_password = os.getenv("PROJECT_DELETE_PASSWORD")
-    
-    if not expected_password:
+    if not PROJECT_DELETE_PASSWORD:
         logger.error("Project delete password not configured")
         raise HTTPException(status_code=500, detail="Server configuration error: Delete password not set")
         
-    if password != expected_password:
+    # 使用恒定时间比较，避免通过响应耗时推测密码
+    if not hmac.compare_digest(password.encode("utf-8"), _PROJECT_DELETE_PASSWORD_BYTES):
         logger.warning(f"Delete project failed: Invalid password for {project_id}")
         raise HTTPException(status_code=403, detail="Invalid password")
         
-    success = storage.delete_project(project_id)
+    success = await run_in_threadpool(storage.delete_project, project_id)
     if not success:
         logger.warning(f"Delete project failed: Project {project_id} not found")
         raise HTTPException(status_code=404, detail="Project not found")
@@ -103,7 +118,7 @@ async def get_project(project_id: str) -> Dict[str, Any]:
     :param project_id: 项目ID
     :return: 项目详情
     """
-    p = storage.get_project(project_id)
+    p = await run_in_threadpool(storage.get_project, project_id)
     if not p:
         logger.warning(f"Get project failed: {project_id} not found")
         raise HTTPException(status_code=404, detail="Project not found")
@@ -118,7 +133,7 @@ async def delete_iteration(project_id: str, timestamp: str) -> Dict[str, str]:
     :return: 操作状态
     """
     logger.info(f"Deleting iteration for project {project_id}, timestamp: {timestamp}")
-    success = storage.delete_project_iteration(project_id, timestamp)
+    success = await run_in_threadpool(storage.delete_project_iteration, project_id, timestamp)
     if not success:
         logger.warning(f"Delete iteration failed: {timestamp} not found in project {project_id}")
         raise HTTPException(status_code=404, detail="Iteration not found")
@@ -128,8 +143,12 @@ async def delete_iteration(project_id: str, timestamp: str) -> Dict[str, str]:
 class ProjectUpdateRequest(BaseModel):
     """
     项目更新请求体模型
-    使用 JSON body 替代 Form data 以绕过 1MB multipart 限制
+    使用 JSON body 替代 Form data 以绕过 1MB multipart 限制；
+    整个请求体由 pydantic-core 一次性解析校验，非法 JSON 直接返回 422
     """
+    # 兼容旧数据：validation_limit 等字段可能以数字形式回传，统一转为字符串保存
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
     current_prompt: str
     name: Optional[str] = None
     query_col: Optional[str] = None
@@ -149,10 +168,61 @@ class ProjectUpdateRequest(BaseModel):
     config: Optional[Dict[str, Any]] = None  # 允许直接传入完整配置
 
 
-@router.put("/{project_id}")
+# update_project 中按字段名分派的更新规则
+# 非 None 时直接写入 config 的字段（dict 类字段已由 Pydantic 解析，无需 json.loads）
+_CONFIG_FIELDS = (
+    "query_col", "target_col", "extract_field",
+    "file_info", "auto_iterate_config", "multi_round_config", "multi_round_file_info"
+)
+# 非 None 时写入 config、空字符串表示清除的字段
+_CONFIG_NULLABLE_FIELDS = ("reason_col", "validation_limit")
+# 非 None 时写入项目顶层的字段：(请求字段, 存储字段)
+_PROJECT_FIELDS = (
+    ("iterations", "iterations"),
+    ("model_cfg", "model_config"),
+    ("optimization_model_config", "optimization_model_config"),
+    ("optimization_prompt", "optimization_prompt"),
+)
+
+
+async def _parse_project_update(request: Request) -> ProjectUpdateRequest:
+    """
+    解析项目更新请求体
+    
+    FastAPI 默认先用标准库 json.loads 解析请求体，再由 Pydantic 逐字段校验 Python 对象；
+    请求体可能携带完整的迭代历史，这里改为 model_validate_json 在 pydantic-core 中一次完成解析与校验。
+    :param request: 请求对象
+    :return: 项目更新请求体
+    :raises RequestValidationError: JSON 非法或字段校验失败（返回 422）
+    """
+    raw_body = await request.body()
+    try:
+        return ProjectUpdateRequest.model_validate_json(raw_body)
+    except ValidationError as e:
+        # 与 FastAPI 默认的请求体校验错误保持一致：loc 以 "body" 开头，body 为解析后的请求体
+        # （JSON 非法时为原始文本），仅在出错时才额外解析一次
+        try:
+            body = serialization.loads(raw_body)
+        except serialization.JSONDecodeError:
+            body = raw_body.decode("utf-8", errors="replace")
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)
+        ], body=body)
+
+
+@router.put(
+    "/{project_id}",
+    # 请求体由依赖自行解析，需手动声明以保留 OpenAPI 文档中的请求体结构
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": ProjectUpdateRequest.model_json_schema()}}
+        }
+    }
+)
 async def update_project(
     project_id: str,
-    body: ProjectUpdateRequest
+    body: ProjectUpdateRequest = Depends(_parse_project_update)
 ) -> Dict[str, Any]:
     """
     保存/更新项目配置 (JSON Body 版本)
@@ -163,77 +233,40 @@ async def update_project(
     """
     logger.info(f"Update project {project_id} - Prompt len: {len(body.current_prompt) if body.current_prompt else 0}")
     
-    # 获取现有项目以进行增量更新
-    existing_project = storage.get_project(project_id)
-    if not existing_project:
-        logger.warning(f"Update failed: Project {project_id} not found")
-        raise HTTPException(status_code=404, detail="Project not found")
-        
-    # 获取现有 config，如果没有则为空字典
-    config = existing_project.get("config", {})
+    # 只收集需要变更的 config 字段，由存储层在同一事务内合并到现有 config（一次读取、一次写入）
+    config: Dict[str, Any] = {}
 
     # 如果请求中直接提供了完整 config，则合并
     if body.config is not None:
         config.update(body.config)
 
     # 仅当参数不为 None 时才更新 config
-    if body.query_col is not None:
-        config["query_col"] = body.query_col
-    if body.target_col is not None:
-        config["target_col"] = body.target_col
-    if body.reason_col is not None:
-        # 如果是空字符串，表示清除
-        config["reason_col"] = body.reason_col if body.reason_col != "" else None
-    if body.extract_field is not None:
-        config["extract_field"] = body.extract_field
-
-    # 处理 validation_limit
-    if body.validation_limit is not None:
-        config["validation_limit"] = body.validation_limit if body.validation_limit != "" else None
-
-    # 文件信息 (已经是 dict，无需解析)
-    if body.file_info is not None:
-        config["file_info"] = body.file_info
-
-    # 自动迭代配置 (已经是 dict)
-    if body.auto_iterate_config is not None:
-        config["auto_iterate_config"] = body.auto_iterate_config
-
-    # 多轮验证配置
-    if body.multi_round_config is not None:
-        config["multi_round_config"] = body.multi_round_config
-
-    # 多轮验证文件信息
-    if body.multi_round_file_info is not None:
-        config["multi_round_file_info"] = body.multi_round_file_info
+    for field in _CONFIG_FIELDS:
+        value = getattr(body, field)
+        if value is not None:
+            config[field] = value
+    # 空字符串表示清除
+    for field in _CONFIG_NULLABLE_FIELDS:
+        value = getattr(body, field)
+        if value is not None:
+            config[field] = value if value != "" else None
     
     updates: Dict[str, Any] = {
         "current_prompt": body.current_prompt,
-        "config": config
+        "config_patch": config
     }
     
-    # 迭代历史 (已经是 list)
-    if body.iterations is not None:
-        updates["iterations"] = body.iterations
-    
-    # 模型配置 (校验模型)
-    if body.model_cfg is not None:
-        updates["model_config"] = body.model_cfg
-            
-    # 优化模型配置
-    if body.optimization_model_config is not None:
-        updates["optimization_model_config"] = body.optimization_model_config
-            
-    # 优化提示词
-    if body.optimization_prompt is not None:
-        updates["optimization_prompt"] = body.optimization_prompt
+    for field, key in _PROJECT_FIELDS:
+        value = getattr(body, field)
+        if value is not None:
+            updates[key] = value
 
     if body.name:
         updates["name"] = body.name
     
     result = await run_in_threadpool(storage.update_project, project_id, updates)
     if not result:
-        logger.error(f"Update failed: Storage returned None for project {project_id}")
+        logger.warning(f"Update failed: Project {project_id} not found")
         raise HTTPException(status_code=404, detail="Project not found")
         
     logger.info(f"Project updated successfully: {project_id}")
@@ -246,63 +279,74 @@ async def get_project_tasks(project_id: str) -> Dict[str, List[Dict[str, Any]]]:
     :param project_id: 项目ID
     :return: 任务列表
     """
-    tasks = storage.get_project_tasks(project_id)
+    tasks = await run_in_threadpool(storage.get_project_tasks, project_id)
     logger.debug(f"Fetched {len(tasks)} tasks for project {project_id}")
     return {"tasks": tasks}
 
 
-# 优化任务状态存储
-# 格式: {project_id: {"status": "running"|"completed"|"failed", "message": "...", "result": {...}}}
-optimization_status: Dict[str, Dict[str, Any]] = {}
-
-def background_optimize_task(
+async def background_optimize_task(
     project_id: str, 
     task_id: str, 
     strategy: str, 
     model_config: Dict[str, Any], 
     optimization_prompt: str, 
     project: Dict[str, Any], 
-    task_status: Dict[str, Any], 
-    verification_config: Optional[Dict[str, Any]] = None
+    task_inputs: OptimizeInputs, 
+    verification_config: Optional[Dict[str, Any]] = None,
+    force: bool = False
 ) -> None:
     """
-    后台优化任务
+    后台优化任务（在共享的后台事件循环中运行）
     :param project_id: 项目ID
     :param task_id: 任务ID
     :param strategy: 优化策略
     :param model_config: 模型配置
     :param optimization_prompt: 优化提示词
     :param project: 项目信息
-    :param task_status: 任务状态(包含errors)
+    :param task_inputs: 优化所需的任务数据(errors/results/统计)
     :param verification_config: 验证配置
+    :param force: 是否跳过优化结果缓存，强制重新优化（新结果仍会写入缓存）
     """
-    import asyncio
-    import traceback
-
     try:
-        # 更新状态为运行中
-        optimization_status[project_id] = {
-            "status": "running",
-            "message": "正在优化中...",
-            "start_time": datetime.now().isoformat()
-        }
+        # 状态已由接口原子地置为 running，这里仅更新提示信息
+        optimization_status.update(project_id, message="正在优化中...")
         
         # 初始化验证状态变量
         validation_failed = False
         failure_reason = ""
         
-        # 计算总样本数
-        total_count = len(task_status.get("results", []))
-        errors = task_status.get("errors", [])
+        # 总样本数与准确率已在 get_task_for_optimize 中计算
+        errors = task_inputs.errors
+        total_count = task_inputs.results_count
+        current_accuracy = task_inputs.accuracy
         
         diagnosis = None
         applied_strategies = []
         new_prompt = project["current_prompt"]
+
+        # 提取 selected_modules (如果启用了标准模块优化)
+        selected_modules = None
+        if model_config.get("enable_standard_module", False):
+            selected_modules = model_config.get("selected_modules", [])
+
+        # 输入完全相同的重试直接复用上一次的优化结果，跳过 LLM 调用；force 时强制重新优化
+        cache_key = optimization_cache_service.make_optimization_key(
+            project_id, task_id, strategy,
+            project["current_prompt"], errors, model_config, optimization_prompt,
+            verification_config, selected_modules
+        )
+        cached = None if force else optimization_cache_service.get_cached_optimization(cache_key)
         
-        if strategy == "simple":
+        if cached is not None:
+            logger.info(f"Optimization cache hit for project {project_id}, task {task_id}")
+            new_prompt = cached["new_prompt"]
+            applied_strategies = cached["applied_strategies"]
+            diagnosis = cached["diagnosis"]
+        elif strategy == "simple":
             # 简单优化
-            # optimize_prompt 是同步函数
-            new_prompt = optimize_prompt(
+            # optimize_prompt 是同步函数，放到线程池执行，避免阻塞后台事件循环
+            new_prompt = await asyncio.to_thread(
+                optimize_prompt,
                 project["current_prompt"],
                 errors,
                 model_config,
@@ -311,39 +355,25 @@ def background_optimize_task(
             applied_strategies = [{"name": "Simple Optimization (Quick Mode)", "success": True}]
         else:
             # 多策略优化 (需要 async 运行)
-            dataset = task_status.get("results", [])
+            dataset = task_inputs.results
             
-            # 定义停止回调
-            def check_stop():
-                status = optimization_status.get(project_id, {})
-                return status.get("should_stop", False) or status.get("status") == "stopped"
-
-            # 提取 selected_modules (如果启用了标准模块优化)
-            selected_modules = None
-            if model_config.get("enable_standard_module", False):
-                selected_modules = model_config.get("selected_modules", [])
-
-            # 创建独立的事件循环，避免与 uvicorn 主循环冲突
-            # 注意：asyncio.run() 会创建新循环并在完成后关闭，但在后台线程中可能导致死锁
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                result = loop.run_until_complete(multi_strategy_optimize(
-                    project["current_prompt"], 
-                    errors, 
-                    model_config,
-                    dataset=dataset,
-                    total_count=total_count,
-                    strategy_mode="auto",
-                    max_strategies=model_config.get("max_strategy_count", 3),
-                    project_id=project_id,
-                    should_stop=check_stop,
-                    verification_config=verification_config,
-                    selected_modules=selected_modules,
-                    on_progress=lambda msg: optimization_status[project_id].update({"message": msg})
-                ))
-            finally:
-                loop.close()
+            # 停止回调：在优化循环中被高频调用，直接使用 Event.is_set（单次属性读取，无锁、无字典查找）
+            check_stop = optimization_status.stop_event(project_id).is_set
+
+            result = await multi_strategy_optimize(
+                project["current_prompt"], 
+                errors, 
+                model_config,
+                dataset=dataset,
+                total_count=total_count,
+                strategy_mode="auto",
+                max_strategies=model_config.get("max_strategy_count", 3),
+                project_id=project_id,
+                should_stop=check_stop,
+                verification_config=verification_config,
+                selected_modules=selected_modules,
+                on_progress=lambda msg: optimization_status.update(project_id, message=msg)
+            )
             new_prompt = result.get("optimized_prompt", project["current_prompt"])
             applied_strategies = result.get("applied_strategies", [])
             diagnosis = result.get("diagnosis")
@@ -353,22 +383,16 @@ def background_optimize_task(
             failure_reason = result.get("failure_reason", "")
             
         # 检查是否被停止
-        if optimization_status.get(project_id, {}).get("should_stop"):
-             optimization_status[project_id] = {
+        if optimization_status.should_stop(project_id):
+            optimization_status.set(project_id, {
                 "status": "stopped",
                 "message": "优化已手动停止"
-            }
-             return
+            })
+            return
 
         # 保存一轮迭代
-        dataset_path = task_status.get("file_path")
-        dataset_name = None
-        if dataset_path:
-            import os
-            dataset_name = os.path.basename(dataset_path)
-
-        # 计算当前准确率
-        current_accuracy = (len(task_status["results"]) - len(task_status["errors"])) / len(task_status["results"]) if task_status.get("results") else 0
+        dataset_path = task_inputs.file_path
+        dataset_name = os.path.basename(dataset_path) if dataset_path else None
 
         iteration_record = {
             # 兼容旧字段
@@ -399,52 +423,28 @@ def background_optimize_task(
         # from loguru import logger
         logger.info(f"Preparing to save iteration for project {project_id}, Task ID: {task_id}")
 
-        # 重新获取项目以避免并发覆盖 (虽然这里还是有风险，但比直接用旧对象好)
-        curr_project = storage.get_project(project_id)
-        if curr_project:
-            # 确保 iterations 字段存在
-            if "iterations" not in curr_project:
-                curr_project["iterations"] = []
-            
-            # 回填上一个迭代记录的 accuracy_after
-            if len(curr_project["iterations"]) > 0:
-                last_iteration = curr_project["iterations"][-1]
-                # 只有当上一轮的 accuracy_after 为 None 时才回填
-                if last_iteration.get("accuracy_after") is None:
-                    last_iteration["accuracy_after"] = current_accuracy
-                    logger.info(f"Backfilled accuracy_after={current_accuracy:.2%} to previous iteration")
-            
-            # 设置版本号
-            iteration_record["version"] = len(curr_project["iterations"]) + 1
-                
-            curr_project["iterations"].append(iteration_record)
-            
-            # 只有验证通过时才更新 current_prompt
-            if not validation_failed:
-                curr_project["current_prompt"] = new_prompt
-                logger.info(f"Validation passed, updating current_prompt to: {new_prompt[:50]}...")
-            else:
-                logger.warning(f"Validation failed (reason: {failure_reason}), NOT updating current_prompt.")
-            
-            projects = storage.get_projects()
-            project_found = False
-            for idx, p in enumerate(projects):
-                if p["id"] == project_id:
-                    projects[idx] = curr_project
-                    project_found = True
-                    break
-            
-            if project_found:
-                storage.save_projects(projects)
-                logger.info(f"Successfully saved projects with new iteration. Iteration count: {len(curr_project['iterations'])}")
-            else:
-                logger.error(f"Project {project_id} not found in projects list during save!")
+        # 只有验证通过时才更新 current_prompt
+        if not validation_failed:
+            logger.info(f"Validation passed, updating current_prompt to: {new_prompt[:50]}...")
+        else:
+            logger.warning(f"Validation failed (reason: {failure_reason}), NOT updating current_prompt.")
+
+        # 仅追加本项目的一条迭代记录（同时回填上一轮 accuracy_after），不再全量读写所有项目
+        version = await asyncio.to_thread(
+            storage.append_project_iteration,
+            project_id,
+            iteration_record,
+            current_prompt=None if validation_failed else new_prompt,
+            backfill_accuracy=current_accuracy
+        )
+        if version is not None:
+            logger.info(f"Successfully saved new iteration V{version} for project {project_id}")
         else:
             logger.error(f"Could not retrieve project {project_id} from storage for saving iteration.")
         
         # 如果验证失败，返回失败状态
         if validation_failed:
-            optimization_status[project_id] = {
+            optimization_status.set(project_id, {
                 "status": "failed",
                 "message": failure_reason,
                 "result": {
@@ -454,26 +454,47 @@ def background_optimize_task(
                     "validation_failed": True,
                     "failure_reason": failure_reason
                 }
-            }
+            })
             return
             
         # 更新状态为完成
-        optimization_status[project_id] = {
+        result = {
+            "new_prompt": new_prompt,
+            "applied_strategies": applied_strategies,
+            "diagnosis": diagnosis
+        }
+        optimization_cache_service.store_optimization(cache_key, project_id, result)
+        optimization_status.set(project_id, {
             "status": "completed",
             "message": "优化完成",
-            "result": {
-                "new_prompt": new_prompt,
-                "applied_strategies": applied_strategies,
-                "diagnosis": diagnosis
-            }
-        }
+            "result": result
+        })
         
     except Exception as e:
         logger.exception(f"Optimization task failed for project {project_id}")
-        optimization_status[project_id] = {
+        optimization_status.set(project_id, {
             "status": "failed",
             "message": f"优化失败: {str(e)}"
-        }
+        })
+
+async def _run_with_optimize_slot(project_id: str, coro: Coroutine[Any, Any, None]) -> None:
+    """
+    在全局并发上限内执行优化协程，超出上限时排队等待
+    
+    所有优化任务都运行在同一个后台事件循环中，因此可以共用一个 asyncio.Semaphore。
+    :param project_id: 项目ID
+    :param coro: 优化协程
+    """
+    async with _optimize_slots:
+        # 排队期间被停止的任务不再执行
+        if optimization_status.should_stop(project_id):
+            coro.close()
+            optimization_status.set(project_id, {
+                "status": "stopped",
+                "message": "优化已手动停止"
+            })
+            return
+        await coro
 
 @router.post("/{project_id}/optimize/stop")
 async def stop_optimization(project_id: str) -> Dict[str, str]:
@@ -482,10 +503,7 @@ async def stop_optimization(project_id: str) -> Dict[str, str]:
     :param project_id: 项目ID
     :return: 操作状态
     """
-    if project_id in optimization_status and optimization_status[project_id]["status"] == "running":
-        optimization_status[project_id]["should_stop"] = True
-        optimization_status[project_id]["status"] = "stopped"
-        optimization_status[project_id]["message"] = "正在停止..."
+    if optimization_status.request_stop(project_id):
         logger.info(f"Stopping optimization for project {project_id}")
         return {"status": "stopping"}
     return {"status": "not_running"}
@@ -494,34 +512,30 @@ async def stop_optimization(project_id: str) -> Dict[str, str]:
 async def optimize_project_prompt(
     project_id: str, 
     task_id: str, 
-    strategy: str = "multi"
+    strategy: str = "multi",
+    force: bool = False
 ) -> Dict[str, str]:
     """
     启动异步优化任务
     :param project_id: 项目ID
     :param task_id: 任务ID
     :param strategy: 策略名称 (默认: multi)
+    :param force: 是否跳过优化结果缓存强制重新优化（LLM 结果不确定，用户主动重试时使用）
     :return: 启动状态
     """
-    import threading
-    
     logger.info(f"Starting optimization for project {project_id}, task {task_id}, strategy {strategy}")
 
-    project = storage.get_project(project_id)
-    # 优化任务需要 errors 数据
-    task_status = tm.get_task_status(task_id, include_results=True)
+    # 项目与任务（已完成任务的优化输入有缓存）相互独立，在线程池中并发读取
+    # 简单优化只用到 errors 与计数，不加载完整 results
+    project, task_inputs = await asyncio.gather(
+        asyncio.to_thread(storage.get_project, project_id),
+        asyncio.to_thread(tm.get_task_for_optimize, task_id, strategy != "simple")
+    )
     
-    if not project or not task_status:
+    if not project or not task_inputs:
         logger.error(f"Start optimization failed: Project {project_id} or Task {task_id} not found")
         raise HTTPException(status_code=404, detail="Project or Task not found")
     
-    # 检查是否已有正在运行的任务
-    current_status = optimization_status.get(project_id)
-    if current_status and current_status.get("status") == "running":
-        # 如果已经运行很久了(比如超过10分钟)，允许强制重新开始？暂时不处理
-        logger.warning(f"Optimization already running for project {project_id}")
-        return {"status": "running", "message": "已有优化任务正在进行中"}
-    
     # 获取优化模型配置
     model_config = project.get("optimization_model_config")
     if not model_config:
@@ -540,60 +554,111 @@ async def optimize_project_prompt(
         
     optimization_prompt_text = project.get("optimization_prompt", "")
     
-    # 启动后台线程
-    thread = threading.Thread(
-        target=background_optimize_task,
-        args=(project_id, task_id, strategy, model_config, optimization_prompt_text, project, task_status, verification_config)
-    )
-    thread.daemon = True
-    thread.start()
+    # 检查并占用项目的优化槽位（原子操作）：近乎同时到达的重复请求只有一个能通过
+    started = optimization_status.try_start(project_id, {
+        "status": "running",
+        "message": "排队中...",
+        "start_time": datetime.now().isoformat()
+    })
+    if not started:
+        # 如果已经运行很久了(比如超过10分钟)，允许强制重新开始？暂时不处理
+        logger.warning(f"Optimization already running for project {project_id}")
+        return {"status": "running", "message": "已有优化任务正在进行中"}
     
-    logger.info(f"Optimization task thread started for project {project_id}")
+    # 提交到共享的后台事件循环，不再为每个请求创建线程和事件循环
+    background_loop.submit(_run_with_optimize_slot(project_id, background_optimize_task(
+        project_id, task_id, strategy, model_config, optimization_prompt_text, project, task_inputs, verification_config,
+        force
+    )))
+    
+    logger.info(f"Optimization task submitted for project {project_id}")
     
     # 立即返回状态
     return {"status": "started", "message": "优化任务已启动"}
 
 @router.get("/{project_id}/optimize/status")
-async def get_optimization_status(project_id: str) -> Dict[str, Any]:
+async def get_optimization_status(
+    project_id: str,
+    request: Request,
+    response: Response,
+    wait_ms: int = Query(0, ge=0, le=30000, description="长轮询等待时间（毫秒），0 表示立即返回")
+) -> Dict[str, Any]:
     """
     获取优化任务状态
+    
+    纯内存读取；响应携带基于状态版本号的 ETag，轮询时状态未变化直接返回 304。
+    若携带 wait_ms 且 If-None-Match 与当前状态一致，则挂起等待状态变化或超时后再返回（长轮询）。
     :param project_id: 项目ID
+    :param request: 请求对象（读取 If-None-Match 头）
+    :param response: 响应对象（写入 ETag 头）
+    :param wait_ms: 长轮询等待时间（毫秒）
     :return: 任务状态
     """
-    status = optimization_status.get(project_id)
+    if_none_match = request.headers.get("if-none-match")
+    status, version = optimization_status.get_with_version(project_id)
+    etag = f'W/"{version}"'
+    if wait_ms and if_none_match == etag:
+        await optimization_status.wait_for_change(project_id, version, wait_ms / 1000)
+        status, version = optimization_status.get_with_version(project_id)
+        etag = f'W/"{version}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     if not status:
         return {"status": "idle"}
     return status
 
 
 @router.get("/tasks/{task_id}/dataset")
-async def download_task_dataset(task_id: str):
+async def download_task_dataset(task_id: str, request: Request):
     """
     下载任务使用的数据集
+    
+    预先获取文件 stat 供 FileResponse 复用（省去一次 exists 检查和一次 fstat），
+    并支持 If-None-Match 条件请求：数据集未变化时直接返回 304。
     :param task_id: 任务ID
+    :param request: 请求对象（读取 If-None-Match 头）
     :return: 文件流
     """
-    from fastapi.responses import FileResponse
-    import os
-    
     logger.debug(f"Dataset download requested for task {task_id}")
 
-    # 下载数据集不需要 results/errors，优化性能
-    task_status = tm.get_task_status(task_id, include_results=False)
-    if not task_status:
-        # 尝试直接从 storage 获取，防止内存中没有
-        task_status = storage.get_task_status(task_id, include_results=False)
-        
+    # 只需要 file_path：任务创建时即已落库，直接读取一行任务记录（不含 results/errors 与计数）
+    task_status = await asyncio.to_thread(storage.get_task_status, task_id)
     if not task_status:
         logger.warning(f"Download dataset failed: Task {task_id} not found")
         raise HTTPException(status_code=404, detail="Task not found")
         
     file_path = task_status.get("file_path")
-    if not file_path or not os.path.exists(file_path):
+    stat_result = None
+    if file_path:
+        try:
+            stat_result = os.stat(file_path)
+        except OSError:
+            stat_result = None
+    if stat_result is None:
         logger.warning(f"Download dataset failed: File not found for task {task_id}")
         raise HTTPException(status_code=404, detail="Dataset file not found")
         
-    return FileResponse(file_path, filename=os.path.basename(file_path))
+    # 数据集文件上传后不再修改，允许浏览器短时间内直接复用缓存
+    response = FileResponse(
+        file_path,
+        filename=os.path.basename(file_path),
+        stat_result=stat_result,
+        headers={"Cache-Control": "private, max-age=300"}
+    )
+    
+    # ETag 由 FileResponse 根据 mtime + size 生成，客户端缓存命中时返回 304
+    etag = response.headers.get("etag")
+    if etag and request.headers.get("if-none-match") == etag:
+        return Response(
+            status_code=304,
+            headers={
+                "etag": etag,
+                "last-modified": response.headers["last-modified"],
+                "cache-control": response.headers["cache-control"]
+            }
+        )
+    return response
 
 
 @router.get("/{project_id}/optimize-context")
@@ -604,18 +669,20 @@ async def get_optimize_context(project_id: str, task_id: str) -> Dict[str, Any]:
     :param task_id: 任务ID
     :return: 格式化后的优化上下文
     """
-    project = storage.get_project(project_id)
-    # 获取优化上下文需要 errors 数据
-    task_status = tm.get_task_status(task_id, include_results=True)
+    # 项目与任务（获取优化上下文只需要 errors 数据）相互独立，在线程池中并发读取
+    project, task_inputs = await asyncio.gather(
+        asyncio.to_thread(storage.get_project, project_id),
+        asyncio.to_thread(tm.get_task_for_optimize, task_id, False)
+    )
     
     if not project:
         logger.warning(f"Get optimize context failed: Project {project_id} not found")
         raise HTTPException(status_code=404, detail="Project not found")
-    if not task_status:
+    if not task_inputs:
         logger.warning(f"Get optimize context failed: Task {task_id} not found")
         raise HTTPException(status_code=404, detail="Task not found")
     
-    errors: list = task_status.get("errors", [])
+    errors: list = task_inputs.errors
     if not errors:
         logger.info(f"Get optimize context: No errors found for task {task_id}")
         raise HTTPException(status_code=400, detail="没有错误样例，无法生成优化上下文")
@@ -635,6 +702,12 @@ async def get_optimize_context(project_id: str, task_id: str) -> Dict[str, Any]:
 
 
 class NoteUpdate(BaseModel):
+    """
+    备注更新请求体模型
+    忽略多余字段、限制备注长度，实例不可变
+    """
+    model_config = ConfigDict(extra="ignore", frozen=True, str_max_length=10_000)
+
     note: str
 
 @router.put("/{project_id}/tasks/{task_id}/note")
@@ -647,7 +720,7 @@ async def update_task_note(project_id: str, task_id: str, update: NoteUpdate) ->
     :return: 更新后的备注
     """
     logger.info(f"Updating note for task {task_id}")
-    success = storage.update_task_note(task_id, update.note)
+    success = await run_in_threadpool(storage.update_task_note, task_id, update.note)
     if not success:
         logger.warning(f"Update task note failed: Task {task_id} not found")
         raise HTTPException(status_code=404, detail="Task not found")
@@ -664,7 +737,7 @@ async def update_iteration_note(project_id: str, timestamp: str, update: NoteUpd
     :return: 更新后的备注
     """
     logger.info(f"Updating note for iteration {timestamp} in project {project_id}")
-    success = storage.update_project_iteration_note(project_id, timestamp, update.note)
+    success = await run_in_threadpool(storage.update_project_iteration_note, project_id, timestamp, update.note)
     if not success:
         logger.warning(f"Update iteration note failed: {timestamp} not found in project {project_id}")
         raise HTTPException(status_code=404, detail="Iteration not found")
@@ -1,17 +1,120 @@
-from fastapi import APIRouter, Form, HTTPException
-from fastapi.responses import FileResponse
-from typing import Optional, Dict, Any, List
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from typing import Annotated, Optional, Dict, Any, List, NamedTuple, Tuple
+import io
 import os
-import json
 import pandas as pd
 from loguru import logger
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
+from starlette.concurrency import run_in_threadpool
 
+from app.core import serialization
 from app.db import storage
+from app.services import export_cache_service, export_job_service
 from app.services.task_service import TaskManager
 
+try:
+    import xlsxwriter  # noqa: F401
+    # xlsxwriter 逐行序列化，速度约为 openpyxl 的 2-3 倍且不在内存中维护完整的单元格对象树
+    # 关闭 URL 自动识别，与 openpyxl 一样按纯文本写入
+    _EXCEL_WRITER_KWARGS: Dict[str, Any] = {"engine": "xlsxwriter", "engine_kwargs": {"options": {"strings_to_urls": False}}}
+except ImportError:
+    _EXCEL_WRITER_KWARGS = {"engine": "openpyxl"}
+
+try:
+    import pyarrow  # noqa: F401
+    # Parquet 导出依赖 pyarrow（可选依赖）
+    _PARQUET_AVAILABLE = True
+except ImportError:
+    _PARQUET_AVAILABLE = False
+
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 tm = TaskManager()
 
+
+class _DatasetFileResponse(FileResponse):
+    """
+    数据集下载响应：uvicorn 不支持 pathsend 扩展，Starlette 按块读取文件发送，
+    每块都要切换一次工作线程，加大块大小（默认 64KB）以减少大文件下载的线程切换次数
+    """
+    chunk_size = 1024 * 1024
+
+
+class RoundConfig(BaseModel):
+    """
+    多轮验证的单轮配置
+    round / query_col / target_col 为必需字段，其余字段（如 rewrite_col、reason_col）原样保留
+    """
+    model_config = ConfigDict(extra="allow")
+
+    round: int
+    query_col: Optional[str]
+    target_col: Optional[str]
+
+
+# 轮次配置列表校验器：JSON 解析与字段校验由 pydantic-core 一次完成
+_ROUNDS_CONFIG_ADAPTER: TypeAdapter = TypeAdapter(Annotated[List[RoundConfig], Field(min_length=1)])
+
+
+def _parse_rounds_config(rounds_config: str) -> List[Dict[str, Any]]:
+    """
+    解析并校验轮次配置 JSON
+
+    :param rounds_config: 轮次配置 JSON 字符串
+    :return: 轮次配置字典列表
+    :raises HTTPException: JSON 非法或字段校验失败（400）
+    """
+    try:
+        rounds: List[RoundConfig] = _ROUNDS_CONFIG_ADAPTER.validate_json(rounds_config)
+    except ValidationError as e:
+        error = e.errors(include_url=False)[0]
+        logger.error(f"解析 rounds_config 失败: {error['loc']} {error['msg']}")
+        if error["type"] == "json_invalid":
+            detail = f"rounds_config JSON 格式错误: {error['msg']}"
+        elif error["type"] == "missing" and len(error["loc"]) == 2:
+            detail = f"轮次配置[{error['loc'][0]}]缺少必需字段 (round, query_col, target_col)"
+        elif error["type"] == "too_short":
+            detail = "rounds_config 必须是非空列表"
+        else:
+            loc = ".".join(str(part) for part in error["loc"])
+            detail = f"rounds_config 格式错误: {loc + ' ' if loc else ''}{error['msg']}"
+        raise HTTPException(status_code=400, detail=detail)
+    return [r.model_dump() for r in rounds]
+
+class FileProject(NamedTuple):
+    """任务提交时解析出的数据文件路径与项目配置"""
+    file_path: str
+    project: Dict[str, Any]
+
+
+async def resolve_file_and_project(
+    project_id: str = Form(...),
+    file_id: str = Form(...)
+) -> FileProject:
+    """
+    解析表单中的文件ID和项目ID（启动任务接口共用的依赖）
+    
+    文件路径查找与项目读取都走 storage 层的索引/缓存，在线程池中执行。
+    
+    :param project_id: 项目ID
+    :param file_id: 文件ID
+    :return: FileProject(文件路径, 项目配置)
+    :raises HTTPException: 文件或项目不存在（404）
+    """
+    # 查找文件路径
+    file_path = await run_in_threadpool(storage.get_file_path, file_id)
+    if not file_path:
+        logger.error(f"文件未找到: file_id={file_id}")
+        raise HTTPException(status_code=404, detail="文件未找到")
+    
+    # 获取项目配置
+    project = await run_in_threadpool(storage.get_project, project_id)
+    if not project:
+        logger.error(f"项目未找到: project_id={project_id}")
+        raise HTTPException(status_code=404, detail="项目未找到")
+    return FileProject(file_path, project)
+
+
 @router.post("/start")
 async def start_task(
     project_id: str = Form(...),
@@ -22,7 +125,8 @@ async def start_task(
     prompt: str = Form(...),
     extract_field: Optional[str] = Form(None),
     original_filename: Optional[str] = Form(None),
-    validation_limit: Optional[int] = Form(None)
+    validation_limit: Optional[int] = Form(None),
+    fp: FileProject = Depends(resolve_file_and_project)
 ) -> Dict[str, str]:
     """
     启动一个新的优化任务
@@ -38,27 +142,12 @@ async def start_task(
     :param extract_field: 提取字段（可选）
     :param original_filename: 原始文件名（可选）
     :param validation_limit: 验证集数量限制（可选）
+    :param fp: 解析出的文件路径与项目配置
     :return: 包含任务ID的字典
     :raises HTTPException: 如果文件或项目不存在，或配置不正确
     """
     logger.info(f"收到启动任务请求: project_id={project_id}, file_id={file_id}")
-    
-    # 查找文件路径
-    file_path = None
-    for f in os.listdir(storage.DATA_DIR):
-        if f.startswith(file_id):
-            file_path = os.path.join(storage.DATA_DIR, f)
-            break
-    
-    if not file_path:
-        logger.error(f"文件未找到: file_id={file_id}")
-        raise HTTPException(status_code=404, detail="文件未找到")
-        
-    # 获取项目配置
-    project = storage.get_project(project_id)
-    if not project:
-        logger.error(f"项目未找到: project_id={project_id}")
-        raise HTTPException(status_code=404, detail="项目未找到")
+    file_path, project = fp
         
     model_config = project.get("model_config")
     # 检查是否为接口验证模式
@@ -70,7 +159,8 @@ async def start_task(
         raise HTTPException(status_code=400, detail="请先在项目设置中配置模型参数(API Key)")
 
     try:
-        task_id = tm.create_task(
+        task_id = await run_in_threadpool(
+            tm.create_task,
             project_id, 
             file_path, 
             query_col, 
@@ -99,7 +189,8 @@ async def start_multi_round_task(
     response_extract_field: str = Form(...),
     original_filename: Optional[str] = Form(None),
     validation_limit: Optional[int] = Form(None),
-    api_config: Optional[str] = Form(None)
+    api_config: Optional[str] = Form(None),
+    fp: FileProject = Depends(resolve_file_and_project)
 ) -> Dict[str, str]:
     """
     启动多轮验证任务
@@ -116,59 +207,30 @@ async def start_multi_round_task(
     :param validation_limit: 验证数量限制（可选）
     :param api_config: 自定义 API 配置 JSON 字符串（可选）
         格式: {"api_url": "...", "api_headers": "{}", "api_timeout": 60, "request_template": "...", "concurrency": 5}
+    :param fp: 解析出的文件路径与项目配置
     :return: 包含任务ID的字典
     :raises HTTPException: 如果文件或项目不存在，或配置不正确
     """
     logger.info(f"收到多轮验证任务请求: project_id={project_id}, file_id={file_id}")
 
-    # 解析轮次配置
-    try:
-        parsed_rounds_config: List[Dict[str, Any]] = json.loads(rounds_config)
-        if not isinstance(parsed_rounds_config, list) or len(parsed_rounds_config) == 0:
-            raise ValueError("rounds_config 必须是非空列表")
-    except json.JSONDecodeError as e:
-        logger.error(f"解析 rounds_config 失败: {e}")
-        raise HTTPException(status_code=400, detail=f"rounds_config JSON 格式错误: {e}")
-
-    # 验证轮次配置：每轮都需要 query_col 和 target_col
-    for idx, cfg in enumerate(parsed_rounds_config):
-        if "round" not in cfg or "query_col" not in cfg or "target_col" not in cfg:
-            raise HTTPException(
-                status_code=400,
-                detail=f"轮次配置[{idx}]缺少必需字段 (round, query_col, target_col)"
-            )
+    # 解析并校验轮次配置：每轮都需要 round、query_col 和 target_col
+    parsed_rounds_config = _parse_rounds_config(rounds_config)
 
     # 解析 API 配置
     parsed_api_config: Optional[Dict[str, Any]] = None
     if api_config:
         try:
-            parsed_api_config = json.loads(api_config)
+            parsed_api_config = serialization.loads(api_config)
             if not isinstance(parsed_api_config, dict):
                 raise ValueError("api_config 必须是对象")
             # 验证必需字段
             if not parsed_api_config.get("api_url"):
                 raise ValueError("api_config.api_url 不能为空")
-        except json.JSONDecodeError as e:
+        except serialization.JSONDecodeError as e:
             logger.error(f"解析 api_config 失败: {e}")
             raise HTTPException(status_code=400, detail=f"api_config JSON 格式错误: {e}")
 
-    # 查找文件路径
-    file_path = None
-    for f in os.listdir(storage.DATA_DIR):
-        if f.startswith(file_id):
-            file_path = os.path.join(storage.DATA_DIR, f)
-            break
-
-    if not file_path:
-        logger.error(f"文件未找到: file_id={file_id}")
-        raise HTTPException(status_code=404, detail="文件未找到")
-
-    # 获取项目配置
-    project = storage.get_project(project_id)
-    if not project:
-        logger.error(f"项目未找到: project_id={project_id}")
-        raise HTTPException(status_code=404, detail="项目未找到")
-
+    file_path, project = fp
     model_config = project.get("model_config", {})
 
     # 如果没有提供自定义 API 配置，则需要检查项目的模型配置
@@ -182,7 +244,8 @@ async def start_multi_round_task(
             )
 
     try:
-        task_id = tm.create_multi_round_task(
+        task_id = await run_in_threadpool(
+            tm.create_multi_round_task,
             project_id=project_id,
             file_path=file_path,
             prompt=prompt,
@@ -200,26 +263,67 @@ async def start_multi_round_task(
         logger.exception(f"启动多轮验证任务失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"启动任务失败: {str(e)}")
 
+@router.get("/queue")
+async def get_task_queue() -> Dict[str, Any]:
+    """
+    查看任务调度状态（正在执行的任务与等待队列）
+    
+    :return: {"max_concurrent", "running", "queued": [{"task_id", "priority", "position"}]}
+    """
+    return tm.get_queue_status()
+
+
 @router.get("/{task_id}")
 async def get_task_status(
     task_id: str,
-    include_results: bool = True
+    request: Request,
+    response: Response,
+    include_results: bool = Query(False, deprecated=True)
 ) -> Dict[str, Any]:
     """
     获取任务状态
     
+    响应携带 ETag（由任务状态、进度与结果数计算），轮询时任务未变化直接返回 304，
+    无需加载和序列化完整结果。
+    
     :param task_id: 任务ID
-    :param include_results: 是否包含完整的 results 和 errors 数据 (默认 True 以保持兼容)
+    :param request: 请求对象（读取 If-None-Match 头）
+    :param response: 响应对象（写入 ETag 头）
+    :param include_results: 是否包含完整的 results 和 errors 数据（默认 False，仅返回计数；需要明细时显式传 true）。
+                            已废弃：完整结果请使用 /{task_id}/results.ndjson 流式获取
     :return: 任务状态详情
     :raises HTTPException: 如果任务未找到
     """
+    # 先取版本再取状态：两者之间任务有更新时，新内容配旧 ETag，下次轮询仍会拿到完整响应
+    version = await run_in_threadpool(tm.get_task_version, task_id)
+    if version is None:
+        logger.warning(f"获取任务状态失败（未找到）: task_id={task_id}")
+        raise HTTPException(status_code=404, detail="任务未找到")
+    etag = f'W/"{version}-{int(include_results)}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
     # 获取任务状态
-    status = tm.get_task_status(task_id, include_results=include_results)
+    status = await run_in_threadpool(tm.get_task_status, task_id, include_results=include_results)
     if not status:
         logger.warning(f"获取任务状态失败（未找到）: task_id={task_id}")
         raise HTTPException(status_code=404, detail="任务未找到")
+    response.headers["ETag"] = etag
     return status
 
+@router.get("/{task_id}/summary")
+async def get_task_summary(task_id: str, request: Request, response: Response) -> Dict[str, Any]:
+    """
+    获取任务进度摘要（不含 results/errors，仅含计数），供只需要进度的界面轮询
+    
+    :param task_id: 任务ID
+    :param request: 请求对象（读取 If-None-Match 头）
+    :param response: 响应对象（写入 ETag 头）
+    :return: 任务状态摘要
+    :raises HTTPException: 如果任务未找到
+    """
+    return await get_task_status(task_id, request, response, include_results=False)
+
 @router.get("/{task_id}/results")
 async def get_task_results(
     task_id: str,
@@ -239,11 +343,29 @@ async def get_task_results(
     :return: 分页结果
     """
     # 验证任务是否存在
-    status = tm.get_task_status(task_id, include_results=False)
+    status = await run_in_threadpool(tm.get_task_status, task_id, include_results=False)
     if not status:
         raise HTTPException(status_code=404, detail="任务未找到")
 
-    return tm.get_task_results(task_id, page, page_size, type, search)
+    return await run_in_threadpool(tm.get_task_results, task_id, page, page_size, type, search)
+
+@router.get("/{task_id}/results.ndjson")
+async def stream_task_results(task_id: str) -> StreamingResponse:
+    """
+    以 NDJSON（每行一个 JSON 对象）流式返回任务的全部结果
+    
+    逐条序列化并发送，不在内存中物化完整的 results 列表与 JSON 文档，内存占用与结果数无关。
+    
+    :param task_id: 任务ID
+    :return: application/x-ndjson 流式响应
+    :raises HTTPException: 如果任务未找到
+    """
+    results = await run_in_threadpool(tm.iter_results, task_id)
+    if results is None:
+        raise HTTPException(status_code=404, detail="任务未找到")
+    # 同步生成器由 StreamingResponse 在线程池中迭代，数据库分批读取不会阻塞事件循环
+    lines = (serialization.dumps(r) + "\n" for r in results)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
 
 @router.post("/{task_id}/pause")
 async def pause_task(task_id: str) -> Dict[str, str]:
@@ -305,98 +427,235 @@ async def delete_task_endpoint(task_id: str) -> Dict[str, str]:
     :raises HTTPException: 如果任务未找到
     """
     logger.info(f"请求删除任务: task_id={task_id}")
-    if storage.delete_task(task_id):
+    if await run_in_threadpool(storage.delete_task, task_id):
         return {"status": "success"}
         
     logger.warning(f"删除任务失败（未找到）: task_id={task_id}")
     raise HTTPException(status_code=404, detail="任务未找到")
 
-@router.get("/{task_id}/export")
-async def export_task_results(task_id: str) -> FileResponse:
+def _results_frame(status: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.Series]:
     """
-    导出任务结果
+    将任务结果构建为 DataFrame（优先使用意图干预库中的原因），并给出成功结果的掩码
     
-    将任务的成功和失败结果导出为 Excel 文件。
+    :param status: 包含完整 results 的任务状态
+    :return: (结果 DataFrame, 成功行的布尔掩码)
+    """
+    # 获取所有结果
+    results = status.get("results", [])
+    
+    # --- 增强原因数据 (优先使用 Reason 库, 按 file_id 版本筛选) ---
+    project_id = status.get("project_id")
+    file_id = status.get("file_id")  # 获取任务关联的文件版本
+    reason_map: Dict[str, Any] = {}
+    if project_id:
+        try:
+            # 获取原因映射 (按 file_id 版本筛选)
+            from app.services import intervention_service
+            reason_map = intervention_service.get_intervention_map(project_id, file_id=file_id)
+            logger.debug("Enriched results with {} reasons from file_id={}", len(reason_map), file_id)
+        except Exception as e:
+            logger.error(f"Failed to enrich results with reasons: {e}")
+    # --------------------------------------
+    
+    # 整体构建一个 DataFrame，原因增强与成功/失败分离均按列向量化完成，不逐行复制字典
+    df = pd.DataFrame(results)
+    if reason_map and "query" in df.columns:
+        # 如果库中有原因，优先使用库中的
+        matched = df["query"].isin(reason_map.keys())
+        if matched.any():
+            fallback = df["reason"] if "reason" in df.columns else None
+            df["reason"] = df["query"].map(reason_map).where(matched, fallback)
+    if "is_correct" in df.columns:
+        # 与 bool(r.get("is_correct")) 一致：缺失值视为失败
+        success_mask = df["is_correct"].fillna(False).map(bool).astype(bool)
+    else:
+        success_mask = pd.Series(False, index=df.index)
+    return df, success_mask
+
+
+def _build_results_excel(status: Dict[str, Any]) -> Tuple[io.BytesIO, int, Any]:
+    """
+    将任务结果（优先使用意图干预库中的原因）生成 Excel 文件（内存中，不落盘）
+    
+    :param status: 包含完整 results 的任务状态
+    :return: (已定位到开头的 Excel 字节流, 已完成数量, 总数量)
+    """
+    df, success_mask = _results_frame(status)
+    results = status.get("results", [])
+    
+    # 文件名包含进度信息
+    current = len(results)
+    total = status.get("total_count", "?")
+    output = io.BytesIO()
+    
+    # 使用 ExcelWriter 写入多个 sheet；没有数据的 sheet 写入带列头的空表
+    empty_df = pd.DataFrame(columns=["index", "query", "target", "output", "is_correct", "reason"])
+    with pd.ExcelWriter(output, **_EXCEL_WRITER_KWARGS) as writer:
+        for sheet_name, mask in (("Success", success_mask), ("Failed", ~success_mask)):
+            part = df[mask] if mask.any() else empty_df
+            part.to_excel(writer, sheet_name=sheet_name, index=False)
+    
+    output.seek(0)
+    return output, current, total
+
+
+def _export_results(task_id: str) -> Optional[Tuple[bytes, int, Any]]:
+    """
+    获取任务结果的导出内容（任务结果与意图干预原因均未变化时直接复用上一次生成的文件）
     
     :param task_id: 任务ID
-    :return: Excel 文件响应
-    :raises HTTPException: 如果任务未找到或导出失败
+    :return: (Excel 字节内容, 已完成数量, 总数量)，任务不存在返回 None
     """
-    logger.info(f"请求导出任务结果: task_id={task_id}")
+    version = tm.get_task_version(task_id)
+    if version is None:
+        return None
     
+    cached = export_cache_service.get_cached_export(task_id, version)
+    if cached is not None:
+        logger.info(f"结果导出命中缓存: task_id={task_id}, {cached[1]}/{cached[2]}")
+        return cached
+    
+    generation = export_cache_service.get_generation()
     # 导出时需要包含完整的 results 数据
     status = tm.get_task_status(task_id, include_results=True)
     if not status:
-        logger.warning(f"导出失败（未找到任务）: task_id={task_id}")
-        raise HTTPException(status_code=404, detail="任务未找到")
+        return None
+    output, current, total = _build_results_excel(status)
+    content = output.getvalue()
+    export_cache_service.store_export(
+        task_id, version, status.get("project_id"), content, current, total, generation
+    )
+    logger.info(f"结果已导出: task_id={task_id}, {current}/{total}")
+    return content, current, total
+
+
+def _export_parquet(task_id: str) -> Optional[Tuple[bytes, int, Any]]:
+    """
+    将任务结果导出为 Parquet（列式存储 + snappy 压缩，成功与失败结果在同一张表中，以 is_correct 区分）
     
+    :param task_id: 任务ID
+    :return: (Parquet 字节内容, 已完成数量, 总数量)，任务不存在返回 None
+    """
+    status = tm.get_task_status(task_id, include_results=True)
+    if not status:
+        return None
+    df, _ = _results_frame(status)
+    output = io.BytesIO()
     try:
-        # 获取所有结果
-        original_results = status.get("results", [])
-        
-        # --- 增强原因数据 (优先使用 Reason 库, 按 file_id 版本筛选) ---
-        project_id = status.get("project_id")
-        file_id = status.get("file_id")  # 获取任务关联的文件版本
-        results = []
-        if project_id:
-            try:
-                # 获取原因映射 (按 file_id 版本筛选)
-                from app.services import intervention_service
-                reason_map = intervention_service.get_intervention_map(project_id, file_id=file_id)
-                
-                # 复制并增强结果
-                for r in original_results:
-                    new_r = r.copy()
-                    # 如果库中有原因，优先使用库中的
-                    if new_r.get("query") in reason_map:
-                        new_r["reason"] = reason_map[new_r["query"]]
-                    results.append(new_r)
-                    
-                logger.debug(f"Enriched results with {len(reason_map)} reasons from file_id={file_id}")
-            except Exception as e:
-                logger.error(f"Failed to enrich results with reasons: {e}")
-                results = original_results
-        else:
-            results = original_results
-        # --------------------------------------
-        
-        # 分离成功和失败的数据
-        success_data = [r for r in results if r.get("is_correct")]
-        failed_data = [r for r in results if not r.get("is_correct")]
-        
-        # 文件名包含进度信息
-        current = len(results)
-        total = status.get("total_count", "?")
-        export_path = os.path.join(storage.DATA_DIR, f"results_{task_id}.xlsx")
-        
-        # 使用 ExcelWriter 写入多个 sheet
-        with pd.ExcelWriter(export_path, engine='openpyxl') as writer:
-            if success_data:
-                df_success = pd.DataFrame(success_data)
-                # 确保 reason 列在最后或者合适的位置，这里不强制排序，但确保包含 reason
-                df_success.to_excel(writer, sheet_name='Success', index=False)
-            else:
-                # 如果没有成功数据，创建一个空的 DataFrame 并带有列头
-                pd.DataFrame(columns=["index", "query", "target", "output", "is_correct", "reason"]).to_excel(writer, sheet_name='Success', index=False)
-                
-            if failed_data:
-                df_failed = pd.DataFrame(failed_data)
-                df_failed.to_excel(writer, sheet_name='Failed', index=False)
-            else:
-                pd.DataFrame(columns=["index", "query", "target", "output", "is_correct", "reason"]).to_excel(writer, sheet_name='Failed', index=False)
-        
-        logger.info(f"结果已导出至: {export_path}")
-        
-        # 返回文件，文件名中包含进度信息
-        filename = f"results_{task_id}_{current}of{total}.xlsx"
-        return FileResponse(
-            export_path,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            filename=filename
-        )
+        df.to_parquet(output, index=False, compression="snappy")
+    except (TypeError, ValueError):
+        # 同一列混有不同类型的值（如额外字段中的数字与字符串）无法推断 Arrow 类型，按字符串写出
+        for col in df.select_dtypes(include="object").columns:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        output = io.BytesIO()
+        df.to_parquet(output, index=False, compression="snappy")
+    logger.info(f"结果已导出为 Parquet: task_id={task_id}, {len(df)} 行")
+    return output.getvalue(), len(df), status.get("total_count", "?")
+
+
+def _excel_response(task_id: str, content: bytes, current: int, total: Any) -> Response:
+    """
+    构建导出文件的下载响应（直接返回内存中的内容，不在数据目录中写入导出文件）
+    
+    :param task_id: 任务ID
+    :param content: Excel 字节内容
+    :param current: 已完成数量
+    :param total: 总数量
+    :return: 附件下载响应，文件名中包含进度信息
+    """
+    filename = f"results_{task_id}_{current}of{total}.xlsx"
+    return Response(
+        content,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/{task_id}/export")
+async def export_task_results(
+    task_id: str,
+    format: str = Query("xlsx", pattern="^(xlsx|parquet)$")
+) -> Response:
+    """
+    导出任务结果
+    
+    将任务的成功和失败结果导出为 Excel 文件。
+    生成的文件按 (task_id, 任务状态版本) 缓存，结果未变化时重复导出无需重新生成。
+    结果量很大时可改用 POST /{task_id}/export-jobs 在后台生成，避免请求长时间占用连接。
+    供程序处理时可指定 format=parquet（需安装 pyarrow），体积和生成耗时远小于 Excel。
+    
+    :param task_id: 任务ID
+    :param format: 导出格式 xlsx（默认）| parquet
+    :return: Excel / Parquet 文件响应
+    :raises HTTPException: 如果任务未找到或导出失败
+    """
+    logger.info(f"请求导出任务结果: task_id={task_id}, format={format}")
+    if format == "parquet" and not _PARQUET_AVAILABLE:
+        raise HTTPException(status_code=400, detail="Parquet 导出需要安装 pyarrow")
+    try:
+        # 原因增强与文件写入均为阻塞操作，放到线程池执行
+        exported = await run_in_threadpool(_export_parquet if format == "parquet" else _export_results, task_id)
     except Exception as e:
         logger.exception(f"导出过程发生错误: {str(e)}")
         raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
+    if exported is None:
+        logger.warning(f"导出失败（未找到任务）: task_id={task_id}")
+        raise HTTPException(status_code=404, detail="任务未找到")
+    if format == "parquet":
+        content, current, total = exported
+        return Response(
+            content,
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": f'attachment; filename="results_{task_id}_{current}of{total}.parquet"'}
+        )
+    return _excel_response(task_id, *exported)
+
+
+@router.post("/{task_id}/export-jobs")
+async def create_export_job(task_id: str) -> Dict[str, str]:
+    """
+    提交后台导出任务，立即返回导出任务ID
+    
+    导出在独立的线程池中生成，客户端通过 GET /{task_id}/export-jobs/{job_id} 轮询状态并在完成后下载。
+    
+    :param task_id: 任务ID
+    :return: 包含 job_id 和状态的字典
+    :raises HTTPException: 如果任务未找到（404）或未完成的导出任务过多（429）
+    """
+    if await run_in_threadpool(tm.get_task_version, task_id) is None:
+        raise HTTPException(status_code=404, detail="任务未找到")
+    
+    job_id = export_job_service.submit_export_job(task_id, _export_results)
+    if job_id is None:
+        raise HTTPException(status_code=429, detail="后台导出任务过多，请稍后再试")
+    logger.info(f"已提交后台导出任务: task_id={task_id}, job_id={job_id}")
+    return {"job_id": job_id, "status": "running"}
+
+
+@router.get("/{task_id}/export-jobs/{job_id}")
+async def get_export_job(task_id: str, job_id: str) -> Response:
+    """
+    查询后台导出任务：未完成返回 202 与状态，完成后直接返回 Excel 文件
+    
+    :param task_id: 任务ID
+    :param job_id: 导出任务ID
+    :return: 202 状态响应或 Excel 文件响应
+    :raises HTTPException: 导出任务不存在（404）或导出失败（500）
+    """
+    future = export_job_service.get_export_job(task_id, job_id)
+    if future is None:
+        raise HTTPException(status_code=404, detail="导出任务未找到")
+    
+    if not future.done():
+        return JSONResponse({"job_id": job_id, "status": "running"}, status_code=202)
+    exc = future.exception()
+    if exc is not None:
+        logger.opt(exception=exc).error(f"后台导出失败: task_id={task_id}, job_id={job_id}")
+        raise HTTPException(status_code=500, detail=f"导出失败: {str(exc)}")
+    exported = future.result()
+    if exported is None:
+        raise HTTPException(status_code=404, detail="任务未找到")
+    return _excel_response(task_id, *exported)
 
 @router.get("/{task_id}/download_dataset")
 async def download_task_dataset(task_id: str) -> FileResponse:
@@ -410,13 +669,18 @@ async def download_task_dataset(task_id: str) -> FileResponse:
     :raises HTTPException: 如果任务或文件未找到
     """
     logger.info(f"请求下载数据集: task_id={task_id}")
-    status = tm.get_task_status(task_id)
+    status = await run_in_threadpool(tm.get_task_status, task_id)
     if not status:
         logger.warning(f"下载数据集失败（未找到任务）: task_id={task_id}")
         raise HTTPException(status_code=404, detail="任务未找到")
     
     file_path = status.get("file_path")
-    if not file_path or not os.path.exists(file_path):
+    # 一次 stat 同时完成存在性检查并提供给响应（Content-Length / ETag），响应内不再重复 stat
+    try:
+        stat_result = await run_in_threadpool(os.stat, file_path) if file_path else None
+    except OSError:
+        stat_result = None
+    if stat_result is None:
         logger.error(f"数据集文件不存在: path={file_path}")
         raise HTTPException(status_code=404, detail="数据集文件未找到")
         
@@ -426,8 +690,9 @@ async def download_task_dataset(task_id: str) -> FileResponse:
         original_filename = os.path.basename(file_path)
     
     logger.info(f"开始下载文件: {file_path}, save_as: {original_filename}")
-    return FileResponse(
+    return _DatasetFileResponse(
         file_path,
         media_type="application/octet-stream",
-        filename=original_filename
+        filename=original_filename,
+        stat_result=stat_result
     )
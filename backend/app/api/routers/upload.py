@@ -1,15 +1,20 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+import io
 import os
-import shutil
 import pandas as pd
 import uuid
 import re
 import json
 import requests
 from loguru import logger
-from typing import Dict, Any, List, Optional
+from typing import BinaryIO, Dict, Any, List, Optional, Tuple
+from openpyxl import load_workbook
+from starlette.concurrency import run_in_threadpool
 
+from app.core import background_loop, csv_encoding
+from app.core.csv_encoding import FALLBACK_ENCODING, sniff_csv_encoding
 from app.db import storage
+from app.services import column_detect_cache_service
 
 router = APIRouter(tags=["upload"])
 
@@ -27,6 +32,262 @@ def cn_to_num(s: str) -> Optional[int]:
         return int(s)
     return CN_NUM_MAP.get(s)
 
+# 保存上传文件时每次复制的字节数
+UPLOAD_COPY_CHUNK_SIZE: int = 4 * 1024 * 1024
+
+# 统计 CSV 行数时每块解析的行数
+CSV_COUNT_CHUNK_SIZE: int = 100_000
+
+# 上传文件大小上限（字节），保存时超过即中止，避免超大文件占满磁盘及后续整表加载耗尽内存
+UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(2 << 30)))
+
+# 上传文件数据行数上限，任务执行时会整表加载，超过的文件直接拒绝
+UPLOAD_MAX_ROWS: int = int(os.getenv("UPLOAD_MAX_ROWS", "1000000"))
+
+
+def _file_too_large() -> HTTPException:
+    """上传文件超过大小上限时的错误"""
+    return HTTPException(status_code=413, detail=f"文件过大，最大支持 {UPLOAD_MAX_BYTES // (1 << 20)} MB")
+
+
+def _read_csv_meta(file_path: str, encoding: str) -> Tuple[List[str], int]:
+    """
+    读取 CSV 的列名和数据行数
+    
+    按块完整解析（按字符串读取，跳过类型推断），内存占用只与块大小有关；不使用 usecols，
+    保证字段数多于表头的行与完整读取时一样报错。行数超过 UPLOAD_MAX_ROWS 时提前停止，
+    此时上限之后的行未经检查。
+    
+    :param file_path: 文件路径
+    :param encoding: 文件编码
+    :return: (列名列表, 数据行数)，超过上限时为已计到的行数（大于 UPLOAD_MAX_ROWS）
+    :raises pd.errors.ParserError: 存在字段数不一致等格式错误的行
+    """
+    columns: List[str] = pd.read_csv(file_path, encoding=encoding, nrows=0).columns.tolist()
+    row_count = 0
+    with pd.read_csv(
+        file_path, encoding=encoding, dtype=str, on_bad_lines="error", chunksize=CSV_COUNT_CHUNK_SIZE
+    ) as chunks:
+        for chunk in chunks:
+            row_count += len(chunk)
+            if row_count > UPLOAD_MAX_ROWS:
+                break
+    return columns, row_count
+
+
+def _count_xlsx_rows(file_path: str) -> int:
+    """
+    以只读模式流式统计 xlsx 第一个工作表的数据行数
+    
+    与 pd.read_excel 一致：不计表头，中间的空行计入，末尾的空行不计
+    （不使用 max_row，它会把仅带格式的空行也算进去）。
+    
+    :param file_path: 文件路径
+    :return: 数据行数，超过 UPLOAD_MAX_ROWS 时提前返回已计到的行数
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        last_row = 0
+        for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=1):
+            if any(v is not None for v in row):
+                last_row = row_num
+                if last_row > UPLOAD_MAX_ROWS:
+                    break
+        return last_row
+    finally:
+        wb.close()
+
+
+def _read_file_meta(file_path: str, file_ext: str) -> Tuple[List[str], int]:
+    """
+    读取上传文件的列名和数据行数（不将整个文件加载为 DataFrame）
+    
+    :param file_path: 文件路径
+    :param file_ext: 小写扩展名（.csv / .xls / .xlsx）
+    :return: (列名列表, 数据行数)
+    """
+    if file_ext == ".csv":
+        # 先根据文件开头判断编码（utf-8 / gbk），通常只需解析一次
+        encoding = sniff_csv_encoding(file_path)
+        try:
+            return _read_csv_meta(file_path, encoding)
+        except UnicodeDecodeError:
+            if encoding == FALLBACK_ENCODING:
+                raise
+            # 开头部分是合法的 utf-8 但后文不是，回退 gbk 编码（常见于中文 Excel/CSV）
+            logger.warning(f"UTF-8 解码失败: {file_path}，尝试 GBK 编码")
+            return _read_csv_meta(file_path, FALLBACK_ENCODING)
+    columns: List[str] = pd.read_excel(file_path, nrows=0).columns.tolist()
+    if file_ext == ".xlsx":
+        return columns, _count_xlsx_rows(file_path)
+    # 旧版 .xls 由 xlrd 整体加载，无法流式读取
+    return columns, len(pd.read_excel(file_path))
+
+
+def _save_upload(src: BinaryIO, file_path: str) -> None:
+    """
+    将上传文件内容写入本地存储
+
+    上传内容已落盘时（超过内存阈值的 SpooledTemporaryFile）使用 os.sendfile 在内核中直接复制，
+    不经过用户态缓冲区；仍在内存中或平台不支持时按大块缓冲区复制。
+    复制过程中累计字节数，超过 UPLOAD_MAX_BYTES 立即中止（由调用方删除已写入的部分）。
+
+    :param src: 上传文件的文件对象
+    :param file_path: 目标路径
+    :raises HTTPException: 文件超过大小上限（413）
+    """
+    # SpooledTemporaryFile 的底层文件对象；直接调用其 fileno() 会把内存中的内容强制写入磁盘
+    raw = getattr(src, "_file", src)
+    written = 0
+    with open(file_path, "wb") as buffer:
+        if hasattr(os, "sendfile") and not isinstance(raw, io.BytesIO):
+            try:
+                src_fd = raw.fileno()
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                src_fd = None
+            if src_fd is not None:
+                # 显式传入偏移量，不依赖缓冲文件对象与底层文件描述符的读写位置是否一致
+                offset = raw.tell()
+                try:
+                    while True:
+                        sent = os.sendfile(buffer.fileno(), src_fd, offset, UPLOAD_COPY_CHUNK_SIZE)
+                        if sent == 0:
+                            return
+                        offset += sent
+                        written += sent
+                        if written > UPLOAD_MAX_BYTES:
+                            raise _file_too_large()
+                except OSError:
+                    # 部分平台不支持写入普通文件，从已复制的位置继续按缓冲区复制
+                    raw.seek(offset)
+        while chunk := raw.read(UPLOAD_COPY_CHUNK_SIZE):
+            written += len(chunk)
+            if written > UPLOAD_MAX_BYTES:
+                raise _file_too_large()
+            buffer.write(chunk)
+
+
+def _compile_patterns(patterns: List[Tuple[str, str]]) -> Tuple[re.Pattern, List[str]]:
+    """
+    将同一类别的 (正则字符串, 前缀) 列表合并为一个忽略大小写的分支正则
+
+    每个模式恰有一个捕获组（轮次编号），合并后第 i 个捕获组对应第 i 个模式；
+    re 按顺序尝试分支，匹配结果与逐个模式依次尝试、取第一个匹配的模式一致。
+
+    :param patterns: (正则字符串, 前缀) 列表
+    :return: (合并后的正则, 按捕获组顺序排列的前缀列表)
+    """
+    union = re.compile("|".join(f"(?:{pattern})" for pattern, _ in patterns), re.IGNORECASE)
+    if union.groups != len(patterns):
+        raise ValueError("多轮列名模式必须各自恰有一个捕获组")
+    return union, [prefix for _, prefix in patterns]
+
+
+# 多轮列名匹配模式（支持阿拉伯数字和中文数字），模块加载时合并预编译：(分支正则, 各分支前缀)
+_QUERY_PATTERNS: Tuple[re.Pattern, List[str]] = _compile_patterns([
+    (r'^query(\d+)$', 'query'),           # query1, query2, ...
+    (r'^q(\d+)$', 'q'),                    # q1, q2, ...
+    (r'^问题(\d+)$', '问题'),              # 问题1, 问题2, ...
+    (r'^user(\d+)$', 'user'),              # user1, user2, ...
+    (r'^input(\d+)$', 'input'),            # input1, input2, ...
+    (r'^第(.+)轮问题$', '轮问题'),          # 第一轮问题, 第1轮问题, ...
+    (r'^第(.+)轮query$', '轮query'),        # 第一轮query, 第1轮query, ...
+])
+
+_ANSWER_PATTERNS: Tuple[re.Pattern, List[str]] = _compile_patterns([
+    (r'^answer(\d+)$', 'answer'),          # answer1, answer2, ...
+    (r'^a(\d+)$', 'a'),                    # a1, a2, ...
+    (r'^回答(\d+)$', '回答'),              # 回答1, 回答2, ...
+    (r'^assistant(\d+)$', 'assistant'),    # assistant1, assistant2, ...
+    (r'^output(\d+)$', 'output'),          # output1, output2, ...
+    (r'^response(\d+)$', 'response'),      # response1, response2, ...
+])
+
+_TARGET_PATTERNS: Tuple[re.Pattern, List[str]] = _compile_patterns([
+    (r'^target(\d+)$', 'target'),          # target1, target2, ...
+    (r'^t(\d+)$', 't'),                    # t1, t2, ...
+    (r'^预期(\d+)$', '预期'),              # 预期1, 预期2, ...
+    (r'^意图(\d+)$', '意图'),              # 意图1, 意图2, ...
+    (r'^intent(\d+)$', 'intent'),          # intent1, intent2, ...
+    (r'^expected(\d+)$', 'expected'),      # expected1, expected2, ...
+    (r'^label(\d+)$', 'label'),            # label1, label2, ...
+    (r'^第(.+)轮.*(?:期望)?意图$', '轮意图'),  # 第一轮期望意图, 第1轮意图, ...
+    (r'^第(.+)轮.*target$', '轮target'),    # 第一轮target, ...
+])
+
+_REWRITE_PATTERNS: Tuple[re.Pattern, List[str]] = _compile_patterns([
+    (r'^rewrite(\d+)$', 'rewrite'),        # rewrite1, rewrite2, ...
+    (r'^改写(\d+)$', '改写'),              # 改写1, 改写2, ...
+    (r'^query_rewrite(\d+)$', 'query_rewrite'),  # query_rewrite1, ...
+    (r'^rw(\d+)$', 'rw'),                  # rw1, rw2, ...
+    (r'^第(.+)轮.*(?:query)?重写$', '轮重写'),  # 第一轮期望query重写, 第1轮重写, ...
+    (r'^第(.+)轮.*改写$', '轮改写'),        # 第一轮改写, 第1轮query改写, ...
+])
+
+_REASON_PATTERNS: Tuple[re.Pattern, List[str]] = _compile_patterns([
+    (r'^reason(\d+)$', 'reason'),          # reason1, reason2, ...
+    (r'^原因(\d+)$', '原因'),              # 原因1, 原因2, ...
+    (r'^备注(\d+)$', '备注'),              # 备注1, 备注2, ...
+    (r'^note(\d+)$', 'note'),              # note1, note2, ...
+    (r'^comment(\d+)$', 'comment'),        # comment1, comment2, ...
+    (r'^第(.+)轮.*原因$', '轮原因'),        # 第一轮原因, ...
+    (r'^第(.+)轮.*备注$', '轮备注'),        # 第一轮备注, ...
+])
+
+# LLM 响应中的 ```json 代码块
+_JSON_BLOCK_PATTERN = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+
+
+# 参与检测的列类别（answer 列不参与轮次配置）
+_ROUND_COLUMN_CATEGORIES: Tuple[Tuple[str, Tuple[re.Pattern, List[str]]], ...] = (
+    ("query", _QUERY_PATTERNS),
+    ("target", _TARGET_PATTERNS),
+    ("rewrite", _REWRITE_PATTERNS),
+    ("reason", _REASON_PATTERNS),
+)
+
+
+def _match_round_columns(columns: List[str]) -> Dict[str, Tuple[Dict[int, str], Optional[str]]]:
+    """
+    单次遍历列名，按各类别的模式识别每轮对应的列
+
+    每个类别内每列只做一次分支正则匹配，取第一个匹配的模式，轮次编号取自该模式的捕获组（支持中文数字）；
+    一列可同时被多个类别识别，与逐类别分别扫描的结果一致。
+    所有模式要么以数字结尾、要么以"第"开头，不满足的列直接跳过，宽表中的无关列不做正则匹配。
+
+    :param columns: 文件列名
+    :return: 类别名 -> (轮次 -> 列名, 最后一次匹配的前缀)
+    """
+    matched: Dict[str, Tuple[Dict[int, str], Optional[str]]] = {
+        name: ({}, None) for name, _ in _ROUND_COLUMN_CATEGORIES
+    }
+    for col in columns:
+        if not (col[-1:].isdigit() or col.startswith("第")):
+            continue
+        for name, (union, prefixes) in _ROUND_COLUMN_CATEGORIES:
+            match = union.match(col)
+            if match:
+                round_num = cn_to_num(match.group(match.lastindex))
+                if round_num:
+                    matched[name][0][round_num] = col
+                    matched[name] = (matched[name][0], prefixes[match.lastindex - 1])
+    return matched
+
+
+def _read_head(file_path: str, nrows: int) -> pd.DataFrame:
+    """
+    读取文件的表头和前若干行（CSV 按识别出的编码读取）
+
+    :param file_path: 文件路径
+    :param nrows: 读取的数据行数，0 表示只读表头
+    :return: DataFrame
+    """
+    if file_path.endswith(".csv"):
+        return csv_encoding.read_csv(file_path, nrows=nrows)
+    return pd.read_excel(file_path, nrows=nrows)
+
+
 @router.post("/upload")
 async def upload_file(file: UploadFile = File(...)) -> Dict[str, Any]:
     """
@@ -36,7 +297,7 @@ async def upload_file(file: UploadFile = File(...)) -> Dict[str, Any]:
     
     :param file: 上传的文件对象
     :return: 包含文件ID、列名列表、文件名和总行数的字典
-    :raises HTTPException: 如果文件类型不支持或处理过程中发生错误
+    :raises HTTPException: 如果文件类型不支持、文件过大（413）或处理过程中发生错误
     """
     logger.info(f"接收到文件上传请求: {file.filename}, content_type: {file.content_type}")
     
@@ -45,34 +306,26 @@ async def upload_file(file: UploadFile = File(...)) -> Dict[str, Any]:
     file_ext = os.path.splitext(file.filename)[1].lower() if file.filename else ""
     file_path = os.path.join(storage.DATA_DIR, f"{file_id}{file_ext}")
     
+    if file_ext not in (".csv", ".xls", ".xlsx"):
+        logger.warning(f"不支持的文件扩展名: {file_ext}")
+        raise HTTPException(status_code=400, detail=f"不支持的文件扩展名: {file_ext}")
+    # 请求体已接收完毕时大小已知，超限直接拒绝，不再复制
+    if file.size is not None and file.size > UPLOAD_MAX_BYTES:
+        logger.warning(f"上传文件过大: {file.filename}, {file.size} 字节")
+        raise _file_too_large()
+    
     try:
-        # 保存文件到本地存储
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
+        # 保存文件到本地存储（阻塞的文件读写放到线程池执行，不阻塞事件循环）
+        await run_in_threadpool(_save_upload, file.file, file_path)
         logger.info(f"文件已保存至: {file_path}")
         
-        # 获取列名和总行数以便前端选择和配置
-        row_count: int = 0
-        df_full: pd.DataFrame
+        # 获取列名和总行数以便前端选择和配置（只读表头并流式计数，不加载整个文件）
+        # 解析在独立的解析线程池中执行，与文件保存等轻量 I/O 使用的通用线程池分开
+        columns, row_count = await background_loop.run_in_parse_pool(_read_file_meta, file_path, file_ext)
+        if row_count > UPLOAD_MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"文件行数超过上限 {UPLOAD_MAX_ROWS} 行")
         
-        if file_ext == ".csv":
-            try:
-                # 尝试使用 utf-8 编码读取
-                df_full = pd.read_csv(file_path, encoding='utf-8')
-            except UnicodeDecodeError:
-                # 如果 utf-8 失败，尝试 gbk 编码（常见于中文 Excel/CSV）
-                logger.warning(f"UTF-8 解码失败: {file.filename}，尝试 GBK 编码")
-                df_full = pd.read_csv(file_path, encoding='gbk')
-            row_count = len(df_full)
-        elif file_ext in [".xls", ".xlsx"]:
-            df_full = pd.read_excel(file_path)
-            row_count = len(df_full)
-        else:
-            logger.warning(f"不支持的文件扩展名: {file_ext}")
-            raise HTTPException(status_code=400, detail=f"不支持的文件扩展名: {file_ext}")
-
-        columns: List[str] = df_full.columns.tolist()
+        storage.register_file(file_id, file_path)
         logger.info(f"成功解析列名: {columns}，总行数: {row_count}")
         
         return {
@@ -82,7 +335,10 @@ async def upload_file(file: UploadFile = File(...)) -> Dict[str, Any]:
             "row_count": row_count
         }
         
-    except HTTPException:
+    except HTTPException as e:
+        if e.status_code == 413:
+            logger.warning(f"上传文件超过限制，已删除: {file_path}, {e.detail}")
+            await run_in_threadpool(_remove_file, file_path)
         raise
     except Exception as e:
         logger.error(f"文件上传/解析中断: {str(e)}")
@@ -90,6 +346,18 @@ async def upload_file(file: UploadFile = File(...)) -> Dict[str, Any]:
         raise HTTPException(status_code=400, detail=f"文件处理错误: {str(e)}")
 
 
+def _remove_file(file_path: str) -> None:
+    """
+    删除文件（不存在时忽略）
+
+    :param file_path: 文件路径
+    """
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
 @router.post("/upload/detect-multi-round")
 async def detect_multi_round_columns(
     file_id: str = Form(...)
@@ -112,11 +380,7 @@ async def detect_multi_round_columns(
     logger.info(f"检测多轮列配置: file_id={file_id}")
 
     # 查找文件路径
-    file_path: Optional[str] = None
-    for f in os.listdir(storage.DATA_DIR):
-        if f.startswith(file_id):
-            file_path = os.path.join(storage.DATA_DIR, f)
-            break
+    file_path: Optional[str] = await run_in_threadpool(storage.get_file_path, file_id)
 
     if not file_path:
         logger.error(f"文件未找到: file_id={file_id}")
@@ -124,13 +388,7 @@ async def detect_multi_round_columns(
 
     # 读取文件获取列名
     try:
-        if file_path.endswith(".csv"):
-            try:
-                df = pd.read_csv(file_path, encoding='utf-8', nrows=0)
-            except UnicodeDecodeError:
-                df = pd.read_csv(file_path, encoding='gbk', nrows=0)
-        else:
-            df = pd.read_excel(file_path, nrows=0)
+        df = await background_loop.run_in_parse_pool(_read_head, file_path, 0)
 
         columns: List[str] = df.columns.tolist()
         logger.info(f"文件列名: {columns}")
@@ -138,112 +396,12 @@ async def detect_multi_round_columns(
         logger.error(f"读取文件失败: {e}")
         raise HTTPException(status_code=400, detail=f"读取文件失败: {e}")
 
-    # 定义列名匹配模式（支持阿拉伯数字和中文数字）
-    query_patterns = [
-        (r'^query(\d+)$', 'query'),           # query1, query2, ...
-        (r'^q(\d+)$', 'q'),                    # q1, q2, ...
-        (r'^问题(\d+)$', '问题'),              # 问题1, 问题2, ...
-        (r'^user(\d+)$', 'user'),              # user1, user2, ...
-        (r'^input(\d+)$', 'input'),            # input1, input2, ...
-        (r'^第(.+)轮问题$', '轮问题'),          # 第一轮问题, 第1轮问题, ...
-        (r'^第(.+)轮query$', '轮query'),        # 第一轮query, 第1轮query, ...
-    ]
-
-    answer_patterns = [
-        (r'^answer(\d+)$', 'answer'),          # answer1, answer2, ...
-        (r'^a(\d+)$', 'a'),                    # a1, a2, ...
-        (r'^回答(\d+)$', '回答'),              # 回答1, 回答2, ...
-        (r'^assistant(\d+)$', 'assistant'),    # assistant1, assistant2, ...
-        (r'^output(\d+)$', 'output'),          # output1, output2, ...
-        (r'^response(\d+)$', 'response'),      # response1, response2, ...
-    ]
-
-    target_patterns = [
-        (r'^target(\d+)$', 'target'),          # target1, target2, ...
-        (r'^t(\d+)$', 't'),                    # t1, t2, ...
-        (r'^预期(\d+)$', '预期'),              # 预期1, 预期2, ...
-        (r'^意图(\d+)$', '意图'),              # 意图1, 意图2, ...
-        (r'^intent(\d+)$', 'intent'),          # intent1, intent2, ...
-        (r'^expected(\d+)$', 'expected'),      # expected1, expected2, ...
-        (r'^label(\d+)$', 'label'),            # label1, label2, ...
-        (r'^第(.+)轮.*(?:期望)?意图$', '轮意图'),  # 第一轮期望意图, 第1轮意图, ...
-        (r'^第(.+)轮.*target$', '轮target'),    # 第一轮target, ...
-    ]
-
-    rewrite_patterns = [
-        (r'^rewrite(\d+)$', 'rewrite'),        # rewrite1, rewrite2, ...
-        (r'^改写(\d+)$', '改写'),              # 改写1, 改写2, ...
-        (r'^query_rewrite(\d+)$', 'query_rewrite'),  # query_rewrite1, ...
-        (r'^rw(\d+)$', 'rw'),                  # rw1, rw2, ...
-        (r'^第(.+)轮.*(?:query)?重写$', '轮重写'),  # 第一轮期望query重写, 第1轮重写, ...
-        (r'^第(.+)轮.*改写$', '轮改写'),        # 第一轮改写, 第1轮query改写, ...
-    ]
-
-    reason_patterns = [
-        (r'^reason(\d+)$', 'reason'),          # reason1, reason2, ...
-        (r'^原因(\d+)$', '原因'),              # 原因1, 原因2, ...
-        (r'^备注(\d+)$', '备注'),              # 备注1, 备注2, ...
-        (r'^note(\d+)$', 'note'),              # note1, note2, ...
-        (r'^comment(\d+)$', 'comment'),        # comment1, comment2, ...
-        (r'^第(.+)轮.*原因$', '轮原因'),        # 第一轮原因, ...
-        (r'^第(.+)轮.*备注$', '轮备注'),        # 第一轮备注, ...
-    ]
-
-    # 检测 query 列
-    query_cols: Dict[int, str] = {}
-    query_prefix: Optional[str] = None
-
-    for col in columns:
-        for pattern, prefix in query_patterns:
-            match = re.match(pattern, col, re.IGNORECASE)
-            if match:
-                round_num = cn_to_num(match.group(1))
-                if round_num:
-                    query_cols[round_num] = col
-                    query_prefix = prefix
-                break
-
-    # 检测 target 列（每轮都有）
-    target_cols: Dict[int, str] = {}
-    target_prefix: Optional[str] = None
-
-    for col in columns:
-        for pattern, prefix in target_patterns:
-            match = re.match(pattern, col, re.IGNORECASE)
-            if match:
-                round_num = cn_to_num(match.group(1))
-                if round_num:
-                    target_cols[round_num] = col
-                    target_prefix = prefix
-                break
-
-    # 检测 rewrite 列（可选）
-    rewrite_cols: Dict[int, str] = {}
-    rewrite_prefix: Optional[str] = None
-
-    for col in columns:
-        for pattern, prefix in rewrite_patterns:
-            match = re.match(pattern, col, re.IGNORECASE)
-            if match:
-                round_num = cn_to_num(match.group(1))
-                if round_num:
-                    rewrite_cols[round_num] = col
-                    rewrite_prefix = prefix
-                break
-
-    # 检测 reason 列（可选）
-    reason_cols: Dict[int, str] = {}
-    reason_prefix: Optional[str] = None
-
-    for col in columns:
-        for pattern, prefix in reason_patterns:
-            match = re.match(pattern, col, re.IGNORECASE)
-            if match:
-                round_num = cn_to_num(match.group(1))
-                if round_num:
-                    reason_cols[round_num] = col
-                    reason_prefix = prefix
-                break
+    # 检测 query 列；target 列每轮都有；rewrite 列、reason 列可选
+    matched = _match_round_columns(columns)
+    query_cols, query_prefix = matched["query"]
+    target_cols, target_prefix = matched["target"]
+    rewrite_cols, rewrite_prefix = matched["rewrite"]
+    reason_cols, reason_prefix = matched["reason"]
 
     # 如果没有检测到 query 列，返回未检测到
     if not query_cols:
@@ -304,11 +462,7 @@ async def detect_multi_round_columns_with_llm(
     logger.info(f"使用 LLM 检测多轮列配置: file_id={file_id}, project_id={project_id}")
 
     # 查找文件路径
-    file_path: Optional[str] = None
-    for f in os.listdir(storage.DATA_DIR):
-        if f.startswith(file_id):
-            file_path = os.path.join(storage.DATA_DIR, f)
-            break
+    file_path: Optional[str] = await run_in_threadpool(storage.get_file_path, file_id)
 
     if not file_path:
         logger.error(f"文件未找到: file_id={file_id}")
@@ -316,29 +470,19 @@ async def detect_multi_round_columns_with_llm(
 
     # 读取文件获取列名和样本数据
     try:
-        if file_path.endswith(".csv"):
-            try:
-                df = pd.read_csv(file_path, encoding='utf-8', nrows=3)
-            except UnicodeDecodeError:
-                df = pd.read_csv(file_path, encoding='gbk', nrows=3)
-        else:
-            df = pd.read_excel(file_path, nrows=3)
+        df = await background_loop.run_in_parse_pool(_read_head, file_path, 3)
 
         columns: List[str] = df.columns.tolist()
 
         # 获取样本数据（前3行）用于帮助 LLM 理解
-        sample_data: List[Dict[str, Any]] = []
-        for _, row in df.iterrows():
-            row_dict = {}
-            for col in columns:
-                val = row[col]
-                if pd.isna(val):
-                    row_dict[col] = ""
-                else:
-                    # 截断过长的内容
-                    str_val = str(val)
-                    row_dict[col] = str_val[:100] + "..." if len(str_val) > 100 else str_val
-            sample_data.append(row_dict)
+        # 整表一次性转换为字符串（空值转为空字符串），不逐行 iterrows
+        sample_df = df.astype(object)
+        sample_df = sample_df.where(sample_df.notna(), "").astype(str)
+        sample_data: List[Dict[str, Any]] = [
+            # 截断过长的内容
+            {col: val[:100] + "..." if len(val) > 100 else val for col, val in zip(columns, row)}
+            for row in sample_df.itertuples(index=False, name=None)
+        ]
 
         logger.info(f"文件列名: {columns}")
     except Exception as e:
@@ -347,7 +491,7 @@ async def detect_multi_round_columns_with_llm(
 
     # 从全局模型中获取默认模型配置（名称包含 qwen3-30b-a3b 的模型）
     # 自动检测功能使用全局默认模型，而非项目的验证配置
-    global_models = storage.get_global_models()
+    global_models = await run_in_threadpool(storage.get_global_models)
     default_model = None
 
     # 优先查找名称包含 qwen3-30b-a3b 的模型
@@ -375,6 +519,13 @@ async def detect_multi_round_columns_with_llm(
         api_key = "aac97926e76f49f9bd3d4c5e4f5ed3fe"
         model_name = "qwen3-30b-a3b-instruct-2507-yace"
 
+    # 列名、样本数据和模型都未变化时直接返回上一次的检测结果，不再调用 LLM
+    cache_key = column_detect_cache_service.make_detect_key(columns, sample_data, base_url, model_name)
+    cached_result = column_detect_cache_service.get_cached_detection(cache_key)
+    if cached_result is not None:
+        logger.info(f"LLM 列检测命中缓存: file_id={file_id}")
+        return cached_result
+
     # 构建 LLM 提示词
     prompt = f"""你是一个数据分析专家。请分析以下 Excel/CSV 文件的列名和样本数据，识别出多轮对话的列配置。
 
@@ -461,7 +612,8 @@ async def detect_multi_round_columns_with_llm(
         }
 
         logger.info(f"调用 LLM 分析列名: {base_url}")
-        resp = requests.post(base_url, json=payload, headers=headers, timeout=60)
+        # 同步 HTTP 调用最长可达 60 秒，放到线程池执行
+        resp = await run_in_threadpool(requests.post, base_url, json=payload, headers=headers, timeout=60)
         resp.raise_for_status()
 
         # 确保响应使用正确的编码
@@ -473,7 +625,7 @@ async def detect_multi_round_columns_with_llm(
 
         # 解析 LLM 返回的 JSON
         # 尝试从响应中提取 JSON
-        json_match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
+        json_match = _JSON_BLOCK_PATTERN.search(content)
         if json_match:
             json_str = json_match.group(1)
         else:
@@ -553,6 +705,7 @@ async def detect_multi_round_columns_with_llm(
 
         logger.info(f"LLM 检测结果: detected={parsed_result.get('detected')}, rounds={parsed_result.get('max_rounds')}")
 
+        column_detect_cache_service.store_detection(cache_key, parsed_result)
         return parsed_result
 
     except json.JSONDecodeError as e:
@@ -0,0 +1,118 @@
+"""
+后台事件循环模块
+在独立的守护线程中运行一个常驻 asyncio 事件循环，供后台协程任务（如提示词优化）共享，
+避免每个任务都创建、销毁一次事件循环及其连接池。
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Optional
+
+from loguru import logger
+
+# 线程池大小（每个事件循环的默认执行器，以及 FastAPI (anyio) 线程池的并发上限）
+THREAD_POOL_SIZE: int = int(os.getenv("THREAD_POOL_SIZE", "32"))
+
+# 文件解析线程池大小：CSV/Excel 解析是 CPU 密集型的重任务，单独限流，
+# 避免并发的大文件解析占满通用线程池，拖慢数据库读写、文件保存等轻量阻塞调用
+PARSE_POOL_SIZE: int = int(os.getenv("PARSE_POOL_SIZE", str(min(8, os.cpu_count() or 4))))
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_parse_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    获取共享的后台事件循环（首次调用时创建并在守护线程中启动）
+
+    :return: 正在运行的后台事件循环
+    """
+    global _loop
+    if _loop is not None:
+        return _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(create_executor("popt-bg"))
+            thread = threading.Thread(
+                target=loop.run_forever,
+                name="background-event-loop",
+                daemon=True
+            )
+            thread.start()
+            _loop = loop
+            logger.info("后台事件循环已启动")
+    return _loop
+
+
+def create_executor(thread_name_prefix: str) -> ThreadPoolExecutor:
+    """
+    创建按 THREAD_POOL_SIZE 配置大小的线程池，用作事件循环的默认执行器（asyncio.to_thread 等）
+
+    各事件循环各自持有执行器：事件循环关闭时会关闭其默认执行器，不能跨循环共享。
+
+    :param thread_name_prefix: 线程名前缀
+    :return: 线程池执行器
+    """
+    return ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix=thread_name_prefix)
+
+
+def get_parse_executor() -> ThreadPoolExecutor:
+    """
+    获取进程级共享的文件解析线程池（首次调用时创建）
+
+    不作为任何事件循环的默认执行器，不会随事件循环关闭，可在各事件循环间共享。
+
+    :return: 线程池执行器
+    """
+    global _parse_executor
+    if _parse_executor is not None:
+        return _parse_executor
+    with _loop_lock:
+        if _parse_executor is None:
+            _parse_executor = ThreadPoolExecutor(max_workers=PARSE_POOL_SIZE, thread_name_prefix="popt-parse")
+    return _parse_executor
+
+
+async def run_in_parse_pool(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    在文件解析线程池中执行阻塞的解析函数（如 pd.read_csv / pd.read_excel）
+
+    :param func: 同步函数
+    :param args: 位置参数
+    :param kwargs: 关键字参数
+    :return: 函数返回值
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        get_parse_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def submit(coro: Coroutine[Any, Any, Any]) -> Future:
+    """
+    将协程提交到共享的后台事件循环中执行（线程安全，可在任意线程/事件循环中调用）
+
+    调用方通常不等待返回的 Future（fire-and-forget），因此未处理的异常会在此统一记录，避免被静默丢弃。
+
+    :param coro: 待执行的协程
+    :return: concurrent.futures.Future，可用于获取结果或异常
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_background_loop())
+    future.add_done_callback(_log_exception)
+    return future
+
+
+def _log_exception(future: Future) -> None:
+    """
+    记录后台协程中未处理的异常
+
+    :param future: 已完成的 Future
+    """
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        logger.opt(exception=exc).error("后台协程执行失败")
@@ -0,0 +1,58 @@
+"""
+CSV 编码识别模块
+上传的 CSV 主要为 UTF-8 或 GBK（中文 Excel 导出），读取前先根据文件开头的字节判断编码，
+避免先按 UTF-8 完整解析、失败后再按 GBK 重新解析整个文件。
+"""
+import codecs
+from typing import Any
+
+import pandas as pd
+from loguru import logger
+
+# 用于判断编码的文件开头字节数
+SNIFF_SIZE: int = 64 * 1024
+
+# 非 UTF-8 时使用的编码
+FALLBACK_ENCODING: str = "gbk"
+
+
+def sniff_csv_encoding(file_path: str, sample_size: int = SNIFF_SIZE) -> str:
+    """
+    根据文件开头的字节判断 CSV 编码
+
+    开头部分能按 UTF-8 严格解码时返回 utf-8（截断在多字节字符中间不视为错误），否则返回 gbk。
+    只检查开头部分，调用方仍需在 UTF-8 解析失败时回退到 FALLBACK_ENCODING。
+
+    :param file_path: 文件路径
+    :param sample_size: 读取的字节数
+    :return: 编码名称
+    """
+    with open(file_path, "rb") as f:
+        sample = f.read(sample_size)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        # 未读到文件末尾时 final=False，末尾不完整的多字节字符留在解码器缓冲区中
+        decoder.decode(sample, final=len(sample) < sample_size)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+    return "utf-8"
+
+
+def read_csv(file_path: str, **kwargs: Any) -> pd.DataFrame:
+    """
+    按识别出的编码读取 CSV（pd.read_csv 的封装）
+
+    UTF-8 解析失败（开头合法、后文非法）时回退到 FALLBACK_ENCODING 重新读取。
+
+    :param file_path: 文件路径
+    :param kwargs: 传给 pd.read_csv 的其他参数（不含 encoding）
+    :return: DataFrame
+    """
+    encoding = sniff_csv_encoding(file_path)
+    try:
+        return pd.read_csv(file_path, encoding=encoding, **kwargs)
+    except UnicodeDecodeError:
+        if encoding == FALLBACK_ENCODING:
+            raise
+        logger.warning(f"UTF-8 解码失败: {file_path}，尝试 {FALLBACK_ENCODING} 编码")
+        return pd.read_csv(file_path, encoding=FALLBACK_ENCODING, **kwargs)
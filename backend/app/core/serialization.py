@@ -0,0 +1,47 @@
+"""
+JSON 序列化工具模块
+优先使用 orjson（Rust 实现，解析与序列化速度约为标准库的数倍），未安装时回退到标准库 json
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，调用方统一捕获此异常即可
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    解析 JSON 文本
+
+    :param data: JSON 字符串或字节串（orjson 可直接解析 bytes，无需先解码）
+    :return: 解析后的 Python 对象
+    :raises JSONDecodeError: JSON 格式非法时抛出
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # 旧版标准库 json.dumps 写入的 NaN/Infinity 不被 orjson 接受，交由标准库解析
+            pass
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """
+    序列化为 JSON 字符串（等价于 json.dumps(obj, ensure_ascii=False)）
+
+    :param obj: 待序列化对象
+    :return: JSON 字符串
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            # orjson 不支持的类型（如自定义对象、超出 64 位的整数）交由标准库处理
+            pass
+    return json.dumps(obj, ensure_ascii=False)
@@ -15,9 +15,13 @@ DATABASE_URL: str = f"sqlite:///{os.path.join(DATA_DIR, 'app.db')}"
 # 创建数据库引擎
 # check_same_thread=False 允许在多线程环境下使用（FastAPI 需要）
 # timeout=30 设置 30 秒超时，避免长时间锁等待
+# 连接池：WAL 模式下读写互不阻塞，任务线程、线程池请求与后台优化会同时访问数据库，
+# 适当放大连接池，避免默认的 5 个连接被占满后排队等待
 engine = create_engine(
     DATABASE_URL, 
     echo=False,  # 设置为 True 可以打印 SQL 语句用于调试
+    pool_size=10,
+    max_overflow=20,
     connect_args={
         "check_same_thread": False,
         "timeout": 30  # 30秒超时，避免长时间锁等待
@@ -36,6 +40,8 @@ def _set_sqlite_pragma(dbapi_connection, connection_record) -> None:
     cursor = dbapi_connection.cursor()
     # 启用 WAL 模式：提升并发读写性能，减少锁冲突
     cursor.execute("PRAGMA journal_mode=WAL")
+    # WAL 模式下 NORMAL 同步级别不会损坏数据库，仅在检查点时 fsync，显著降低每次提交的开销
+    cursor.execute("PRAGMA synchronous=NORMAL")
     # 设置 30 秒的忙等待超时
     cursor.execute("PRAGMA busy_timeout=30000")
     # 启用外键约束
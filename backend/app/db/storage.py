@@ -4,17 +4,31 @@
 """
 import os
 import json
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime
 from loguru import logger
+import numpy as np
 from sqlmodel import Session, select
 
+from app.core import serialization
 from app.db.database import get_db_session, DATA_DIR
 from app.models import (
     Project, ProjectIteration, Task, TaskResult, TaskError,
     GlobalModel, ModelConfig, AutoIterateStatus, IntentIntervention
 )
 
+# 追加迭代记录时乐观并发冲突的最大重试次数
+APPEND_ITERATION_MAX_RETRIES: int = 5
+
+# 单个项目读取缓存：启动任务、测试等请求频繁读取同一项目配置，短 TTL 内复用查询结果
+# 项目或其迭代记录的写入会立即失效对应缓存，TTL 仅兜底；缓存序列化后的 JSON 文本，
+# 命中时解析出独立副本（比 deepcopy 快），未命中时直接返回新构造的字典
+PROJECT_CACHE_TTL_SECONDS: float = 5.0
+PROJECT_CACHE_MAX_SIZE: int = 128
+
 
 def init_storage() -> None:
     """
@@ -34,8 +48,11 @@ def get_projects() -> List[Dict[str, Any]]:
     
     :return: 项目字典列表
     """
+    from sqlalchemy.orm import selectinload
+    
     with get_db_session() as session:
-        statement = select(Project)
+        # 一次性预加载所有项目的迭代记录，避免 to_dict 中逐个项目懒加载（N+1 查询）
+        statement = select(Project).options(selectinload(Project.iterations))
         projects: List[Project] = list(session.exec(statement))
         return [p.to_dict() for p in projects]
 
@@ -48,8 +65,13 @@ def save_projects(projects: List[Dict[str, Any]]) -> None:
     :param projects: 项目字典列表
     """
     with get_db_session() as session:
+        # 一次查询取出所有已存在的项目并按 ID 建立索引，避免逐个项目查询
+        project_ids = [proj_dict.get("id") for proj_dict in projects]
+        existing_map: Dict[str, Project] = {
+            p.id: p for p in session.exec(select(Project).where(Project.id.in_(project_ids)))
+        }
         for proj_dict in projects:
-            existing = session.get(Project, proj_dict.get("id"))
+            existing = existing_map.get(proj_dict.get("id"))
             if existing:
                 # 传递 session 以便同步迭代记录
                 _update_project_from_dict(session, existing, proj_dict)
@@ -57,20 +79,60 @@ def save_projects(projects: List[Dict[str, Any]]) -> None:
                 new_project = _create_project_from_dict(proj_dict)
                 session.add(new_project)
         session.commit()
+    invalidate_project_cache()
+
+
+# project_id -> (写入时间, 项目 JSON 文本)
+_project_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+# 缓存代数：每次失效递增，查询期间发生过写入的结果不回填缓存，避免旧数据覆盖失效
+_project_cache_generation: int = 0
+_project_cache_lock = threading.Lock()
+
+
+def invalidate_project_cache(project_id: Optional[str] = None) -> None:
+    """
+    失效项目读取缓存（项目或其迭代记录写入提交后调用）
+    
+    :param project_id: 项目 ID，None 表示清空全部
+    """
+    global _project_cache_generation
+    with _project_cache_lock:
+        _project_cache_generation += 1
+        if project_id is None:
+            _project_cache.clear()
+        else:
+            _project_cache.pop(project_id, None)
 
 
 def get_project(project_id: str) -> Optional[Dict[str, Any]]:
     """
-    根据 ID 获取单个项目
+    根据 ID 获取单个项目（带短 TTL 缓存）
     
     :param project_id: 项目 ID
-    :return: 项目字典，未找到返回 None
-    """
+    :return: 项目字典（副本，调用方可自由修改），未找到返回 None
+    """
+    now = time.monotonic()
+    with _project_cache_lock:
+        cached = _project_cache.get(project_id)
+        if cached is not None and now - cached[0] < PROJECT_CACHE_TTL_SECONDS:
+            _project_cache.move_to_end(project_id)
+            return serialization.loads(cached[1])
+        generation = _project_cache_generation
+    
     with get_db_session() as session:
         project = session.get(Project, project_id)
-        if project:
-            return project.to_dict()
-        return None
+        if not project:
+            return None
+        result = project.to_dict()
+    payload = serialization.dumps(result)
+    
+    with _project_cache_lock:
+        if generation == _project_cache_generation:
+            _project_cache[project_id] = (now, payload)
+            _project_cache.move_to_end(project_id)
+            while len(_project_cache) > PROJECT_CACHE_MAX_SIZE:
+                _project_cache.popitem(last=False)
+    return result
 
 
 def create_project(name: str, prompt: str, project_type: str = "single") -> Dict[str, Any]:
@@ -122,6 +184,7 @@ def delete_project(project_id: str) -> bool:
                 session.delete(iteration)
             session.delete(project)
             session.commit()
+            invalidate_project_cache(project_id)
             logger.info(f"删除项目: {project_id}")
             return True
         return False
@@ -154,6 +217,7 @@ def reset_project(project_id: str) -> Optional[Dict[str, Any]]:
         project.updated_at = datetime.now().isoformat()
         session.commit()
         session.refresh(project)
+        invalidate_project_cache(project_id)
         
         logger.info(f"重置项目提示词和迭代记录: {project_id}")
     
@@ -196,7 +260,7 @@ def update_project(project_id: str, updates: Dict[str, Any]) -> Optional[Dict[st
     更新项目信息
     
     :param project_id: 项目 ID
-    :param updates: 要更新的字段字典
+    :param updates: 要更新的字段字典；config_patch 会在同一事务内合并到现有 config 上（增量更新）
     :return: 更新后的项目字典，未找到返回 None
     """
     with get_db_session() as session:
@@ -212,11 +276,22 @@ def update_project(project_id: str, updates: Dict[str, Any]) -> Optional[Dict[st
         if "last_task_id" in updates:
             project.last_task_id = updates["last_task_id"]
         if "config" in updates:
-            project.config = json.dumps(updates["config"] or {}, ensure_ascii=False)
+            project.config = serialization.dumps(updates["config"] or {})
+        # 仅在确有变更时才重写 config：前端自动保存每次都会带上未改动的配置字段，
+        # 合并结果与现有配置一致时跳过序列化与该列的写入
+        if updates.get("config_patch"):
+            try:
+                config: Dict[str, Any] = serialization.loads(project.config) if project.config else {}
+            except serialization.JSONDecodeError:
+                config = {}
+            patch: Dict[str, Any] = updates["config_patch"]
+            if any(key not in config or config[key] != value for key, value in patch.items()):
+                config.update(patch)
+                project.config = serialization.dumps(config)
         if "model_config" in updates:
-            project.model_config_data = json.dumps(updates["model_config"] or {}, ensure_ascii=False)
+            project.model_config_data = serialization.dumps(updates["model_config"] or {})
         if "optimization_model_config" in updates:
-            project.optimization_model_config = json.dumps(updates["optimization_model_config"] or {}, ensure_ascii=False)
+            project.optimization_model_config = serialization.dumps(updates["optimization_model_config"] or {})
         if "optimization_prompt" in updates:
             project.optimization_prompt = updates["optimization_prompt"] or ""
         
@@ -227,6 +302,7 @@ def update_project(project_id: str, updates: Dict[str, Any]) -> Optional[Dict[st
         project.updated_at = datetime.now().isoformat()
         session.commit()
         session.refresh(project)
+        invalidate_project_cache(project_id)
         logger.info(f"更新项目: {project_id}")
         return project.to_dict()
 
@@ -254,7 +330,7 @@ def _sync_project_iterations(session: Session, project: Project, iterations_data
             accuracy_before=iter_data.get("accuracy_before", 0.0),
             accuracy_after=iter_data.get("accuracy_after"),
             task_id=iter_data.get("task_id"),
-            analysis=json.dumps(iter_data.get("analysis") or {}, ensure_ascii=False),
+            analysis=serialization.dumps(iter_data.get("analysis") or {}),
             note=iter_data.get("note") or "",
             created_at=iter_data.get("created_at", datetime.now().isoformat())
         )
@@ -276,42 +352,117 @@ def _sync_project_iterations_from_legacy(session: Session, project: Project, ite
     
     # 添加新迭代（将旧格式字段映射到新格式）
     for idx, iter_data in enumerate(iterations_data):
-        # 兼容旧格式字段映射
-        previous_prompt: str = iter_data.get("previous_prompt") or iter_data.get("old_prompt") or ""
-        optimized_prompt: str = iter_data.get("optimized_prompt") or iter_data.get("new_prompt") or ""
-        
-        # 获取准确率（旧格式可能是单个 accuracy 字段）
-        accuracy_before: float = iter_data.get("accuracy_before", 0.0)
-        accuracy_after = iter_data.get("accuracy_after")
-        # 如果只有单个 accuracy 字段，将其视为 accuracy_before
-        if "accuracy" in iter_data and accuracy_before == 0.0:
-            accuracy_before = iter_data.get("accuracy", 0.0)
-        
-        # 获取策略信息
-        strategy: str = iter_data.get("strategy") or ""
-        applied_strategies = iter_data.get("applied_strategies", [])
-        if applied_strategies and not strategy:
-            # 将策略列表转换为字符串
-            strategy = ", ".join([str(s) for s in applied_strategies]) if applied_strategies else ""
-        
-        new_iter = ProjectIteration(
-            project_id=project.id,
-            version=iter_data.get("version", idx + 1),
-            previous_prompt=previous_prompt,
-            optimized_prompt=optimized_prompt,
-            strategy=strategy,
-            accuracy_before=accuracy_before,
-            accuracy_after=accuracy_after,
-            task_id=iter_data.get("task_id"),
-            analysis=json.dumps(iter_data.get("analysis") or {}, ensure_ascii=False),
-            note=iter_data.get("note") or "",
-            created_at=iter_data.get("created_at", datetime.now().isoformat())
-        )
-        session.add(new_iter)
+        session.add(_create_iteration_from_legacy_dict(project.id, iter_data, idx + 1))
     
     logger.info(f"同步项目迭代记录: {project.id}, 数量: {len(iterations_data)}")
 
 
+def _create_iteration_from_legacy_dict(project_id: str, iter_data: Dict[str, Any], default_version: int) -> ProjectIteration:
+    """
+    从迭代字典（兼容旧格式 old_prompt/new_prompt/accuracy/applied_strategies）创建迭代记录对象
+    
+    :param project_id: 项目 ID
+    :param iter_data: 迭代记录数据
+    :param default_version: 数据中未携带 version 时使用的版本号
+    :return: 迭代记录对象
+    """
+    # 兼容旧格式字段映射
+    previous_prompt: str = iter_data.get("previous_prompt") or iter_data.get("old_prompt") or ""
+    optimized_prompt: str = iter_data.get("optimized_prompt") or iter_data.get("new_prompt") or ""
+    
+    # 获取准确率（旧格式可能是单个 accuracy 字段）
+    accuracy_before: float = iter_data.get("accuracy_before", 0.0)
+    accuracy_after = iter_data.get("accuracy_after")
+    # 如果只有单个 accuracy 字段，将其视为 accuracy_before
+    if "accuracy" in iter_data and accuracy_before == 0.0:
+        accuracy_before = iter_data.get("accuracy", 0.0)
+    
+    # 获取策略信息
+    strategy: str = iter_data.get("strategy") or ""
+    applied_strategies = iter_data.get("applied_strategies", [])
+    if applied_strategies and not strategy:
+        # 将策略列表转换为字符串
+        strategy = ", ".join([str(s) for s in applied_strategies]) if applied_strategies else ""
+    
+    return ProjectIteration(
+        project_id=project_id,
+        version=iter_data.get("version", default_version),
+        previous_prompt=previous_prompt,
+        optimized_prompt=optimized_prompt,
+        strategy=strategy,
+        accuracy_before=accuracy_before,
+        accuracy_after=accuracy_after,
+        task_id=iter_data.get("task_id"),
+        analysis=json.dumps(iter_data.get("analysis") or {}, ensure_ascii=False),
+        note=iter_data.get("note") or "",
+        created_at=iter_data.get("created_at", datetime.now().isoformat())
+    )
+
+
+def append_project_iteration(
+    project_id: str,
+    iteration_data: Dict[str, Any],
+    current_prompt: Optional[str] = None,
+    backfill_accuracy: Optional[float] = None
+) -> Optional[int]:
+    """
+    为单个项目追加一条迭代记录（只写该项目的一行，不重写其他项目和已有迭代）
+    
+    以项目的 updated_at 作为修订号做乐观并发控制（compare-and-swap）：
+    先以 "WHERE updated_at = 读取值" 条件更新项目行，该语句开启写事务并持有写锁，
+    之后的版本号计数与插入不会与其他写入交错；若项目已被并发修改则回滚重试。
+    
+    :param project_id: 项目 ID
+    :param iteration_data: 迭代记录数据（兼容旧格式字段）
+    :param current_prompt: 需要同步更新的当前提示词，None 表示不更新
+    :param backfill_accuracy: 回填到上一轮迭代 accuracy_after 的准确率（仅当其为空时），None 表示不回填
+    :return: 新迭代的版本号，项目不存在或重试耗尽返回 None
+    """
+    from sqlalchemy import func, update
+    
+    for attempt in range(1, APPEND_ITERATION_MAX_RETRIES + 1):
+        with get_db_session() as session:
+            project = session.get(Project, project_id)
+            if not project:
+                return None
+            expected_rev: Optional[str] = project.updated_at
+            
+            values: Dict[str, Any] = {"updated_at": datetime.now().isoformat()}
+            if current_prompt is not None:
+                values["current_prompt"] = current_prompt
+            cas_stmt = update(Project).where(
+                Project.id == project_id,
+                Project.updated_at == expected_rev
+            ).values(**values)
+            if session.execute(cas_stmt).rowcount == 0:
+                session.rollback()
+                logger.warning(f"追加项目迭代冲突，项目已被并发修改，重试 ({attempt}/{APPEND_ITERATION_MAX_RETRIES}): {project_id}")
+                continue
+            
+            # 回填上一轮迭代的 accuracy_after（只有为空时才回填）
+            if backfill_accuracy is not None:
+                last_stmt = select(ProjectIteration).where(
+                    ProjectIteration.project_id == project_id
+                ).order_by(ProjectIteration.version.desc()).limit(1)
+                last_iteration = session.exec(last_stmt).first()
+                if last_iteration and last_iteration.accuracy_after is None:
+                    last_iteration.accuracy_after = backfill_accuracy
+                    logger.info(f"回填上一轮迭代 (V{last_iteration.version}) 的 accuracy_after: {backfill_accuracy:.2%}")
+            
+            # 版本号 = 已有迭代数 + 1（已持有写锁，计数结果不会被并发插入打破）
+            count_stmt = select(func.count(ProjectIteration.id)).where(ProjectIteration.project_id == project_id)
+            version: int = session.exec(count_stmt).one() + 1
+            iteration_data["version"] = version
+            session.add(_create_iteration_from_legacy_dict(project_id, iteration_data, version))
+            session.commit()
+            invalidate_project_cache(project_id)
+            logger.info(f"追加项目迭代: {project_id} - V{version}")
+            return version
+    
+    logger.error(f"追加项目迭代失败，重试次数已耗尽: {project_id}")
+    return None
+
+
 def delete_project_iteration(project_id: str, timestamp: str) -> bool:
     """
     删除项目迭代记录
@@ -329,6 +480,7 @@ def delete_project_iteration(project_id: str, timestamp: str) -> bool:
         if iteration:
             session.delete(iteration)
             session.commit()
+            invalidate_project_cache(project_id)
             logger.info(f"删除项目迭代: {project_id} - {timestamp}")
             return True
         return False
@@ -352,6 +504,7 @@ def update_project_iteration_note(project_id: str, timestamp: str, note: str) ->
         if iteration:
             iteration.note = note
             session.commit()
+            invalidate_project_cache(project_id)
             logger.info(f"更新项目迭代备注: {project_id} - {timestamp}")
             return True
         return False
@@ -396,6 +549,7 @@ def update_error_optimization_history(
         project.error_optimization_history = json.dumps(history, ensure_ascii=False)
         project.updated_at = datetime.now().isoformat()
         session.commit()
+        invalidate_project_cache(project_id)
         logger.info(f"更新错误优化历史: {project_id}, 记录数: {len(history)}")
         return True
 
@@ -491,7 +645,7 @@ def save_task_status(project_id: str, task_id: str, status: Dict[str, Any]) -> N
                 session.add(error)
         
         session.commit()
-        logger.debug(f"保存任务状态: {normalized_id}")
+        logger.debug("保存任务状态: {}", normalized_id)
 
 
 def _sync_task_results(session: Session, task_id: str, results_data: List[Dict[str, Any]]) -> None:
@@ -549,13 +703,18 @@ def _create_task_error(task_id: str, data: Dict[str, Any]) -> TaskError:
     )
 
 
-def get_task_status(task_id: str, include_results: bool = False) -> Optional[Dict[str, Any]]:
+def get_task_status(
+    task_id: str,
+    include_results: bool = False,
+    include_counts: bool = False
+) -> Optional[Dict[str, Any]]:
     """
     获取任务状态
     
     :param task_id: 任务 ID
     :param include_results: 是否包含完整的 results 和 errors 数据
                            默认 False 以提升性能
+    :param include_counts: 不含 results 时是否补全 results_count / errors_count
     :return: 任务状态字典，未找到返回 None
     """
     with get_db_session() as session:
@@ -564,10 +723,114 @@ def get_task_status(task_id: str, include_results: bool = False) -> Optional[Dic
         
         task = session.get(Task, normalized_id)
         if task:
-            return task.to_dict(include_results=include_results)
+            result = task.to_dict(include_results=include_results)
+            if include_counts and not include_results:
+                _fill_task_counts(session, result)
+            return result
         return None
 
 
+def get_task_counts(task_id: str) -> Optional[Tuple[int, int]]:
+    """
+    获取任务的结果数与错误数（不加载 results/errors）
+    
+    优先使用任务完成时缓存在 extra_config 中的统计，旧任务回退到一次聚合查询。
+    
+    :param task_id: 任务 ID
+    :return: (results_count, errors_count)，未找到返回 None
+    """
+    with get_db_session() as session:
+        # 规范化任务 ID
+        normalized_id: str = task_id if task_id.startswith("task_") else f"task_{task_id}"
+        
+        task = session.get(Task, normalized_id)
+        if not task:
+            return None
+        result = task.to_dict(include_results=False)
+        _fill_task_counts(session, result)
+        return result["results_count"], result["errors_count"]
+
+
+def _fill_task_counts(session: Session, task_dict: Dict[str, Any]) -> None:
+    """
+    补全任务字典中缺失的 results_count / errors_count（一次聚合查询同时得到两者）
+    
+    :param session: 数据库会话
+    :param task_dict: 任务字典（原地写入）
+    """
+    if task_dict.get("results_count") is not None and task_dict.get("errors_count") is not None:
+        return
+    from sqlalchemy import func, case
+    
+    counts_stmt = select(
+        func.count(TaskResult.id),
+        func.sum(case((TaskResult.is_correct == False, 1), else_=0))
+    ).where(TaskResult.task_id == task_dict["id"])
+    results_count, errors_count = session.exec(counts_stmt).one()
+    task_dict["results_count"] = results_count
+    task_dict["errors_count"] = errors_count or 0
+
+
+def get_task_status_with_errors(task_id: str) -> Optional[Dict[str, Any]]:
+    """
+    获取任务状态及错误样例（不加载完整 results）
+    
+    只查询 is_correct=False 的结果行，结果总数通过 COUNT 获取，
+    适用于只需要 errors 与计数的场景（如简单优化、生成优化上下文）。
+    
+    :param task_id: 任务 ID
+    :return: 任务状态字典（results 为空列表，包含 errors 与 results_count），未找到返回 None
+    """
+    with get_db_session() as session:
+        # 规范化任务 ID
+        normalized_id: str = task_id if task_id.startswith("task_") else f"task_{task_id}"
+        
+        task = session.get(Task, normalized_id)
+        if not task:
+            return None
+        
+        result = task.to_dict(include_results=False)
+        errors_stmt = select(TaskResult).where(
+            TaskResult.task_id == normalized_id,
+            TaskResult.is_correct == False
+        )
+        result["errors"] = [e.to_dict() for e in session.exec(errors_stmt)]
+        _fill_task_counts(session, result)
+        return result
+
+
+# 流式读取任务结果时每批加载的行数
+TASK_RESULTS_BATCH_SIZE: int = 500
+
+
+def iter_task_results(task_id: str, batch_size: int = TASK_RESULTS_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    按主键分批迭代任务结果（不一次性加载完整 results）
+    
+    每批使用独立的短会话按 id 游标查询，迭代可以跨线程分段进行（如 StreamingResponse 的线程池迭代）。
+    
+    :param task_id: 任务 ID
+    :param batch_size: 每批加载的行数
+    :return: 结果字典迭代器，顺序与写入顺序一致
+    """
+    normalized_id: str = task_id if task_id.startswith("task_") else f"task_{task_id}"
+    last_id = 0
+    while True:
+        with get_db_session() as session:
+            stmt = select(TaskResult).where(
+                TaskResult.task_id == normalized_id,
+                TaskResult.id > last_id
+            ).order_by(TaskResult.id).limit(batch_size)
+            rows = session.exec(stmt).all()
+            batch = [r.to_dict() for r in rows]
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield from batch
+        if len(rows) < batch_size:
+            return
+
+
 def get_task_results_paginated(
     task_id: str, 
     page: int = 1, 
@@ -686,6 +949,21 @@ def get_task_results_paginated(
 
 
 
+def compute_accuracies(results_counts: List[int], errors_counts: List[int]) -> List[float]:
+    """
+    批量计算准确率 (results - errors) / results，结果数为 0 时准确率为 0
+    
+    :param results_counts: 各条记录的结果数
+    :param errors_counts: 各条记录的错误数（与 results_counts 一一对应）
+    :return: 准确率列表（Python float，可直接序列化）
+    """
+    results = np.asarray(results_counts, dtype=np.int64)
+    errors = np.asarray(errors_counts, dtype=np.int64)
+    accuracies = np.zeros(results.shape, dtype=np.float64)
+    np.divide(results - errors, results, out=accuracies, where=results > 0)
+    return accuracies.tolist()
+
+
 def get_project_tasks(project_id: str) -> List[Dict[str, Any]]:
     """
     获取项目关联的所有任务（仅返回摘要信息，不包含完整的 results/errors）
@@ -693,29 +971,34 @@ def get_project_tasks(project_id: str) -> List[Dict[str, Any]]:
     :param project_id: 项目 ID
     :return: 任务信息列表
     """
-    from sqlalchemy import func
+    from sqlalchemy import func, case
     
     with get_db_session() as session:
         statement = select(Task).where(Task.project_id == project_id)
         tasks: List[Task] = list(session.exec(statement))
         
+        # 一次分组聚合查询得到所有任务的结果数与错误数，避免每个任务各发两条 COUNT 查询
+        # 使用 TaskResult 计算错误数 (is_correct=False)，确保数据一致性
+        # 不再查询 TaskError 表，因为它可能与 TaskResult 不一致
+        counts: Dict[str, Tuple[int, int]] = {}
+        if tasks:
+            counts_stmt = select(
+                TaskResult.task_id,
+                func.count(TaskResult.id),
+                func.sum(case((TaskResult.is_correct == False, 1), else_=0))
+            ).where(
+                TaskResult.task_id.in_([task.id for task in tasks])
+            ).group_by(TaskResult.task_id)
+            counts = {task_id: (total, errors or 0) for task_id, total, errors in session.exec(counts_stmt)}
+        
+        task_counts = [counts.get(task.id, (0, 0)) for task in tasks]
+        # 所有任务的准确率一次向量化计算
+        accuracies = compute_accuracies(
+            [c[0] for c in task_counts], [c[1] for c in task_counts]
+        )
+        
         result: List[Dict[str, Any]] = []
-        for task in tasks:
-            # 使用 COUNT 查询获取数量，避免加载所有数据（性能优化）
-            results_count_stmt = select(func.count(TaskResult.id)).where(TaskResult.task_id == task.id)
-            results_count: int = session.exec(results_count_stmt).one()
-            
-            # 使用 TaskResult 计算错误数 (is_correct=False)，确保数据一致性
-            # 不再查询 TaskError 表，因为它可能与 TaskResult 不一致
-            errors_count_stmt = select(func.count(TaskResult.id)).where(
-                TaskResult.task_id == task.id, 
-                TaskResult.is_correct == False
-            )
-            errors_count: int = session.exec(errors_count_stmt).one()
-            
-            # 计算准确率
-            accuracy: float = (results_count - errors_count) / results_count if results_count > 0 else 0
-            
+        for task, (results_count, errors_count), accuracy in zip(tasks, task_counts, accuracies):
             # 提取时间戳
             timestamp: str = task.id.replace("task_", "") if task.id.startswith("task_") else ""
             
@@ -1084,6 +1367,60 @@ def get_auto_iterate_status(project_id: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+# ============== 上传文件相关操作 ==============
+
+# 数据目录文件名缓存，以目录 mtime 作为失效依据：新增/删除文件会改变目录 mtime，触发重新扫描
+_dir_mtime_ns: int = -1
+_dir_names: List[str] = []
+# 上传文件索引：file_id -> 文件路径（上传时登记，其余在查找时从文件名缓存中补全；目录变化时清空）
+_file_index: Dict[str, str] = {}
+_file_index_lock = threading.Lock()
+
+
+def register_file(file_id: str, file_path: str) -> None:
+    """
+    登记上传文件的存储路径
+    
+    :param file_id: 文件 ID
+    :param file_path: 文件路径
+    """
+    with _file_index_lock:
+        _file_index[file_id] = os.path.abspath(file_path)
+
+
+def get_file_path(file_id: str) -> Optional[str]:
+    """
+    根据文件 ID 获取上传文件的存储路径
+    
+    每次查找只需一次 stat 数据目录：目录未变化时直接查索引与文件名缓存，
+    变化时（新增/删除文件）才用 os.scandir 重新扫描。
+    
+    :param file_id: 文件 ID（存储文件名为 file_id + 扩展名，或 file_id_原文件名）
+    :return: 文件路径，未找到返回 None
+    """
+    global _dir_mtime_ns, _dir_names
+    mtime_ns = os.stat(DATA_DIR).st_mtime_ns
+    with _file_index_lock:
+        if mtime_ns != _dir_mtime_ns:
+            with os.scandir(DATA_DIR) as entries:
+                _dir_names = [entry.name for entry in entries]
+            _dir_mtime_ns = mtime_ns
+            # 只移除文件已不存在的条目，上传时登记的条目（登记前文件写入已改变目录 mtime）保留
+            names = set(_dir_names)
+            for stale_id in [k for k, v in _file_index.items() if os.path.basename(v) not in names]:
+                del _file_index[stale_id]
+        
+        file_path = _file_index.get(file_id)
+        if file_path is None:
+            for name in _dir_names:
+                # file_id 之后须紧跟扩展名或 "_原文件名"，避免 ID 互为前缀时匹配到其他文件
+                if name.startswith(file_id) and name[len(file_id):len(file_id) + 1] in ("", ".", "_"):
+                    file_path = os.path.join(DATA_DIR, name)
+                    _file_index[file_id] = file_path
+                    break
+        return file_path
+
+
 # ============== 辅助函数 ==============
 
 def _create_project_from_dict(data: Dict[str, Any]) -> Project:
@@ -1156,6 +1493,7 @@ def update_latest_project_iteration_accuracy(project_id: str, accuracy_after: fl
             iteration.accuracy_after = accuracy_after
             session.add(iteration)
             session.commit()
+            invalidate_project_cache(project_id)
             logger.info(f"已更新项目 {project_id} 迭代 (V{iteration.version}) 的准确率: {accuracy_after:.1%}")
             return True
         
@@ -284,7 +284,7 @@ class StrategyMatcher:
             # 获取模型名称 - 注意：正确的字段名是 model_name 而不是 model
             model_name: str = self.model_config.get("model_name", "gpt-3.5-turbo")
             logger.info(f"[StrategyMatcher] 准备调用 LLM 进行策略评分，模型: {model_name}")
-            logger.debug(f"[StrategyMatcher] model_config 完整内容: {json.dumps(self.model_config, ensure_ascii=False, default=str)}")
+            logger.opt(lazy=True).debug("[StrategyMatcher] model_config 完整内容: {}", lambda: json.dumps(self.model_config, ensure_ascii=False, default=str))
             
             # 使用 openai 库调用，需处理并发
             if hasattr(self.llm_client, "chat"):
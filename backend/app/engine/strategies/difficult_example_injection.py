@@ -257,6 +257,7 @@ class DifficultExampleInjectionStrategy(BaseStrategy):
         try:
             from app.db.database import get_db_session
             from app.models import IntentIntervention
+            from app.services import intervention_service
             from sqlmodel import select
             from datetime import datetime
             
@@ -294,6 +295,7 @@ class DifficultExampleInjectionStrategy(BaseStrategy):
                     session.add(new_intervention)
                 
                 session.commit()
+                intervention_service.invalidate_intervention_cache(project_id)
                 logger.debug(f"[{self.name}] 保存 Few-Shot 样本: query='{query[:30]}...'")
                 
         except Exception as e:
@@ -318,6 +320,7 @@ class DifficultExampleInjectionStrategy(BaseStrategy):
         try:
             from app.db.database import get_db_session
             from app.models import IntentIntervention
+            from app.services import intervention_service
             from sqlmodel import select
             from datetime import datetime
             
@@ -337,6 +340,7 @@ class DifficultExampleInjectionStrategy(BaseStrategy):
                     existing.is_fewshot_sample = False
                     existing.updated_at = datetime.now().isoformat()
                     session.commit()
+                    intervention_service.invalidate_intervention_cache(project_id)
                     logger.debug(f"[{self.name}] 取消 Few-Shot 标记: query='{query[:30]}...'")
                 
         except Exception as e:
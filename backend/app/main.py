@@ -5,6 +5,11 @@ import os
 import sys
 from loguru import logger as loguru_logger
 import logging
+from dotenv import load_dotenv
+
+# 先加载环境变量：必须在导入路由模块之前，路由模块会在导入时读取配置（如 PROJECT_DELETE_PASSWORD）
+load_dotenv()
+
 from app.db import storage
 from app.api.routers import config, upload, projects, tasks, auto_iterate, global_models, knowledge_base, playground, intervention, ai, multi_round_intervention
 
@@ -18,10 +23,6 @@ loguru_logger.remove()
 
 # 统一日志格式
 LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {name}:{function}:{line} | {message}"
-from dotenv import load_dotenv
-
-# 先加载环境变量
-load_dotenv()
 # 添加控制台输出 (默认为 INFO)
 console_handler_id = loguru_logger.add(sys.stderr, level=os.getenv("LOG_LEVEL", "INFO").upper(), format=LOG_FORMAT)
 # console_handler_id = loguru_logger.add(sys.stderr, level="DEBUG", format=LOG_FORMAT)
@@ -74,23 +75,25 @@ logging.getLogger("fastapi").handlers = [InterceptHandler()]
 # 重新赋值 logger 以兼容原有代码
 logger = logging.getLogger(__name__)
 
-from dotenv import load_dotenv
-
-# 加载环境变量
-load_dotenv()
-
 # 设置代理 (如果环境变量中存在)
 if os.getenv("HTTP_PROXY"):
     os.environ["HTTP_PROXY"] = os.getenv("HTTP_PROXY")
 if os.getenv("HTTPS_PROXY"):
     os.environ["HTTPS_PROXY"] = os.getenv("HTTPS_PROXY")
 
+import asyncio
+import anyio.to_thread
 from contextlib import asynccontextmanager
+from app.core import background_loop
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """服务的生命周期管理 (替代 startup/shutdown 事件)"""
     loguru_logger.info("Service is starting... Checking dependencies...")
+    # 统一线程池：asyncio 默认执行器与 FastAPI 同步接口/run_in_threadpool 使用的 anyio 线程数上限
+    asyncio.get_running_loop().set_default_executor(background_loop.create_executor("popt"))
+    anyio.to_thread.current_default_thread_limiter().total_tokens = background_loop.THREAD_POOL_SIZE
+    loguru_logger.info(f"Thread pool size: {background_loop.THREAD_POOL_SIZE}")
     try:
         import python_multipart
         loguru_logger.info("python-multipart is installed.")
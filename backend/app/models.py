@@ -7,6 +7,7 @@ from typing import Optional, List, Any, Dict
 from sqlmodel import SQLModel, Field, Relationship, Column
 from sqlalchemy import JSON, Text
 import json
+from app.core import serialization
 
 
 class ProjectIteration(SQLModel, table=True):
@@ -73,7 +74,7 @@ class ProjectIteration(SQLModel, table=True):
         
         # 解析 analysis JSON
         try:
-            result["analysis"] = json.loads(self.analysis) if self.analysis else {}
+            result["analysis"] = serialization.loads(self.analysis) if self.analysis else {}
         except json.JSONDecodeError:
             result["analysis"] = {}
             
@@ -144,17 +145,17 @@ class Project(SQLModel, table=True):
         
         # 解析 JSON 字段
         try:
-            result["config"] = json.loads(self.config) if self.config else {}
+            result["config"] = serialization.loads(self.config) if self.config else {}
         except json.JSONDecodeError:
             result["config"] = {}
             
         try:
-            result["model_config"] = json.loads(self.model_config_data) if self.model_config_data else {}
+            result["model_config"] = serialization.loads(self.model_config_data) if self.model_config_data else {}
         except json.JSONDecodeError:
             result["model_config"] = {}
             
         try:
-            result["optimization_model_config"] = json.loads(self.optimization_model_config) if self.optimization_model_config else {}
+            result["optimization_model_config"] = serialization.loads(self.optimization_model_config) if self.optimization_model_config else {}
         except json.JSONDecodeError:
             result["optimization_model_config"] = {}
             
@@ -162,7 +163,7 @@ class Project(SQLModel, table=True):
         
         # 解析错误优化历史
         try:
-            result["error_optimization_history"] = json.loads(self.error_optimization_history) if self.error_optimization_history else {}
+            result["error_optimization_history"] = serialization.loads(self.error_optimization_history) if self.error_optimization_history else {}
         except json.JSONDecodeError:
             result["error_optimization_history"] = {}
         
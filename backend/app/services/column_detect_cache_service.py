@@ -0,0 +1,63 @@
+"""
+多轮列检测缓存服务层
+
+LLM 检测多轮对话列配置耗时且结果只取决于列名、样本数据和所用模型，
+对完全相同的输入复用上一次的检测结果，避免重复上传同一文件时再次调用 LLM。
+缓存保存在进程内存中，按最近使用淘汰。
+"""
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# 最多缓存的检测结果数
+LLM_DETECT_CACHE_MAX_SIZE: int = 128
+
+# key -> 检测结果
+_llm_detect_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_llm_detect_cache_lock = threading.Lock()
+
+
+def make_detect_key(columns: List[str], sample_data: List[Dict[str, Any]], base_url: str, model_name: str) -> str:
+    """
+    计算 LLM 列检测输入的内容哈希（blake2b，16 字节摘要）
+
+    :param columns: 文件列名
+    :param sample_data: 样本数据
+    :param base_url: 模型接口地址
+    :param model_name: 模型名称
+    :return: 十六进制哈希字符串
+    """
+    payload = json.dumps([columns, sample_data, base_url, model_name], ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def get_cached_detection(key: str) -> Optional[Dict[str, Any]]:
+    """
+    获取缓存的 LLM 列检测结果
+
+    :param key: make_detect_key 计算的哈希
+    :return: 检测结果的深拷贝，未命中返回 None
+    """
+    with _llm_detect_cache_lock:
+        cached = _llm_detect_cache.get(key)
+        if cached is None:
+            return None
+        _llm_detect_cache.move_to_end(key)
+    return copy.deepcopy(cached)
+
+
+def store_detection(key: str, result: Dict[str, Any]) -> None:
+    """
+    缓存 LLM 列检测结果（仅应缓存成功解析的结果）
+
+    :param key: make_detect_key 计算的哈希
+    :param result: 检测结果
+    """
+    with _llm_detect_cache_lock:
+        _llm_detect_cache[key] = copy.deepcopy(result)
+        _llm_detect_cache.move_to_end(key)
+        while len(_llm_detect_cache) > LLM_DETECT_CACHE_MAX_SIZE:
+            _llm_detect_cache.popitem(last=False)
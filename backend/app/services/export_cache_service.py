@@ -0,0 +1,96 @@
+"""
+任务结果导出缓存服务层
+
+任务结果未变化时重复导出直接复用上一次生成的 Excel 内容，避免重新构建 DataFrame 并序列化整个工作簿。
+缓存键为 (task_id, 任务状态版本)，任务有新结果时版本随之变化；导出内容还依赖项目的意图干预原因，
+意图干预数据变化时由 intervention_service 失效对应项目的缓存。
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from loguru import logger
+
+# 最多缓存的导出文件数（按最近使用淘汰，导出文件可能较大，数量保持较小）
+EXPORT_CACHE_MAX_SIZE: int = 8
+
+# (task_id, version) -> (project_id, Excel 字节内容, 已完成数量, 总数量)
+_export_cache: "OrderedDict[Tuple[str, str], Tuple[Optional[str], bytes, int, Any]]" = OrderedDict()
+# 缓存代数：每次失效递增，生成期间发生过失效的结果不写入缓存，避免旧内容覆盖失效
+_export_cache_generation: int = 0
+_export_cache_lock = threading.Lock()
+
+
+def get_generation() -> int:
+    """
+    获取当前缓存代数（生成导出内容前调用，写入缓存时传回）
+
+    :return: 缓存代数
+    """
+    with _export_cache_lock:
+        return _export_cache_generation
+
+
+def get_cached_export(task_id: str, version: str) -> Optional[Tuple[bytes, int, Any]]:
+    """
+    获取缓存的导出内容
+
+    :param task_id: 任务ID
+    :param version: 任务状态版本（TaskManager.get_task_version）
+    :return: (Excel 字节内容, 已完成数量, 总数量)，未命中返回 None
+    """
+    key = (task_id, version)
+    with _export_cache_lock:
+        cached = _export_cache.get(key)
+        if cached is None:
+            return None
+        _export_cache.move_to_end(key)
+        return cached[1], cached[2], cached[3]
+
+
+def store_export(
+    task_id: str,
+    version: str,
+    project_id: Optional[str],
+    content: bytes,
+    current: int,
+    total: Any,
+    generation: int
+) -> None:
+    """
+    缓存导出内容
+
+    :param task_id: 任务ID
+    :param version: 任务状态版本
+    :param project_id: 项目ID（用于按项目失效）
+    :param content: Excel 字节内容
+    :param current: 已完成数量
+    :param total: 总数量
+    :param generation: 生成前通过 get_generation 取得的缓存代数
+    """
+    key = (task_id, version)
+    with _export_cache_lock:
+        if generation != _export_cache_generation:
+            return
+        # 同一任务的旧版本不会再被命中，直接移除
+        for old_key in [k for k in _export_cache if k[0] == task_id]:
+            del _export_cache[old_key]
+        _export_cache[key] = (project_id, content, current, total)
+        while len(_export_cache) > EXPORT_CACHE_MAX_SIZE:
+            _export_cache.popitem(last=False)
+
+
+def invalidate_export_cache(project_id: str) -> None:
+    """
+    使项目下所有任务的导出缓存失效（意图干预原因变化后调用）
+
+    :param project_id: 项目ID
+    """
+    global _export_cache_generation
+    with _export_cache_lock:
+        _export_cache_generation += 1
+        keys = [k for k, v in _export_cache.items() if v[0] == project_id]
+        for key in keys:
+            del _export_cache[key]
+    if keys:
+        logger.debug(f"清理项目 {project_id} 的导出缓存 {len(keys)} 条")
@@ -0,0 +1,62 @@
+"""
+后台导出任务服务层
+
+结果量很大的导出在独立的小线程池中生成，避免长时间占用通用线程池和请求连接；
+客户端提交后得到 job_id，轮询状态并在完成后下载。
+未结束的导出任务数有上限，超过时拒绝新的提交；已结束的任务按提交顺序淘汰（结果同时保存在导出缓存中）。
+"""
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from loguru import logger
+
+# 已结束的导出任务最多保留条数
+EXPORT_JOBS_MAX_SIZE: int = 16
+# 未结束（排队中或生成中）的导出任务数上限，超过时拒绝新的提交
+EXPORT_JOBS_MAX_PENDING: int = int(os.getenv("EXPORT_JOBS_MAX_PENDING", "8"))
+
+_export_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="popt-export")
+# job_id -> (task_id, Future)
+_export_jobs: "OrderedDict[str, Tuple[str, Future]]" = OrderedDict()
+_export_jobs_lock = threading.Lock()
+
+
+def submit_export_job(task_id: str, export_fn: Callable[[str], Any]) -> Optional[str]:
+    """
+    提交后台导出任务
+
+    :param task_id: 任务ID
+    :param export_fn: 生成导出内容的函数，以 task_id 为参数，在导出线程池中执行
+    :return: 导出任务ID，未结束的导出任务已达上限时返回 None
+    """
+    with _export_jobs_lock:
+        pending = sum(1 for _, future in _export_jobs.values() if not future.done())
+        if pending >= EXPORT_JOBS_MAX_PENDING:
+            logger.warning(f"后台导出任务已达上限 {EXPORT_JOBS_MAX_PENDING}，拒绝提交: task_id={task_id}")
+            return None
+        job_id = uuid.uuid4().hex
+        _export_jobs[job_id] = (task_id, _export_executor.submit(export_fn, task_id))
+        # 已结束的任务超出保留条数时淘汰最早提交的（未结束的受 EXPORT_JOBS_MAX_PENDING 约束）
+        finished = [k for k, (_, f) in _export_jobs.items() if f.done()]
+        for old_id in finished[:max(len(finished) - EXPORT_JOBS_MAX_SIZE, 0)]:
+            del _export_jobs[old_id]
+    return job_id
+
+
+def get_export_job(task_id: str, job_id: str) -> Optional[Future]:
+    """
+    获取导出任务的 Future
+
+    :param task_id: 任务ID（须与提交时一致）
+    :param job_id: 导出任务ID
+    :return: 导出任务的 Future，不存在或不属于该任务时返回 None
+    """
+    with _export_jobs_lock:
+        job = _export_jobs.get(job_id)
+    if job is None or job[0] != task_id:
+        return None
+    return job[1]
@@ -6,26 +6,87 @@
 处理 IntentIntervention 相关的数据库操作，包括查询、新增、修改和删除。
 提供给 API 层和 Optimization Engine 使用。
 """
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Tuple, Union
+from collections import OrderedDict
 from sqlmodel import select, Session, col, delete, func
 from loguru import logger
-import pandas as pd
 import json
 import re
+import threading
+import time
 
 from app.models import IntentIntervention
 from app.db.database import get_db_session
+from app.services.optimization_cache_service import invalidate_optimization_cache
+from app.services.export_cache_service import invalidate_export_cache
 from datetime import datetime
 
+# 项目意图干预列表缓存：(project_id, file_id) -> (写入时间, 列表)
+# 本模块的写操作会主动失效对应项目的缓存，TTL 兜底其他直接写表的路径
+INTERVENTION_CACHE_TTL_SECONDS: float = 60
+INTERVENTION_CACHE_MAX_SIZE: int = 512
+_intervention_cache: "OrderedDict[Tuple[str, Optional[str]], Tuple[float, List[IntentIntervention]]]" = OrderedDict()
+_intervention_cache_lock = threading.Lock()
+
+# 批量删除时单条 DELETE 语句携带的 query 数上限
+DELETE_BATCH_SIZE: int = 500
+
+
+def invalidate_intervention_cache(project_id: str) -> None:
+    """
+    使项目的意图干预列表缓存失效（写入意图干预数据后调用）
+    
+    :param project_id: 项目唯一标识
+    """
+    with _intervention_cache_lock:
+        for key in [k for k in _intervention_cache if k[0] == project_id]:
+            del _intervention_cache[key]
+    # 意图干预是多策略优化的依据之一，已缓存的优化结果随之失效
+    invalidate_optimization_cache(project_id)
+    # 任务结果导出使用意图干预中的原因，已缓存的导出文件随之失效
+    invalidate_export_cache(project_id)
+    # 优化输入缓存的样本可能已被上一次优化补充了干预数据，一并清理
+    from app.services.task_service import TaskManager
+    TaskManager().invalidate_optimize_cache(project_id)
+
+
 def get_interventions_by_project(project_id: str, file_id: Optional[str] = None) -> List[IntentIntervention]:
     """
     获取项目下所有已标注的意图干预数据
     
-    按 created_at 倒序排序，新增的数据排在前面（头插效果）
+    按 created_at 倒序排序，新增的数据排在前面（头插效果）。
+    结果按 (project_id, file_id) 缓存，结果分页轮询等高频读取无需每次查询数据库。
     
     :param project_id: 项目唯一标识
     :param file_id: 可选，文件版本 ID，用于筛选特定版本
-    :return: IntentIntervention 对象列表
+    :return: IntentIntervention 对象列表（调用方不应修改其中的对象）
+    """
+    cache_key = (project_id, file_id or None)
+    now = time.monotonic()
+    with _intervention_cache_lock:
+        cached = _intervention_cache.get(cache_key)
+        if cached is not None and now - cached[0] < INTERVENTION_CACHE_TTL_SECONDS:
+            _intervention_cache.move_to_end(cache_key)
+            return list(cached[1])
+    
+    results = _query_interventions_by_project(project_id, file_id)
+    if results is not None:
+        with _intervention_cache_lock:
+            _intervention_cache[cache_key] = (now, results)
+            _intervention_cache.move_to_end(cache_key)
+            while len(_intervention_cache) > INTERVENTION_CACHE_MAX_SIZE:
+                _intervention_cache.popitem(last=False)
+        return list(results)
+    return []
+
+
+def _query_interventions_by_project(project_id: str, file_id: Optional[str] = None) -> Optional[List[IntentIntervention]]:
+    """
+    从数据库查询项目下的意图干预数据
+    
+    :param project_id: 项目唯一标识
+    :param file_id: 可选，文件版本 ID
+    :return: IntentIntervention 对象列表，查询失败返回 None（不写入缓存）
     """
     try:
         with get_db_session() as session:
@@ -42,7 +103,7 @@ def get_interventions_by_project(project_id: str, file_id: Optional[str] = None)
             return results
     except Exception as e:
         logger.error(f"Failed to get interventions for project {project_id}: {e}")
-        return []
+        return None
 
 
 def get_intervention_count(project_id: str, file_id: Optional[str] = None) -> int:
@@ -123,6 +184,21 @@ def get_interventions_paginated(
         logger.error(f"Failed to get interventions paginated: {e}")
         return {"total": 0, "page": page, "page_size": page_size, "items": []}
 
+def _column_as_str(df: Any, col: Optional[str], mask: Any) -> List[str]:
+    """
+    将 DataFrame 的一列（按 mask 筛选后）整体转换为字符串列表，空值转为空字符串
+
+    :param df: DataFrame
+    :param col: 列名，为空或不存在时返回全空字符串
+    :param mask: 行筛选布尔序列
+    :return: 字符串列表
+    """
+    if not col or col not in df.columns:
+        return [""] * int(mask.sum())
+    values = df.loc[mask, col].astype(object)
+    return values.where(values.notna(), "").astype(str).tolist()
+
+
 def import_dataset_to_interventions(
     project_id: str, 
     df: Any, 
@@ -133,65 +209,42 @@ def import_dataset_to_interventions(
 ) -> int:
     """
     批量导入数据集到意图干预库 (优化版: 批量提交)
+    
+    按列整体转换数据（不逐行 iterrows）；新增记录一次批量插入，已有记录按主键一次批量更新。
+    同一 query 在文件中出现多次时以最后一行为准。
     """
     try:
         from datetime import datetime
+        from sqlalchemy import update
+        
+        # 1. 按列整体提取数据，跳过 query 为空的行
+        if query_col not in df.columns:
+            return 0
+        mask = df[query_col].notna()
+        queries = df.loc[mask, query_col].astype(str).tolist()
+        rows: Dict[str, Tuple[str, str]] = dict(zip(
+            queries,
+            zip(_column_as_str(df, target_col, mask), _column_as_str(df, reason_col, mask))
+        ))
         
-        # 1. 获取现有数据映射 {query: intervention}
+        # 2. 获取现有数据映射 {query: (id, original_target)}，只查询所需列
         # 注意：去重基于 project_id + query，不根据 file_id 筛选
         # 这保证了同一项目下相同 query 只存在一条记录
         with get_db_session() as session:
-            statement = select(IntentIntervention).where(
-                IntentIntervention.project_id == project_id
-            )
-            
-            existing_records = session.exec(statement).all()
-            existing_map = {r.query: r for r in existing_records}
+            statement = select(
+                IntentIntervention.query, IntentIntervention.id, IntentIntervention.original_target
+            ).where(IntentIntervention.project_id == project_id)
+            existing_map = {q: (record_id, original) for q, record_id, original in session.exec(statement)}
             
             new_objects = []
-            updated_count = 0
+            update_rows: List[Dict[str, Any]] = []
+            now = datetime.now().isoformat()
             
-            # 2. 遍历 DataFrame
-            for _, row in df.iterrows():
-                q = row.get(query_col)
-                if pd.isna(q):
-                    continue
-                
-                query_str = str(q)
-                t = row.get(target_col)
-                target_val = str(t) if pd.notna(t) else ""
-                
-                r = None
-                if reason_col and reason_col in df.columns:
-                    r_val = row.get(reason_col)
-                    r = str(r_val) if pd.notna(r_val) else ""
-                else:
-                    r = ""
-                
-                # 3. 检查是否存在
-                if query_str in existing_map:
-                    # Update existing
-                    existing_obj = existing_map[query_str]
-                    
-                    # 仅当内容有变化时才更新 (这里简化逻辑，直接赋值，SQLAlchemy 会处理脏检查)
-                    existing_obj.target = target_val
-                    existing_obj.reason = r
-                    existing_obj.updated_at = datetime.now().isoformat()
-                    
-                    # Target Modification Check
-                    if existing_obj.original_target is not None:
-                        existing_obj.is_target_modified = (existing_obj.target != existing_obj.original_target)
-                    
-                    # Import default logic: if original is None, fill it
-                    if existing_obj.original_target is None:
-                        existing_obj.original_target = target_val
-                        existing_obj.is_target_modified = False
-                        
-                    session.add(existing_obj)
-                    updated_count += 1
-                else:
-                    # Create new
-                    new_obj = IntentIntervention(
+            # 3. 区分新增与更新
+            for query_str, (target_val, r) in rows.items():
+                existing = existing_map.get(query_str)
+                if existing is None:
+                    new_objects.append(IntentIntervention(
                         project_id=project_id,
                         query=query_str,
                         target=target_val,
@@ -199,17 +252,31 @@ def import_dataset_to_interventions(
                         original_target=target_val,
                         is_target_modified=False,
                         file_id=file_id
-                    )
-                    new_objects.append(new_obj)
+                    ))
+                    continue
+                
+                record_id, original_target = existing
+                values: Dict[str, Any] = {"id": record_id, "target": target_val, "reason": r, "updated_at": now}
+                if original_target is None:
+                    # Import default logic: if original is None, fill it
+                    values["original_target"] = target_val
+                    values["is_target_modified"] = False
+                else:
+                    # Target Modification Check
+                    values["is_target_modified"] = target_val != original_target
+                update_rows.append(values)
             
-            # 4. 批量提交
+            # 4. 批量提交：插入一次 flush，更新按主键 executemany
             if new_objects:
                 session.add_all(new_objects)
+            if update_rows:
+                session.execute(update(IntentIntervention), update_rows)
             
-            total_affected = len(new_objects) + updated_count
+            total_affected = len(new_objects) + len(update_rows)
             session.commit()
+            invalidate_intervention_cache(project_id)
             
-            logger.info(f"Batch imported {total_affected} interventions (New: {len(new_objects)}, Updated: {updated_count}) for project {project_id}")
+            logger.info(f"Batch imported {total_affected} interventions (New: {len(new_objects)}, Updated: {len(update_rows)}) for project {project_id}")
             return total_affected
             
     except Exception as e:
@@ -306,6 +373,7 @@ def upsert_intervention(project_id: str, query: str, reason: str, target: str =
                 session.add(existing)
                 session.commit()
                 session.refresh(existing)
+                invalidate_intervention_cache(project_id)
                 logger.info(f"Updated intervention for query: {query[:20]}... (ID: {existing.id}) in project {project_id}")
                 return existing
             else:
@@ -322,6 +390,7 @@ def upsert_intervention(project_id: str, query: str, reason: str, target: str =
                 session.add(new_intervention)
                 session.commit()
                 session.refresh(new_intervention)
+                invalidate_intervention_cache(project_id)
                 logger.info(f"Created new intervention for query: {query[:20]}... in project {project_id}")
                 return new_intervention
     except Exception as e:
@@ -351,6 +420,7 @@ def reset_intervention(project_id: str, query: str) -> bool:
                 
                 session.add(existing)
                 session.commit()
+                invalidate_intervention_cache(project_id)
                 logger.info(f"Reset intervention for query: {query[:20]}... in project {project_id}")
                 return True
             return False
@@ -373,6 +443,7 @@ def delete_intervention(project_id: str, query: str) -> bool:
             if existing:
                 session.delete(existing)
                 session.commit()
+                invalidate_intervention_cache(project_id)
                 logger.info(f"Deleted intervention for query: {query[:20]}... in project {project_id}")
                 return True
             logger.warning(f"Intervention not found for deletion: project {project_id}, query {query[:20]}...")
@@ -382,6 +453,36 @@ def delete_intervention(project_id: str, query: str) -> bool:
         return False
 
 
+def delete_interventions(project_id: str, queries: List[str]) -> int:
+    """
+    批量删除干预记录（按 query 分批执行 DELETE ... IN，同一事务提交）
+
+    :param project_id: 项目 ID
+    :param queries: 待删除的 query 列表
+    :return: 删除的记录数
+    """
+    queries = list(dict.fromkeys(queries))
+    if not queries:
+        return 0
+    try:
+        with get_db_session() as session:
+            deleted_count = 0
+            # 分批避免超出 SQLite 单条语句的参数个数上限
+            for i in range(0, len(queries), DELETE_BATCH_SIZE):
+                statement = delete(IntentIntervention).where(
+                    IntentIntervention.project_id == project_id,
+                    col(IntentIntervention.query).in_(queries[i:i + DELETE_BATCH_SIZE])
+                )
+                deleted_count += session.exec(statement).rowcount
+            session.commit()
+            invalidate_intervention_cache(project_id)
+            logger.info(f"Batch deleted {deleted_count} interventions for project {project_id}")
+            return deleted_count
+    except Exception as e:
+        logger.error(f"Failed to batch delete interventions for project {project_id}: {e}")
+        return 0
+
+
 def get_unique_targets(project_id: str, file_id: Optional[str] = None) -> List[str]:
     """
     获取项目下所有唯一的 Target
@@ -422,6 +523,7 @@ def clear_interventions(project_id: str, file_id: Optional[str] = None) -> int:
             result = session.exec(statement)
             deleted_count = result.rowcount
             session.commit()
+            invalidate_intervention_cache(project_id)
 
             logger.info(f"Cleared {deleted_count} interventions for project {project_id}, file_id={file_id}")
             return deleted_count
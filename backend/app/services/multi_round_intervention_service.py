@@ -12,6 +12,7 @@ from datetime import datetime
 
 from app.models import MultiRoundIntervention, TaskResult
 from app.db.database import get_db_session
+from app.core import csv_encoding
 
 
 def get_interventions_paginated(
@@ -390,27 +391,20 @@ def sync_from_data_file(
     """
     import pandas as pd
     from app.db import storage
-    import os
-    import glob
 
     try:
-        # 在 DATA_DIR 中查找匹配 file_id 的文件
-        data_dir = storage.DATA_DIR
-        matching_files = glob.glob(os.path.join(data_dir, f"{file_id}.*"))
+        # 查找 file_id 对应的上传文件
+        file_path = storage.get_file_path(file_id)
 
-        if not matching_files:
+        if not file_path:
             logger.error(f"找不到文件: file_id={file_id}")
             return {"synced": 0, "skipped": 0, "error": f"文件不存在: {file_id}"}
 
-        file_path = matching_files[0]
         logger.info(f"找到文件: {file_path}")
 
         # 读取文件
         if file_path.endswith(".csv"):
-            try:
-                df = pd.read_csv(file_path, encoding='utf-8')
-            except UnicodeDecodeError:
-                df = pd.read_csv(file_path, encoding='gbk')
+            df = csv_encoding.read_csv(file_path)
         else:
             df = pd.read_excel(file_path)
 
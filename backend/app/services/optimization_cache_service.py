@@ -0,0 +1,92 @@
+"""
+优化结果缓存服务层
+
+对完全相同的优化输入（当前提示词、错误样本、模型配置、优化提示词、策略等）复用上一次的优化结果，
+避免短时间内的重复请求（如连点、网络重试）重复执行耗时的 LLM 优化流程。
+LLM 优化结果不确定，缓存只保留较短时间；需要重新生成时调用方可跳过缓存（优化接口的 force 参数）。
+缓存保存在进程内存中，按 LRU + TTL 淘汰；意图干预数据变化时由 intervention_service 失效对应项目的缓存。
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from app.core.serialization import dumps
+
+# 缓存有效期（秒），设为 0 关闭缓存
+OPTIMIZATION_CACHE_TTL_SECONDS: float = float(os.getenv("OPTIMIZATION_CACHE_TTL_SECONDS", "600"))
+OPTIMIZATION_CACHE_MAX_SIZE: int = 256
+
+# key -> (写入时间, project_id, 优化结果)
+_optimization_cache: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+_optimization_cache_lock = threading.Lock()
+
+
+def make_optimization_key(project_id: str, task_id: str, strategy: str, *inputs: Any) -> str:
+    """
+    计算优化输入的内容哈希（blake2b，16 字节摘要）
+
+    :param project_id: 项目ID
+    :param task_id: 任务ID
+    :param strategy: 优化策略
+    :param inputs: 其余影响优化结果的输入（提示词、错误样本、模型配置等，需可 JSON 序列化）
+    :return: 十六进制哈希字符串
+    """
+    payload = dumps([project_id, task_id, strategy, *inputs]).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def get_cached_optimization(key: str) -> Optional[Dict[str, Any]]:
+    """
+    获取缓存的优化结果
+
+    :param key: make_optimization_key 计算的哈希
+    :return: 优化结果字典的浅拷贝，未命中或已过期返回 None
+    """
+    if OPTIMIZATION_CACHE_TTL_SECONDS <= 0:
+        return None
+    now = time.monotonic()
+    with _optimization_cache_lock:
+        cached = _optimization_cache.get(key)
+        if cached is None:
+            return None
+        if now - cached[0] >= OPTIMIZATION_CACHE_TTL_SECONDS:
+            del _optimization_cache[key]
+            return None
+        _optimization_cache.move_to_end(key)
+        return dict(cached[2])
+
+
+def store_optimization(key: str, project_id: str, result: Dict[str, Any]) -> None:
+    """
+    缓存优化结果（仅应缓存成功完成的优化）
+
+    :param key: make_optimization_key 计算的哈希
+    :param project_id: 项目ID（用于按项目失效）
+    :param result: 优化结果，如 {"new_prompt", "applied_strategies", "diagnosis"}
+    """
+    if OPTIMIZATION_CACHE_TTL_SECONDS <= 0:
+        return
+    with _optimization_cache_lock:
+        _optimization_cache[key] = (time.monotonic(), project_id, result)
+        _optimization_cache.move_to_end(key)
+        while len(_optimization_cache) > OPTIMIZATION_CACHE_MAX_SIZE:
+            _optimization_cache.popitem(last=False)
+
+
+def invalidate_optimization_cache(project_id: str) -> None:
+    """
+    使项目的优化结果缓存失效（项目的意图干预等优化依据变化后调用）
+
+    :param project_id: 项目ID
+    """
+    with _optimization_cache_lock:
+        keys = [k for k, v in _optimization_cache.items() if v[1] == project_id]
+        for key in keys:
+            del _optimization_cache[key]
+    if keys:
+        logger.debug(f"清理项目 {project_id} 的优化结果缓存 {len(keys)} 条")
@@ -0,0 +1,239 @@
+"""
+优化任务状态服务层
+
+维护每个项目当前优化任务的运行状态，供后台优化线程写入、API 层轮询读取。
+状态保存在内存中，读写均在锁内完成；已结束的状态超过 TTL 后自动清理，避免无限增长。
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+# 已结束状态的保留时长（秒），超时后被清理，轮询将返回 idle
+OPTIMIZATION_STATUS_TTL_SECONDS: float = 30 * 60
+# 最多保留的已结束状态条数，超出时淘汰最早结束的（运行中的状态不受影响）
+OPTIMIZATION_STATUS_MAX_FINISHED: int = 1024
+# 两次过期清理之间的最小间隔（秒），避免每次写入都全量扫描
+_PURGE_INTERVAL_SECONDS: float = 60
+
+# 视为已结束的状态
+TERMINAL_STATUSES = frozenset({"completed", "failed", "stopped"})
+
+
+class OptimizationStatusStore:
+    """
+    优化任务状态存储（线程安全）
+
+    格式: {project_id: {"status": "running"|"completed"|"failed"|"stopped", "message": "...", "result": {...}}}
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = OPTIMIZATION_STATUS_TTL_SECONDS,
+        max_finished: int = OPTIMIZATION_STATUS_MAX_FINISHED
+    ) -> None:
+        """
+        :param ttl_seconds: 已结束状态的保留时长（秒）
+        :param max_finished: 最多保留的已结束状态条数
+        """
+        self._data: Dict[str, Dict[str, Any]] = {}
+        # project_id -> 进入结束状态的时间（monotonic）
+        self._finished_at: Dict[str, float] = {}
+        # project_id -> 状态版本号（全局单调递增，每次写入都会变化，用于 ETag）
+        self._versions: Dict[str, int] = {}
+        self._seq = 0
+        # project_id -> 等待状态变化的长轮询请求 [(所属事件循环, 事件)]
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        # project_id -> 停止信号；优化循环中高频轮询，Event.is_set 无需加锁
+        self._stop_events: Dict[str, threading.Event] = {}
+        self._lock = threading.RLock()
+        self._ttl = ttl_seconds
+        self._max_finished = max_finished
+        self._last_purge = time.monotonic()
+
+    def get(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取项目的优化状态
+
+        :param project_id: 项目ID
+        :return: 状态字典的浅拷贝，不存在返回 None
+        """
+        with self._lock:
+            status = self._data.get(project_id)
+            return dict(status) if status is not None else None
+
+    def get_with_version(self, project_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        获取项目的优化状态及其版本号
+
+        :param project_id: 项目ID
+        :return: (状态字典的浅拷贝或 None, 版本号)；状态不存在时版本号为 0
+        """
+        with self._lock:
+            status = self._data.get(project_id)
+            if status is None:
+                return None, 0
+            return dict(status), self._versions.get(project_id, 0)
+
+    async def wait_for_change(self, project_id: str, version: int, timeout: float) -> None:
+        """
+        等待项目状态版本号变化（长轮询），超时或已变化时返回
+
+        :param project_id: 项目ID
+        :param version: 调用方已知的版本号
+        :param timeout: 最长等待时间（秒）
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        with self._lock:
+            if self._versions.get(project_id, 0) != version:
+                return
+            self._waiters.setdefault(project_id, []).append(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(project_id)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(project_id, None)
+
+    def set(self, project_id: str, status: Dict[str, Any]) -> None:
+        """
+        整体替换项目的优化状态
+
+        :param project_id: 项目ID
+        :param status: 新的状态字典
+        """
+        with self._lock:
+            self._data[project_id] = status
+            self._bump(project_id)
+            self._mark(project_id, status.get("status"))
+            self._purge_expired()
+
+    def try_start(self, project_id: str, status: Dict[str, Any]) -> bool:
+        """
+        若项目当前没有运行中的优化任务，则原子地写入新状态（检查与写入在同一把锁内完成）
+
+        :param project_id: 项目ID
+        :param status: 新的状态字典（通常为 running）
+        :return: 是否写入成功；已有运行中的任务时返回 False
+        """
+        with self._lock:
+            current = self._data.get(project_id)
+            if current and current.get("status") == "running":
+                return False
+            # 新任务使用新的停止信号，避免沿用上一次任务已置位的事件
+            self._stop_events[project_id] = threading.Event()
+            self.set(project_id, status)
+            return True
+
+    def update(self, project_id: str, **fields: Any) -> None:
+        """
+        增量更新项目的优化状态（状态不存在时忽略）
+
+        :param project_id: 项目ID
+        :param fields: 需要更新的字段
+        """
+        with self._lock:
+            status = self._data.get(project_id)
+            if status is None:
+                return
+            status.update(fields)
+            self._bump(project_id)
+            if "status" in fields:
+                self._mark(project_id, fields["status"])
+
+    def request_stop(self, project_id: str) -> bool:
+        """
+        请求停止正在运行的优化任务
+
+        :param project_id: 项目ID
+        :return: 是否存在正在运行的任务
+        """
+        with self._lock:
+            status = self._data.get(project_id)
+            if not status or status.get("status") != "running":
+                return False
+            # 仅打标记，不计入结束时间：后台线程收到信号后会写入最终状态
+            status["should_stop"] = True
+            status["status"] = "stopped"
+            status["message"] = "正在停止..."
+            self._bump(project_id)
+            self._stop_events.setdefault(project_id, threading.Event()).set()
+            return True
+
+    def stop_event(self, project_id: str) -> threading.Event:
+        """
+        获取项目当前优化任务的停止信号
+
+        供优化循环高频轮询：check_stop = store.stop_event(project_id).is_set
+
+        :param project_id: 项目ID
+        :return: 停止事件，request_stop 时被置位
+        """
+        with self._lock:
+            return self._stop_events.setdefault(project_id, threading.Event())
+
+    def should_stop(self, project_id: str) -> bool:
+        """
+        检查项目的优化任务是否被请求停止
+
+        :param project_id: 项目ID
+        :return: 是否应停止
+        """
+        with self._lock:
+            status = self._data.get(project_id)
+            if not status:
+                return False
+            return bool(status.get("should_stop")) or status.get("status") == "stopped"
+
+    def _bump(self, project_id: str) -> None:
+        """递增项目的状态版本号并唤醒长轮询请求（需持有锁）"""
+        self._seq += 1
+        self._versions[project_id] = self._seq
+        # 写入方可能位于后台线程，需通过 call_soon_threadsafe 在等待方的事件循环中设置事件
+        for loop, event in self._waiters.pop(project_id, ()):
+            loop.call_soon_threadsafe(event.set)
+
+    def _mark(self, project_id: str, status_value: Optional[str]) -> None:
+        """记录/清除结束时间（需持有锁）"""
+        if status_value in TERMINAL_STATUSES:
+            self._finished_at[project_id] = time.monotonic()
+        else:
+            self._finished_at.pop(project_id, None)
+
+    def _purge_expired(self) -> None:
+        """清理超过 TTL 或超出条数上限的已结束状态（需持有锁）"""
+        now = time.monotonic()
+        overflow = len(self._finished_at) - self._max_finished
+        if overflow <= 0 and now - self._last_purge < _PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        expired = [pid for pid, ts in self._finished_at.items() if now - ts > self._ttl]
+        overflow -= len(expired)
+        if overflow > 0:
+            # 按结束时间淘汰最早的条目
+            expired_set = set(expired)
+            remaining = sorted(
+                (pid for pid in self._finished_at if pid not in expired_set),
+                key=self._finished_at.__getitem__
+            )
+            expired.extend(remaining[:overflow])
+        for pid in expired:
+            self._data.pop(pid, None)
+            self._finished_at.pop(pid, None)
+            self._versions.pop(pid, None)
+            self._stop_events.pop(pid, None)
+        if expired:
+            logger.debug(f"清理过期优化状态 {len(expired)} 条")
+
+
+# 进程级共享实例
+optimization_status = OptimizationStatusStore()
@@ -1,14 +1,58 @@
+import copy
+import hashlib
+import heapq
+import itertools
 import threading
 import time
 import json
 import os
 import pandas as pd
-from typing import Dict, Any, Optional, List, Union
+from collections import OrderedDict
+from operator import methodcaller
+from typing import Dict, Any, Iterator, Optional, List, NamedTuple, Tuple, Union
 from loguru import logger
 from app.db import storage
+from app.core import csv_encoding
 from app.core.llm_factory import LLMFactory
 from app.engine.helpers.verifier import Verifier
 
+# 批量转换 ORM 对象为字典（map 在 C 层循环，省去推导式逐条的字节码开销）
+_to_dict = methodcaller("to_dict")
+
+# 优化输入缓存的最大条目数（仅缓存已完成任务，按最近使用淘汰）
+OPTIMIZE_INPUTS_CACHE_SIZE = 8
+
+# 同时执行的验证任务数上限，超出的任务按预估开销排队（开销小的优先，相同开销先到先得）；
+# 暂停中的任务不占用槽位；默认与 MAX_CONCURRENT_OPTIMIZATIONS 一致为 4，设为 0 不限制
+MAX_CONCURRENT_TASKS: int = int(os.getenv("MAX_CONCURRENT_TASKS", "4"))
+
+
+def _column_to_str_list(df: pd.DataFrame, col: str) -> List[str]:
+    """
+    将 DataFrame 的一列整体转换为字符串列表，空值转为空字符串
+    
+    :param df: DataFrame
+    :param col: 列名
+    :return: 字符串列表
+    """
+    values = df[col].astype(object)
+    return values.where(values.notna(), "").astype(str).tolist()
+
+
+class OptimizeInputs(NamedTuple):
+    """
+    提示词优化所需的任务数据
+    
+    已完成任务的结果不再变化，可安全缓存复用；缓存返回的是深拷贝，
+    优化流程原地补充原因/目标等字段不会污染缓存。
+    """
+    errors: List[Dict[str, Any]]
+    results: List[Dict[str, Any]]
+    file_path: Optional[str]
+    results_count: int
+    accuracy: float
+
+
 class TaskManager:
     """
     任务管理器单例类
@@ -25,6 +69,14 @@ class TaskManager:
                 if cls._instance is None:
                     cls._instance = super(TaskManager, cls).__new__(cls)
                     cls._instance.tasks = {} # task_id -> {status, thread, stop_event, pause_event}
+                    # (task_id, 数据文件 mtime) -> (project_id, OptimizeInputs)
+                    cls._instance._optimize_cache = OrderedDict()
+                    cls._instance._optimize_cache_lock = threading.Lock()
+                    # 任务调度：正在执行的任务ID集合 + 等待队列 (预估开销, 提交序号, task_id) 小顶堆
+                    cls._instance._running = set()
+                    cls._instance._pending = []
+                    cls._instance._pending_seq = itertools.count()
+                    cls._instance._sched_lock = threading.Lock()
         return cls._instance
 
     def create_task(
@@ -64,7 +116,7 @@ class TaskManager:
         
         # 加载数据以校验
         if file_path.endswith(".csv"):
-            df = pd.read_csv(file_path)
+            df = csv_encoding.read_csv(file_path)
         else:
             df = pd.read_excel(file_path)
             
@@ -113,8 +165,8 @@ class TaskManager:
         pause_event.set()
         
         thread = threading.Thread(
-            target=self._run_task, 
-            args=(task_id, stop_event, pause_event)
+            target=self._run_in_slot, 
+            args=(self._run_task, task_id, stop_event, pause_event)
         )
         
         self.tasks[task_id] = {
@@ -127,9 +179,127 @@ class TaskManager:
         # 立即保存初始状态，以便在历史记录中可见
         storage.save_task_status(project_id, task_id, task_info)
         
-        thread.start()
+        self._submit(task_id)
         return task_id
 
+    @staticmethod
+    def _estimate_task_cost(info: Dict[str, Any]) -> int:
+        """
+        预估任务剩余的验证次数，作为调度优先级（越小越先执行）
+        
+        :param info: 任务信息
+        :return: (validation_limit 或数据行数) × 轮数 - 已完成数
+        """
+        total = info.get("total_count") or 0
+        limit = info.get("validation_limit")
+        # 多轮任务的 total_count 创建时已按 validation_limit 计算
+        if not info.get("multi_round_enabled") and isinstance(limit, int) and limit > 0:
+            total = min(total, limit)
+        return max(total - (info.get("current_index") or 0), 0)
+
+    def _submit(self, task_id: str) -> None:
+        """
+        将已登记的任务交给调度器：有空闲执行槽位时立即启动线程，否则进入等待队列
+        
+        排队期间任务状态仍为 running（前端据此显示停止按钮），info["queued"] 标记为 True。
+        
+        :param task_id: 任务 ID（须已登记到 self.tasks）
+        """
+        info = self.tasks[task_id]["info"]
+        with self._sched_lock:
+            start = MAX_CONCURRENT_TASKS <= 0 or len(self._running) < MAX_CONCURRENT_TASKS
+            if start:
+                self._running.add(task_id)
+            else:
+                priority = self._estimate_task_cost(info)
+                heapq.heappush(self._pending, (priority, next(self._pending_seq), task_id))
+                info["queued"] = True
+        if start:
+            self._start_thread(task_id)
+        else:
+            logger.info(f"[Task {task_id}] 执行槽位已满，进入等待队列 | 预估开销: {priority}")
+
+    def _start_thread(self, task_id: str) -> None:
+        """
+        启动任务线程（调用方须已为其占用执行槽位）
+        
+        线程已启动过（暂停后恢复的任务）时只解除暂停；若线程已在此期间结束，立即归还槽位。
+        排队期间被暂停再恢复的任务也在此解除暂停后才启动线程。
+        
+        :param task_id: 任务 ID
+        """
+        task = self.tasks[task_id]
+        task["info"].pop("queued", None)
+        thread = task["thread"]
+        task["pause_event"].set()
+        if thread.ident is None:
+            thread.start()
+        elif not thread.is_alive():
+            self._release_slot(task_id)
+
+    def _release_slot(self, task_id: str) -> None:
+        """
+        释放任务占用的执行槽位，并启动等待队列中优先级最高的任务
+        
+        :param task_id: 任务 ID（未占用槽位时仅尝试补位）
+        """
+        with self._sched_lock:
+            self._running.discard(task_id)
+            next_ids = []
+            while self._pending and (MAX_CONCURRENT_TASKS <= 0 or len(self._running) < MAX_CONCURRENT_TASKS):
+                _, _, next_id = heapq.heappop(self._pending)
+                if next_id in self.tasks:
+                    self._running.add(next_id)
+                    next_ids.append(next_id)
+        for next_id in next_ids:
+            self._start_thread(next_id)
+
+    def _run_in_slot(self, runner: Any, task_id: str, *args: Any) -> None:
+        """
+        任务线程入口：执行任务，结束后释放执行槽位并启动等待队列中优先级最高的任务
+        
+        :param runner: 任务执行函数（_run_task / _run_multi_round_task）
+        :param task_id: 任务 ID
+        :param args: 传给 runner 的其余参数
+        """
+        try:
+            runner(task_id, *args)
+        finally:
+            self._release_slot(task_id)
+
+    def _dequeue(self, task_id: str) -> bool:
+        """
+        从等待队列中移除任务（排队中的任务被停止时调用）
+        
+        :param task_id: 任务 ID
+        :return: 任务是否在等待队列中
+        """
+        with self._sched_lock:
+            remaining = [item for item in self._pending if item[2] != task_id]
+            if len(remaining) == len(self._pending):
+                return False
+            heapq.heapify(remaining)
+            self._pending = remaining
+        return True
+
+    def get_queue_status(self) -> Dict[str, Any]:
+        """
+        获取任务调度状态
+        
+        :return: {"max_concurrent", "running": [task_id], "queued": [{"task_id", "priority", "position"}]}
+        """
+        with self._sched_lock:
+            running = sorted(self._running)
+            pending = sorted(self._pending)
+        return {
+            "max_concurrent": MAX_CONCURRENT_TASKS,
+            "running": running,
+            "queued": [
+                {"task_id": task_id, "priority": priority, "position": position}
+                for position, (priority, _, task_id) in enumerate(pending, 1)
+            ]
+        }
+
     def _run_task(
         self, 
         task_id: str, 
@@ -199,7 +369,7 @@ class TaskManager:
         if reasons:
             logger.info(f"[Task {task_id}] Using {len(reasons)} rows from Intent Intervention (DB)")
             # 转换为 DataFrame
-            reasons_data = [r.to_dict() for r in reasons]
+            reasons_data = list(map(_to_dict, reasons))
             df = pd.DataFrame(reasons_data)
             
             # 从数据库加载时，使用固定的列名 (IntentIntervention 表结构固定)
@@ -218,7 +388,7 @@ class TaskManager:
             logger.info(f"[Task {task_id}] Using file source: {info['file_path']}")
             file_path = info["file_path"]
             if file_path.endswith(".csv"):
-                df = pd.read_csv(file_path)
+                df = csv_encoding.read_csv(file_path)
             else:
                 df = pd.read_excel(file_path)
             
@@ -277,6 +447,13 @@ class TaskManager:
         results_lock = threading.Lock()
         index_lock = threading.Lock()
         
+        # 按列一次性转换为字符串列表：Pandas 读取空单元格时会产生 float('nan')，统一转为空字符串，
+        # 避免 str(nan) 产生 "nan"；逐行处理时直接按下标取值，无需每行 df.iloc[i] 构造一个 Series
+        queries = _column_to_str_list(df, query_col)
+        targets = _column_to_str_list(df, target_col)
+        # 原因列的值 (如果配置了)
+        reasons = _column_to_str_list(df, reason_col) if reason_col and reason_col in df.columns else None
+        
         def process_single_query(i: int) -> Optional[Dict[str, Any]]:
             """
             处理单个查询
@@ -288,19 +465,9 @@ class TaskManager:
                 return None
             pause_event.wait()
             
-            # 获取原始值
-            raw_query = df.iloc[i][query_col]
-            raw_target = df.iloc[i][target_col]
-            # 获取原因列的值 (如果配置了)
-            raw_reason = None
-            if reason_col and reason_col in df.columns:
-                raw_reason = df.iloc[i][reason_col]
-
-            # 处理 NaN 值：Pandas 读取空单元格时会产生 float('nan')
-            # 使用 pd.isna() 检测并转换为空字符串，避免 str(nan) 产生 "nan" 字符串
-            query = "" if pd.isna(raw_query) else str(raw_query)
-            target = "" if pd.isna(raw_target) else str(raw_target)
-            reason = "" if pd.isna(raw_reason) else str(raw_reason)
+            query = queries[i]
+            target = targets[i]
+            reason = reasons[i] if reasons is not None else ""
             
             result = Verifier.verify_single(
                 index=i,
@@ -339,7 +506,7 @@ class TaskManager:
                         info["current_index"] = completed_count
                         
                         if completed_count % 10 == 0:
-                            logger.info(f"[Task {task_id}] Progress: {completed_count}/{total}")
+                            logger.info("[Task {}] Progress: {}/{}", task_id, completed_count, total)
                         
                         # 每10条保存一次状态
                         if completed_count % 10 == 0:
@@ -347,14 +514,13 @@ class TaskManager:
         
         if info["current_index"] == info["total_count"]:
             info["status"] = "completed"
+            self._record_result_stats(info)
             
             # --- 回填知识库准确率 ---
             # 当任务完成后，用当前准确率更新上一条优化分析记录的 accuracy_after
             try:
-                results = info.get("results", [])
-                errors = info.get("errors", [])
-                if results:
-                    accuracy = (len(results) - len(errors)) / len(results)
+                if info["results_count"]:
+                    accuracy = info["accuracy"]
                     
                     # 导入知识库模块并更新
                     from app.engine.knowledge_base import OptimizationKnowledgeBase
@@ -375,7 +541,21 @@ class TaskManager:
         
         storage.save_task_status(info["project_id"], task_id, info)
 
-
+    @staticmethod
+    def _record_result_stats(info: Dict[str, Any]) -> None:
+        """
+        任务完成时缓存结果统计（results_count / errors_count / accuracy）
+        
+        结果在任务完成后不再变化，统计值随 extra_config 一起持久化，
+        后续读取（如优化流程）无需再加载完整 results 列表计算。
+        
+        :param info: 任务信息字典（原地写入统计字段）
+        """
+        results_count = len(info.get("results", []))
+        errors_count = len(info.get("errors", []))
+        info["results_count"] = results_count
+        info["errors_count"] = errors_count
+        info["accuracy"] = (results_count - errors_count) / results_count if results_count else 0
 
     def pause_task(self, task_id: str) -> bool:
         """
@@ -387,6 +567,11 @@ class TaskManager:
         if task_id in self.tasks:
             self.tasks[task_id]["pause_event"].clear()
             self.tasks[task_id]["info"]["status"] = "paused"
+            # 暂停的任务不占用执行槽位：排队中的移出队列，执行中的归还槽位给等待任务
+            if self._dequeue(task_id):
+                self.tasks[task_id]["info"].pop("queued", None)
+            elif task_id in self._running:
+                self._release_slot(task_id)
             # 保存状态变更到磁盘，以便前端获取历史时能看到最新状态
             storage.save_task_status(self.tasks[task_id]["info"]["project_id"], task_id, self.tasks[task_id]["info"])
             return True
@@ -402,8 +587,17 @@ class TaskManager:
         :return: 是否恢复成功
         """
         if task_id in self.tasks:
-            self.tasks[task_id]["pause_event"].set()
-            self.tasks[task_id]["info"]["status"] = "running"
+            task = self.tasks[task_id]
+            task["info"]["status"] = "running"
+            # 暂停时已归还槽位：重新申请，槽位已满则排队，轮到时再解除暂停
+            with self._sched_lock:
+                needs_slot = task_id not in self._running and not any(
+                    item[2] == task_id for item in self._pending
+                )
+            if needs_slot and (task["thread"].ident is None or task["thread"].is_alive()):
+                self._submit(task_id)
+            else:
+                task["pause_event"].set()
             # 保存状态变更到磁盘
             storage.save_task_status(self.tasks[task_id]["info"]["project_id"], task_id, self.tasks[task_id]["info"])
             return True
@@ -429,8 +623,8 @@ class TaskManager:
                 
                 # 改进：让 _run_task 自己加载文件
                 thread = threading.Thread(
-                    target=self._run_task, 
-                    args=(task_id, stop_event, pause_event, info)
+                    target=self._run_in_slot, 
+                    args=(self._run_task, task_id, stop_event, pause_event, info)
                 )
                 self.tasks[task_id] = {
                     "info": info,
@@ -438,7 +632,7 @@ class TaskManager:
                     "stop_event": stop_event,
                     "pause_event": pause_event
                 }
-                thread.start()
+                self._submit(task_id)
                 return True
         return False
 
@@ -453,6 +647,9 @@ class TaskManager:
             self.tasks[task_id]["stop_event"].set()
             self.tasks[task_id]["pause_event"].set() # 确保不被卡在暂停
             self.tasks[task_id]["info"]["status"] = "stopped"
+            # 尚未开始执行的任务直接移出等待队列
+            if self._dequeue(task_id):
+                self.tasks[task_id]["info"].pop("queued", None)
             # 保存状态变更到磁盘
             storage.save_task_status(self.tasks[task_id]["info"]["project_id"], task_id, self.tasks[task_id]["info"])
             return True
@@ -485,8 +682,154 @@ class TaskManager:
                 return info_copy
             return task_info
             
-        # 从数据库加载，按需包含 results/errors
-        return storage.get_task_status(task_id, include_results=include_results)
+        # 从数据库加载，按需包含 results/errors；不含时与内存任务一样返回计数信息
+        return storage.get_task_status(task_id, include_results=include_results, include_counts=True)
+
+    def get_task_version(self, task_id: str) -> Optional[str]:
+        """
+        获取任务状态的版本标识（用于 ETag），不加载完整 results/errors
+        
+        由状态、进度、结果数/错误数与备注计算：结果只会追加，计数不变即内容不变。
+        
+        :param task_id: 任务 ID
+        :return: 版本字符串，任务不存在返回 None
+        """
+        if task_id in self.tasks:
+            info = self.tasks[task_id]["info"]
+            parts = (
+                info.get("status"), info.get("current_index"), info.get("current_round"),
+                len(info.get("results", [])), len(info.get("errors", [])), info.get("note"),
+                info.get("queued", False)
+            )
+        else:
+            summary = storage.get_task_status(task_id, include_results=False, include_counts=True)
+            if not summary:
+                return None
+            parts = (
+                summary.get("status"), summary.get("current_index"), summary.get("current_round"),
+                summary.get("results_count"), summary.get("errors_count"), summary.get("note")
+            )
+        return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+    def get_task_counts(self, task_id: str) -> Optional[Tuple[int, int]]:
+        """
+        获取任务的结果数与错误数，不加载完整 results/errors
+        
+        :param task_id: 任务 ID
+        :return: (results_count, errors_count)，任务不存在返回 None
+        """
+        if task_id in self.tasks:
+            info = self.tasks[task_id]["info"]
+            return len(info.get("results", [])), len(info.get("errors", []))
+        return storage.get_task_counts(task_id)
+
+    def iter_results(self, task_id: str) -> Optional[Iterator[Dict[str, Any]]]:
+        """
+        迭代任务结果，不物化完整的 results 列表（供流式导出使用）
+        
+        :param task_id: 任务 ID
+        :return: 结果字典迭代器；运行中的任务只迭代调用时已产生的结果；任务不存在返回 None
+        """
+        if task_id in self.tasks:
+            results = self.tasks[task_id]["info"].get("results", [])
+            return itertools.islice(results, len(results))
+        if storage.get_task_counts(task_id) is None:
+            return None
+        return storage.iter_task_results(task_id)
+
+    def get_task_for_optimize(self, task_id: str, include_results: bool = True) -> Optional[OptimizeInputs]:
+        """
+        获取提示词优化所需的任务数据（errors / results / file_path 及统计）
+        
+        已完成任务的结果不再变化，按 (task_id, 数据文件 mtime) 缓存在进程内 LRU 中，
+        重复优化同一任务时只需读取一行任务记录，无需再反序列化全部结果。
+        缓存命中与回填时均返回深拷贝（优化流程会原地修改 errors/results）；
+        项目意图干预变化时由 invalidate_optimize_cache 清理。
+        
+        :param task_id: 任务 ID
+        :param include_results: 是否需要完整 results（多策略优化需要作为数据集）；
+                               为 False 时只加载 errors 与计数，返回的 results 为空列表
+        :return: 优化输入，任务不存在返回 None
+        """
+        # 内存中的任务直接使用实时数据
+        if task_id in self.tasks:
+            return self._build_optimize_inputs(self.tasks[task_id]["info"])
+
+        # 先读取不含结果的任务记录，仅已完成任务走缓存
+        summary = storage.get_task_status(task_id, include_results=False)
+        if not summary:
+            return None
+        completed = summary.get("status") == "completed"
+
+        cache_key = self._optimize_cache_key(task_id, summary.get("file_path"))
+        if completed:
+            with self._optimize_cache_lock:
+                cached = self._optimize_cache.get(cache_key)
+                if cached is not None:
+                    self._optimize_cache.move_to_end(cache_key)
+            if cached is not None:
+                return copy.deepcopy(cached[1])
+
+        if not include_results:
+            # 只查询错误行，不缓存（缓存中只保存完整数据）
+            info = storage.get_task_status_with_errors(task_id)
+            return self._build_optimize_inputs(info) if info else None
+
+        info = storage.get_task_status(task_id, include_results=True)
+        if not info:
+            return None
+        inputs = self._build_optimize_inputs(info)
+        if completed:
+            with self._optimize_cache_lock:
+                self._optimize_cache[cache_key] = (summary.get("project_id"), inputs)
+                self._optimize_cache.move_to_end(cache_key)
+                while len(self._optimize_cache) > OPTIMIZE_INPUTS_CACHE_SIZE:
+                    self._optimize_cache.popitem(last=False)
+            return copy.deepcopy(inputs)
+        return inputs
+
+    def invalidate_optimize_cache(self, project_id: str) -> None:
+        """
+        清理项目下任务的优化输入缓存（意图干预变化后调用）
+        
+        :param project_id: 项目 ID
+        """
+        with self._optimize_cache_lock:
+            for key in [k for k, v in self._optimize_cache.items() if v[0] == project_id]:
+                del self._optimize_cache[key]
+
+    @staticmethod
+    def _optimize_cache_key(task_id: str, file_path: Optional[str]) -> Tuple[str, float]:
+        """
+        生成优化输入缓存键：数据文件被替换时 mtime 变化，缓存自然失效
+        
+        :param task_id: 任务 ID
+        :param file_path: 数据文件路径
+        :return: (task_id, mtime)，文件不存在时 mtime 为 0
+        """
+        try:
+            mtime = os.stat(file_path).st_mtime if file_path else 0.0
+        except OSError:
+            mtime = 0.0
+        return task_id, mtime
+
+    @staticmethod
+    def _build_optimize_inputs(info: Dict[str, Any]) -> OptimizeInputs:
+        """
+        从任务信息构造优化输入，优先使用任务完成时缓存的统计
+        
+        :param info: 任务信息字典（包含 results / errors）
+        :return: 优化输入
+        """
+        results = info.get("results", [])
+        errors = info.get("errors", [])
+        results_count = info.get("results_count")
+        if results_count is None:
+            results_count = len(results)
+        accuracy = info.get("accuracy")
+        if accuracy is None:
+            accuracy = (results_count - len(errors)) / results_count if results_count else 0
+        return OptimizeInputs(errors, results, info.get("file_path"), results_count, accuracy)
 
     def get_task_results(
         self, 
@@ -678,8 +1021,8 @@ class TaskManager:
         pause_event.set()
 
         thread = threading.Thread(
-            target=self._run_multi_round_task,
-            args=(task_id, stop_event, pause_event)
+            target=self._run_in_slot,
+            args=(self._run_multi_round_task, task_id, stop_event, pause_event)
         )
 
         self.tasks[task_id] = {
@@ -692,7 +1035,7 @@ class TaskManager:
         # 立即保存初始状态
         storage.save_task_status(project_id, task_id, task_info)
 
-        thread.start()
+        self._submit(task_id)
         logger.info(f"[Task {task_id}] 多轮验证任务已创建 | 数据行数: {row_count} | 轮数: {max_rounds} | 总验证次数: {total_count}")
         return task_id
 
@@ -906,7 +1249,7 @@ class TaskManager:
 
                             # 定期保存
                             if global_index[0] % 10 == 0:
-                                logger.info(f"[Task {task_id}] 进度: {global_index[0]}/{info['total_count']} (第 {round_num} 轮)")
+                                logger.info("[Task {}] 进度: {}/{} (第 {} 轮)", task_id, global_index[0], info["total_count"], round_num)
                                 storage.save_task_status(project_id, task_id, info)
 
             # 当前轮完成，计算准确率并保存
@@ -931,6 +1274,7 @@ class TaskManager:
         # 任务完成
         if info["current_index"] >= info["total_count"]:
             info["status"] = "completed"
+            self._record_result_stats(info)
             logger.info(f"[Task {task_id}] 多轮验证任务完成")
 
         storage.save_task_status(project_id, task_id, info)
@@ -0,0 +1,39 @@
+import sys
+import os
+import threading
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import export_job_service
+
+
+def test_submit_rejected_when_pending_cap_reached(monkeypatch):
+    """New export jobs are refused while too many are still pending"""
+    monkeypatch.setattr(export_job_service, "EXPORT_JOBS_MAX_PENDING", 2)
+    monkeypatch.setattr(export_job_service, "_export_jobs", type(export_job_service._export_jobs)())
+    release = threading.Event()
+
+    def slow_export(task_id):
+        release.wait(5)
+        return task_id
+
+    first = export_job_service.submit_export_job("t1", slow_export)
+    second = export_job_service.submit_export_job("t2", slow_export)
+    assert first and second
+    assert export_job_service.submit_export_job("t3", slow_export) is None
+
+    release.set()
+    assert export_job_service.get_export_job("t1", first).result(5) == "t1"
+    assert export_job_service.get_export_job("t2", second).result(5) == "t2"
+    assert export_job_service.submit_export_job("t3", slow_export) is not None
+
+
+def test_get_job_checks_task_id(monkeypatch):
+    """A job is only visible under the task it was submitted for"""
+    monkeypatch.setattr(export_job_service, "_export_jobs", type(export_job_service._export_jobs)())
+
+    job_id = export_job_service.submit_export_job("t1", lambda task_id: task_id)
+    assert export_job_service.get_export_job("t1", job_id).result(5) == "t1"
+    assert export_job_service.get_export_job("t2", job_id) is None
+    assert export_job_service.get_export_job("t1", "missing") is None
@@ -0,0 +1,45 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import task_service
+from app.services.task_service import TaskManager
+
+
+def _fake_task(task_id, include_results=True, **kwargs):
+    info = {"task_id": task_id, "project_id": "p1", "status": "completed", "file_path": None}
+    if include_results:
+        info["results"] = [{"query": "q", "target": "a", "is_correct": False}]
+        info["errors"] = [{"query": "q", "target": "a"}]
+    return info
+
+
+def test_cached_inputs_are_not_shared(monkeypatch):
+    """Callers mutating returned errors/results must not corrupt the cache"""
+    monkeypatch.setattr(task_service.storage, "get_task_status", _fake_task)
+    manager = TaskManager()
+    monkeypatch.setattr(manager, "tasks", {})
+    manager.invalidate_optimize_cache("p1")
+
+    first = manager.get_task_for_optimize("t1")
+    first.errors[0]["target"] = "injected"
+    first.results[0]["reason"] = "injected"
+
+    second = manager.get_task_for_optimize("t1")
+    assert second.errors[0]["target"] == "a"
+    assert "reason" not in second.results[0]
+
+
+def test_invalidate_clears_project_entries(monkeypatch):
+    """invalidate_optimize_cache drops the project's cached inputs"""
+    monkeypatch.setattr(task_service.storage, "get_task_status", _fake_task)
+    manager = TaskManager()
+    monkeypatch.setattr(manager, "tasks", {})
+
+    manager.get_task_for_optimize("t2")
+    assert any(key[0] == "t2" for key in manager._optimize_cache)
+
+    manager.invalidate_optimize_cache("p1")
+    assert not any(key[0] == "t2" for key in manager._optimize_cache)
@@ -0,0 +1,42 @@
+import sys
+import os
+import json
+import math
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import serialization
+from app.models import ProjectIteration
+
+
+def test_loads_legacy_nan_payload():
+    """NaN/Infinity written by the stdlib json.dumps must still load"""
+    payload = json.dumps({"a": float("nan"), "b": float("inf"), "c": 1})
+
+    data = serialization.loads(payload)
+    assert math.isnan(data["a"])
+    assert data["b"] == float("inf")
+    assert data["c"] == 1
+
+    data = serialization.loads(payload.encode("utf-8"))
+    assert math.isnan(data["a"])
+
+
+def test_iteration_analysis_with_nan_is_not_dropped():
+    """Legacy iteration rows with NaN in analysis keep their content"""
+    iteration = ProjectIteration(project_id="p", analysis=json.dumps({"a": float("nan"), "note": "x"}))
+
+    analysis = iteration.to_dict()["analysis"]
+    assert analysis["note"] == "x"
+    assert math.isnan(analysis["a"])
+
+
+def test_loads_invalid_json_still_raises():
+    """Malformed JSON keeps raising JSONDecodeError"""
+    try:
+        serialization.loads("{not json")
+    except serialization.JSONDecodeError:
+        pass
+    else:
+        raise AssertionError("expected JSONDecodeError")
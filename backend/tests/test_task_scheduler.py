@@ -0,0 +1,111 @@
+import sys
+import os
+import threading
+import time
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import task_service
+from app.services.task_service import TaskManager
+
+
+def _register(manager: TaskManager, task_id: str, release: threading.Event, total: int = 1) -> None:
+    """Register a fake task whose runner blocks until `release` is set (honouring pause)."""
+    stop_event = threading.Event()
+    pause_event = threading.Event()
+    pause_event.set()
+
+    def runner(tid, stop_event, pause_event):
+        while not release.wait(0.01):
+            if stop_event.is_set():
+                return
+            pause_event.wait()
+
+    manager.tasks[task_id] = {
+        "info": {"project_id": "p", "status": "running", "total_count": total, "current_index": 0},
+        "thread": threading.Thread(
+            target=manager._run_in_slot, args=(runner, task_id, stop_event, pause_event), daemon=True
+        ),
+        "stop_event": stop_event,
+        "pause_event": pause_event
+    }
+    manager._submit(task_id)
+
+
+def _wait_until(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def _fresh_manager(monkeypatch, limit: int) -> TaskManager:
+    monkeypatch.setattr(task_service, "MAX_CONCURRENT_TASKS", limit)
+    monkeypatch.setattr(task_service.storage, "save_task_status", lambda *args, **kwargs: None)
+    manager = TaskManager()
+    monkeypatch.setattr(manager, "tasks", {})
+    monkeypatch.setattr(manager, "_running", set())
+    monkeypatch.setattr(manager, "_pending", [])
+    return manager
+
+
+def test_slot_freed_on_finish(monkeypatch):
+    """A queued task starts once the running task finishes"""
+    manager = _fresh_manager(monkeypatch, 1)
+    release_a, release_b = threading.Event(), threading.Event()
+    _register(manager, "a", release_a)
+    _register(manager, "b", release_b)
+
+    assert manager._running == {"a"}
+    assert manager.tasks["b"]["info"]["queued"] is True
+
+    release_a.set()
+    assert _wait_until(lambda: manager._running == {"b"})
+    assert "queued" not in manager.tasks["b"]["info"]
+
+    release_b.set()
+    assert _wait_until(lambda: not manager._running)
+
+
+def test_slot_freed_on_stop_while_queued(monkeypatch):
+    """Stopping a queued task removes it from the queue without starting it"""
+    manager = _fresh_manager(monkeypatch, 1)
+    release_a, release_b = threading.Event(), threading.Event()
+    _register(manager, "a", release_a)
+    _register(manager, "b", release_b)
+
+    assert manager.stop_task("b")
+    assert manager._pending == []
+    assert "queued" not in manager.tasks["b"]["info"]
+
+    release_a.set()
+    assert _wait_until(lambda: not manager._running)
+    assert manager.tasks["b"]["thread"].ident is None
+
+
+def test_slot_freed_on_pause(monkeypatch):
+    """Pausing a running task hands its slot to the queue; resuming waits for a free slot"""
+    manager = _fresh_manager(monkeypatch, 1)
+    release_a, release_b = threading.Event(), threading.Event()
+    _register(manager, "a", release_a)
+    _register(manager, "b", release_b)
+
+    version_queued = manager.get_task_version("b")
+    assert manager.pause_task("a")
+    assert _wait_until(lambda: manager._running == {"b"})
+    assert manager.get_task_version("b") != version_queued
+
+    # No free slot: resumed task is queued and stays blocked on its pause event
+    assert manager.resume_task("a")
+    assert manager.tasks["a"]["info"]["queued"] is True
+    assert not manager.tasks["a"]["pause_event"].is_set()
+
+    release_b.set()
+    assert _wait_until(lambda: manager._running == {"a"})
+    assert manager.tasks["a"]["pause_event"].is_set()
+
+    release_a.set()
+    assert _wait_until(lambda: not manager._running)
@@ -0,0 +1,31 @@
+import sys
+import os
+
+import pandas as pd
+import pytest
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.api.routers.upload import _read_file_meta
+
+
+def test_csv_meta_counts_rows(tmp_path):
+    """Header and data row count of a well-formed CSV"""
+    path = tmp_path / "ok.csv"
+    path.write_text('query,target\n"multi\nline",a\n\nq2,b\n', encoding="utf-8")
+
+    columns, row_count = _read_file_meta(str(path), ".csv")
+    assert columns == ["query", "target"]
+    assert row_count == len(pd.read_csv(path))
+
+
+def test_csv_meta_rejects_ragged_rows(tmp_path):
+    """Rows with more fields than the header fail like a full read does"""
+    path = tmp_path / "bad.csv"
+    path.write_text("query,target\nq1,a\nq2,b,extra\nq3,c\n", encoding="utf-8")
+
+    with pytest.raises(pd.errors.ParserError):
+        pd.read_csv(path)
+    with pytest.raises(pd.errors.ParserError):
+        _read_file_meta(str(path), ".csv")
@@ -280,7 +280,7 @@ export default function ProjectDetail() {
             if (tasksRes.data.tasks?.length > 0) {
                 const latestTaskId = tasksRes.data.tasks[0].id;
                 try {
-                    const taskRes = await axios.get(`${API_BASE}/tasks/${latestTaskId}`);
+                    const taskRes = await axios.get(`${API_BASE}/tasks/${latestTaskId}?include_results=true`);
                     setTaskStatus(taskRes.data);
                 } catch (e) { console.log("无法恢复任务状态"); }
             }
@@ -312,7 +312,7 @@ export default function ProjectDetail() {
                     // 同时获取并同步任务状态
                     if (res.data.task_id) {
                         try {
-                            const taskRes = await axios.get(`${API_BASE}/tasks/${res.data.task_id}`);
+                            const taskRes = await axios.get(`${API_BASE}/tasks/${res.data.task_id}?include_results=true`);
                             setTaskStatus(taskRes.data);
                         } catch (e) { console.error("Error fetching sub-task status", e); }
                     }
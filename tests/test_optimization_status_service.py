@@ -0,0 +1,114 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.services import optimization_status_service
+from app.services.optimization_status_service import OptimizationStatusStore
+
+
+class TestOptimizationStatusStore:
+
+    def test_get_returns_copy(self):
+        store = OptimizationStatusStore()
+        store.set("p1", {"status": "running", "message": "正在优化中..."})
+        snapshot = store.get("p1")
+        snapshot["message"] = "changed"
+        assert store.get("p1")["message"] == "正在优化中..."
+        assert store.get("missing") is None
+
+    def test_request_stop_only_when_running(self):
+        store = OptimizationStatusStore()
+        assert store.request_stop("p1") is False
+        store.set("p1", {"status": "running"})
+        assert store.should_stop("p1") is False
+        assert store.request_stop("p1") is True
+        assert store.should_stop("p1") is True
+        # 已不再是 running，重复请求不生效
+        assert store.request_stop("p1") is False
+
+    def test_try_start_rejects_when_running(self):
+        store = OptimizationStatusStore()
+        assert store.try_start("p1", {"status": "running"}) is True
+        assert store.try_start("p1", {"status": "running"}) is False
+        store.set("p1", {"status": "completed"})
+        assert store.try_start("p1", {"status": "running"}) is True
+
+    def test_stop_event_set_by_request_stop(self):
+        store = OptimizationStatusStore()
+        store.try_start("p1", {"status": "running"})
+        check_stop = store.stop_event("p1").is_set
+        assert check_stop() is False
+        store.request_stop("p1")
+        assert check_stop() is True
+        # 新任务拿到新的停止信号
+        store.try_start("p1", {"status": "running"})
+        assert store.stop_event("p1").is_set() is False
+
+    def test_update_ignores_missing_project(self):
+        store = OptimizationStatusStore()
+        store.update("p1", message="x")
+        assert store.get("p1") is None
+        store.set("p1", {"status": "running"})
+        store.update("p1", message="step 1")
+        assert store.get("p1")["message"] == "step 1"
+
+    def test_finished_entries_expire(self, monkeypatch):
+        monkeypatch.setattr(optimization_status_service, "_PURGE_INTERVAL_SECONDS", 0)
+        store = OptimizationStatusStore(ttl_seconds=-1)
+        store.set("done", {"status": "completed"})
+        store.set("running", {"status": "running"})
+        # 下一次写入触发清理：已结束的状态被移除，运行中的保留
+        store.set("other", {"status": "running"})
+        assert store.get("done") is None
+        assert store.get("running") is not None
+
+    def test_finished_entries_capped(self):
+        store = OptimizationStatusStore(max_finished=2)
+        store.set("running", {"status": "running"})
+        for pid in ("a", "b", "c"):
+            store.set(pid, {"status": "completed"})
+        # 超出上限时淘汰最早结束的，运行中的不受影响
+        assert store.get("a") is None
+        assert store.get("b") is not None
+        assert store.get("c") is not None
+        assert store.get("running") is not None
+
+    def test_version_changes_on_every_write(self):
+        store = OptimizationStatusStore()
+        assert store.get_with_version("p1") == (None, 0)
+        store.set("p1", {"status": "running"})
+        _, v1 = store.get_with_version("p1")
+        store.update("p1", message="step 1")
+        _, v2 = store.get_with_version("p1")
+        store.request_stop("p1")
+        status, v3 = store.get_with_version("p1")
+        assert 0 < v1 < v2 < v3
+        assert status["should_stop"] is True
+
+    def test_wait_for_change_wakes_on_write_from_other_thread(self):
+        store = OptimizationStatusStore()
+        store.set("p1", {"status": "running"})
+        _, version = store.get_with_version("p1")
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, lambda: threading.Thread(
+                target=store.update, args=("p1",), kwargs={"message": "x"}
+            ).start())
+            start = time.monotonic()
+            await store.wait_for_change("p1", version, timeout=5)
+            return time.monotonic() - start
+
+        assert asyncio.run(scenario()) < 1
+        assert store.get("p1")["message"] == "x"
+        assert store._waiters == {}
+
+    def test_wait_for_change_times_out(self):
+        store = OptimizationStatusStore()
+        asyncio.run(store.wait_for_change("p1", 0, timeout=0.01))
+        assert store._waiters == {}
@@ -0,0 +1,31 @@
+import sys
+import os
+import json
+
+import pytest
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.core import serialization
+
+
+class TestSerialization:
+
+    def test_dumps_keeps_non_ascii_and_roundtrips(self):
+        data = {"name": "意图识别", "count": 3, "items": [1, 2.5, None, True]}
+        text = serialization.dumps(data)
+        assert isinstance(text, str)
+        assert "意图识别" in text
+        assert serialization.loads(text) == data
+        assert serialization.loads(text.encode("utf-8")) == data
+
+    def test_dumps_non_str_keys(self):
+        assert json.loads(serialization.dumps({1: "a"})) == {"1": "a"}
+
+    def test_dumps_falls_back_for_big_int(self):
+        assert json.loads(serialization.dumps({"v": 2 ** 70 + 1})) == {"v": 2 ** 70 + 1}
+
+    def test_loads_invalid_raises_stdlib_error(self):
+        with pytest.raises(json.JSONDecodeError):
+            serialization.loads("{bad")